@@ -0,0 +1,188 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+import stat
+import uuid
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, "output", "cache")
+DEFAULT_CACHE_MB = 2048
+
+# Sources whose content decides the bytes of each artifact kind
+GENERATOR_SOURCES = {
+	"gcode": [
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "gcode_wrapper.py"),
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "auxetic_gcode.py"),
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "toolpath.py"),
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "Strategy", "print_transformation.py"),
+	],
+	"png": [
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "gcode_wrapper.py"),
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "auxetic_gcode.py"),
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "toolpath.py"),
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "Strategy", "print_transformation.py"),
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "gcode_parser.py"),
+		os.path.join(BASE_DIR, "scripts", "G-code_scripts", "thumbnails.py"),
+	],
+	"inp": [
+		os.path.join(BASE_DIR, "scripts", "FEM_scripts", "abaqus_wrapper.py"),
+		os.path.join(BASE_DIR, "scripts", "FEM_scripts", "auxetic_FEM.py"),
+		os.path.join(BASE_DIR, "scripts", "FEM_scripts", "inp_writer.py"),
+		os.path.join(BASE_DIR, "scripts", "FEM_scripts", "node_sets.py"),
+	],
+}
+
+# Parameters each artifact kind depends on (the G-code does not use d, the .inp does not use cts)
+KEY_PARAMS = {
+	"gcode": ("a", "b", "xr", "yr", "zr", "cts"),
+	"png": ("a", "b", "xr", "yr", "zr", "cts"),
+	"inp": ("a", "b", "d", "xr", "yr", "zr"),
+}
+
+# Options each artifact kind depends on, with their defaults (the .inp differs by writer and layer stacking)
+KEY_OPTIONS = {
+	"inp": {"writer": "abaqus", "stacking": "merge"},
+}
+
+
+@functools.lru_cache(maxsize=None)
+def source_version(kind):
+	"""Returns the sha256 of the generator sources of an artifact kind."""
+	digest = hashlib.sha256()
+	for path in GENERATOR_SOURCES[kind]:
+		digest.update(os.path.basename(path).encode())
+		with open(path, "rb") as source:
+			digest.update(source.read())
+	return digest.hexdigest()
+
+
+def canonical_params(kind, design_type, params):
+	"""
+				Returns the parameters an artifact depends on in a canonical form, so that
+				"100", "100.0" and 100 give the same key.
+	"""
+	canonical = {"kind": kind, "design": str(design_type).upper()}
+	for name in KEY_PARAMS[kind]:
+		value = float(params[name])
+		canonical[name] = int(value) if name in ("xr", "yr", "zr") else repr(value)
+	for name, default in KEY_OPTIONS.get(kind, {}).items():
+		canonical[name] = str(params.get(name, default))
+	return canonical
+
+
+def artifact_key(kind, design_type, params):
+	canonical = canonical_params(kind, design_type, params)
+	canonical["source"] = source_version(kind)
+	return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+def link_or_copy(src, dst):
+	"""
+				Hardlinks src to dst, copying it where links are not possible (other
+				volume, FAT, ...). An existing dst is replaced, never written through.
+	"""
+	tmp_path = os.path.join(os.path.dirname(dst) or ".", f".{uuid.uuid4().hex}.tmp")
+	try:
+		try:
+			os.link(src, tmp_path)
+		except OSError:
+			shutil.copyfile(src, tmp_path)
+		os.replace(tmp_path, dst)
+	finally:
+		if os.path.exists(tmp_path):
+			os.remove(tmp_path)
+
+
+def remove_entry(path):
+	"""Removes a cache entry, made writable first where read-only files cannot be removed (Windows)."""
+	try:
+		os.remove(path)
+	except FileNotFoundError:
+		pass  # evicted by another worker
+	except PermissionError:
+		os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+		os.remove(path)
+
+
+class ArtifactCache:
+	"""
+				Persistent content-addressed store of generated G-code, thumbnail and .inp files.
+
+				Artifacts are stored as <key><ext>, where the key hashes the canonical
+				parameters and the generator sources, so editing a generator invalidates
+				its entries. Entries are copies of the generated files and read-only;
+				hits are hardlinked (or copied) into the session folder, so a session
+				file that is rewritten in place must be removed first (generate_cached
+				does). The modification time of an entry is its last use and the least
+				recently used entries are evicted once the cache grows past max_bytes.
+	"""
+
+	def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MB << 20):
+		self.root = root
+		self.max_bytes = max_bytes
+		os.makedirs(self.root, exist_ok=True)
+
+	@classmethod
+	def from_env(cls):
+		"""Cache configured by AUXETIC_CACHE_DIR and AUXETIC_CACHE_MB (0 disables it)."""
+		size_mb = int(os.environ.get("AUXETIC_CACHE_MB", DEFAULT_CACHE_MB))
+		if size_mb <= 0:
+			return None
+		return cls(os.environ.get("AUXETIC_CACHE_DIR", DEFAULT_CACHE_DIR), size_mb << 20)
+
+	def path(self, key, ext):
+		return os.path.join(self.root, key + ext)
+
+	def fetch(self, key, ext, dst_path):
+		"""Places the cached artifact at dst_path; returns False on a miss (or when it cannot be placed)."""
+		path = self.path(key, ext)
+		try:
+			os.utime(path)
+			link_or_copy(path, dst_path)
+		except OSError:
+			return False  # evicted meanwhile, unreadable, ...: regenerate
+		return True
+
+	def store(self, key, ext, src_path):
+		"""Adds a freshly generated artifact, then evicts down to the size cap."""
+		tmp_path = os.path.join(self.root, f".{uuid.uuid4().hex}{ext}")
+		# a copy, not a link: later edits of the session file must not reach the entry
+		shutil.copyfile(src_path, tmp_path)
+		os.chmod(tmp_path, 0o444)
+		try:
+			os.replace(tmp_path, self.path(key, ext))  # atomic, concurrent writers of one key are harmless
+		except PermissionError:
+			os.chmod(self.path(key, ext), stat.S_IWRITE | stat.S_IREAD)  # Windows does not replace read-only files
+			os.replace(tmp_path, self.path(key, ext))
+		self.evict()
+
+	def evict(self):
+		entries = []
+		total = 0
+		with os.scandir(self.root) as scan:
+			for entry in scan:
+				if entry.name.startswith(".") or not entry.is_file():
+					continue
+				try:
+					stat = entry.stat()
+				except FileNotFoundError:
+					continue  # evicted by another worker
+				entries.append((stat.st_mtime, stat.st_size, entry.path))
+				total += stat.st_size
+		entries.sort()
+		for _, size, path in entries:
+			if total <= self.max_bytes:
+				break
+			remove_entry(path)
+			total -= size
+
+	def clear(self):
+		with os.scandir(self.root) as scan:
+			for entry in scan:
+				if entry.is_file():
+					remove_entry(entry.path)
+		shutil.rmtree(self.root, ignore_errors=True)
+		os.makedirs(self.root, exist_ok=True)
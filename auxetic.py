@@ -0,0 +1,156 @@
+"""
+Headless entry point for batch runs, e.g. on compute nodes without a display.
+Writes the same session folders and metadata.json as the manual mode of
+main_ui.py, without importing PyQt.
+
+	python auxetic.py batch manifest.csv --gcode --inp --workers 8
+	python auxetic.py batch rows.json --design SREG --gcode
+	python auxetic.py batch manifest.csv --inp --inp-writer native
+	python auxetic.py batch manifest.csv --inp --inp-writer pool --cae-workers 4
+	python auxetic.py batch manifest.csv --inp --stacking copy
+	python auxetic.py batch --resume output/session_20250101_120000
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+PARAMS = ['a', 'b', 'd', 'xr', 'yr', 'zr']
+DESIGN_TYPES = ("HCELL", "SREG", "SINV", "STRI")
+
+
+def read_manifest(path, design_type=None):
+	"""
+				Returns (design_type, rows) of a CSV or JSON manifest.
+
+				A CSV manifest has a header with a, b, d, xr, yr and zr and one design
+				per row; a JSON manifest is a list of row objects or an object with a
+				"rows" list. A design (or design_type) column/field may give the design
+				type instead of the design_type argument; a session holds one type.
+
+				Args:
+					- path (str): .csv or .json file
+					- design_type (str): HCELL, SREG, SINV or STRI, None to take it from the rows
+
+				Returns:
+					- tuple: the design type and the rows as dicts of strings, as entered in the UI
+	"""
+	with open(path, newline='') as manifest:
+		if path.lower().endswith('.json'):
+			data = json.load(manifest)
+			if isinstance(data, dict):
+				design_type = design_type or data.get('design') or data.get('design_type')
+				data = data['rows']
+		else:
+			data = [row for row in csv.DictReader(manifest) if any((value or '').strip() for value in row.values())]
+
+	rows = []
+	designs = set()
+	for n, entry in enumerate(data):
+		entry = {str(key).strip().lower(): value for key, value in entry.items() if key is not None}
+		missing = [param for param in PARAMS if str(entry.get(param, '')).strip() == '']
+		if missing:
+			raise ValueError(f"{path}: row {n + 1} has no {', '.join(missing)}")
+		design = entry.get('design') or entry.get('design_type')
+		if design:
+			designs.add(str(design).strip().upper())
+		rows.append({param: str(entry[param]).strip() for param in PARAMS})
+
+	if design_type is not None:
+		designs.add(design_type.upper())
+	if len(designs) != 1:
+		raise ValueError(f"{path}: expected one design type, got {', '.join(sorted(designs)) or 'none'}"
+			" (use --design or a design column)")
+	design_type = designs.pop()
+	if design_type not in DESIGN_TYPES:
+		raise ValueError(f"{path}: unknown design type {design_type}")
+	return design_type, rows
+
+
+def batch(args):
+	from artifact_cache import ArtifactCache
+	from batch import SessionJournal, create_session_folder, read_metadata, run_batch, session_rows, write_metadata
+
+	if args.resume:
+		output_dir = args.resume
+		metadata = read_metadata(output_dir)
+		design_type, rows = metadata["design_type"], session_rows(metadata)
+		outputs = metadata.get("outputs", {})
+		gcode = args.gcode or outputs.get("gcode", False)
+		inp = args.inp or outputs.get("inp", False)
+		thumbnail = outputs.get("thumbnail", True) and not args.no_thumbnails
+		inp_writer = args.inp_writer or outputs.get("inp_writer", "abaqus")
+		stacking = args.stacking or outputs.get("stacking", "merge")
+		if not (gcode or inp):
+			raise ValueError(f"{output_dir}: the session does not record its outputs, pass --gcode and/or --inp")
+		print(f"Resuming {len(rows)} {design_type} designs in {output_dir}")
+	else:
+		design_type, rows = read_manifest(args.manifest, args.design)
+		if not rows:
+			raise ValueError(f"{args.manifest}: no design rows")
+		gcode, inp, thumbnail = args.gcode, args.inp, not args.no_thumbnails
+		inp_writer = args.inp_writer or "abaqus"
+		stacking = args.stacking or "merge"
+		output_dir, timestamp = create_session_folder()
+		# rows are matched by position, as in the UI's "Match by position" mode
+		metadata = {
+			"design_type": design_type,
+			"input_mode": "position",
+			"parameters": {param: [row[param] for row in rows] for param in PARAMS},
+			"timestamp": timestamp,
+			"outputs": {"gcode": gcode, "inp": inp, "thumbnail": thumbnail, "inp_writer": inp_writer,
+						"stacking": stacking},
+			"output_files": []
+		}
+		write_metadata(output_dir, metadata)
+		print(f"Generating {len(rows)} {design_type} designs in {output_dir}")
+
+	results = run_batch(output_dir, design_type, rows, gcode, inp, workers=args.workers,
+						cache=None if args.no_cache else ArtifactCache.from_env(), thumbnail=thumbnail,
+						journal=SessionJournal(output_dir), inp_writer=inp_writer, cae_workers=args.cae_workers,
+						stacking=stacking)
+	metadata["outputs"] = {"gcode": gcode, "inp": inp, "thumbnail": thumbnail, "inp_writer": inp_writer,
+						"stacking": stacking}
+	metadata["output_files"] = [name for files in results for name in files]
+	write_metadata(output_dir, metadata)
+	print(f"Files and metadata saved in {output_dir}")
+	return output_dir
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(prog='auxetic', description='Generate auxetic scaffold designs without the UI.')
+	commands = parser.add_subparsers(dest='command', required=True)
+	batch_parser = commands.add_parser('batch', help='generate every row of a manifest into a new session folder')
+	batch_parser.add_argument('manifest', nargs='?', help='.csv or .json file with a, b, d, xr, yr, zr (and design) per row')
+	batch_parser.add_argument('--resume', metavar='SESSION', help='finish a session folder: skip the logged files, retry the rest')
+	batch_parser.add_argument('--design', type=str.upper, choices=DESIGN_TYPES, help='design type of every row')
+	batch_parser.add_argument('--gcode', action='store_true', help='generate the G-code files')
+	batch_parser.add_argument('--inp', action='store_true', help='generate the ABAQUS .inp files')
+	batch_parser.add_argument('--inp-writer', choices=('abaqus', 'pool', 'native'),
+							  help='abaqus: one Abaqus CAE run per row (default); pool: a few persistent CAE kernels '
+								   'share the rows; native: write the .inp without Abaqus')
+	batch_parser.add_argument('--cae-workers', type=int, help='Abaqus CAE runs at a time (or kernels of --inp-writer pool, default 2)')
+	batch_parser.add_argument('--stacking', choices=('merge', 'copy'),
+							  help='how Abaqus CAE builds the layers: merge z_rep instances (default) or copy the mesh '
+								   'of one layer, faster for tall scaffolds')
+	batch_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+							  help='worker processes of the G-code files')
+	batch_parser.add_argument('--no-cache', action='store_true', help='regenerate files found in the artifact cache')
+	batch_parser.add_argument('--no-thumbnails', action='store_true', help='do not write a PNG next to every .gcode file')
+	args = parser.parse_args(argv)
+	if args.command == 'batch':
+		if (args.manifest is None) == (args.resume is None):
+			batch_parser.error('pass either a manifest or --resume SESSION')
+		if args.manifest is not None and not (args.gcode or args.inp):
+			batch_parser.error('nothing to generate: pass --gcode and/or --inp')
+	return args
+
+
+if __name__ == '__main__':
+	args = parse_args()
+	try:
+		batch(args)
+	except (OSError, ValueError, KeyError, RuntimeError) as e:
+		print(f"auxetic: {e}", file=sys.stderr)
+		sys.exit(1)
@@ -0,0 +1,390 @@
+import datetime
+import functools
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from artifact_cache import artifact_key
+from cae_pool import CAE_WORKERS, CAEWorkerPool, cae_command, cae_environment, cae_work_dir
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GCODE_SCRIPTS_DIR = os.path.join(BASE_DIR, "scripts", "G-code_scripts")
+FEM_SCRIPTS_DIR = os.path.join(BASE_DIR, "scripts", "FEM_scripts")
+sys.path.insert(0, GCODE_SCRIPTS_DIR)
+sys.path.insert(0, FEM_SCRIPTS_DIR)
+
+JOURNAL_NAME = "journal.jsonl"
+INP_WRITERS = ("abaqus", "pool", "native")  # Abaqus CAE per row, persistent CAE kernels or inp_writer.py
+
+
+# === FILE GENERATORS ===
+def generate_gcode(output_dir, design_type, params, i):
+	from gcode_wrapper import CTS, generate
+
+	gcode_name = f"{design_type.lower()}_{i + 1}.gcode"
+	dst_path = os.path.join(output_dir, gcode_name)
+	generate(design_type, params['a'], params['b'], CTS, params['xr'], params['yr'], params['zr'], dst_path)
+	return gcode_name
+
+
+def generate_thumbnail(output_dir, design_type, params, i):
+	"""Renders the PNG preview of a design from its .gcode file (or its generator when there is none)."""
+	from thumbnails import design_moves, render_thumbnail
+
+	png_name = f"{design_type.lower()}_{i + 1}.png"
+	gcode_path = os.path.join(output_dir, f"{design_type.lower()}_{i + 1}.gcode")
+	if os.path.exists(gcode_path):
+		source = gcode_path
+	else:
+		source = design_moves(design_type, params['a'], params['b'], params['xr'], params['yr'], params['zr'])
+	render_thumbnail(source, os.path.join(output_dir, png_name))
+	return png_name
+
+
+def generate_inp(output_dir, design_type, params, i, stacking="merge"):
+	"""
+				Writes the .inp file of a design with one Abaqus CAE run of abaqus_wrapper.py.
+				stacking is how auxetic_FEM builds the layers, one of its STACKINGS.
+	"""
+	inp_name = f"{design_type.lower()}_{i + 1}.inp"
+	# a folder of its own: the CAE runs of a batch overlap and each writes abaqus.rpy and its job files
+	work_dir = cae_work_dir()
+	try:
+		args = cae_command() + [design_type] + [str(params[name]) for name in ('a', 'b', 'd', 'xr', 'yr', 'zr')] + \
+			[str(i + 1), stacking]
+		subprocess.run(args, check=True, cwd=work_dir, env=cae_environment())
+
+		src_path = os.path.join(work_dir, inp_name)
+		if not os.path.exists(src_path):
+			raise RuntimeError(f"Abaqus CAE did not write {inp_name}")
+		shutil.move(src_path, os.path.join(output_dir, inp_name))
+	finally:
+		shutil.rmtree(work_dir, ignore_errors=True)
+
+	return inp_name
+
+
+def generate_inp_native(output_dir, design_type, params, i):
+	"""Writes the .inp file of a design with inp_writer.py, without launching Abaqus CAE."""
+	from inp_writer import generate
+
+	inp_name = f"{design_type.lower()}_{i + 1}.inp"
+	generate(design_type, params['a'], params['b'], params['d'], params['xr'], params['yr'], params['zr'], i + 1,
+			 os.path.join(output_dir, inp_name))
+	return inp_name
+
+
+def generate_inp_pool(pool, output_dir, design_type, rows, cache=None, journal=None, stacking="merge"):
+	"""
+				Writes the .inp files of rows on the kernels of a CAEWorkerPool.
+
+				Args:
+					- pool (CAEWorkerPool): running Abaqus CAE kernels
+					- output_dir (str): session folder
+					- design_type (str): HCELL, SREG, SINV or STRI
+					- rows (dict): row index -> dict of a, b, d, xr, yr, zr
+					- cache (ArtifactCache): files are taken from and stored in it, None for none
+					- journal (SessionJournal): every finished file is logged to it, None for none
+					- stacking (str): how auxetic_FEM builds the layers, one of its STACKINGS
+
+				Returns:
+					- dict: row index -> error message of every failed row
+	"""
+	failed = {}
+	jobs = []
+	for i, params in rows.items():
+		name = f"{design_type.lower()}_{i + 1}.inp"
+		path = os.path.abspath(os.path.join(output_dir, name))
+		# the same file as one CAE run per row writes
+		key = artifact_key("inp", design_type, dict(params, writer="abaqus", stacking=stacking)) if cache is not None else None
+		if cache is not None and cache.fetch(key, ".inp", path):
+			if journal is not None:
+				journal.record(i, params, name)
+			continue
+		jobs.append(dict({name: str(params[name]) for name in ('a', 'b', 'd', 'xr', 'yr', 'zr')},
+						 design=design_type, id=i + 1, output=path, stacking=stacking, key=key))
+
+	def on_done(job, error):
+		i = job["id"] - 1
+		if error is not None:
+			failed[i] = error
+			return
+		if cache is not None:
+			cache.store(job["key"], ".inp", job["output"])
+		if journal is not None:
+			journal.record(i, rows[i], os.path.basename(job["output"]))
+
+	pool.run(jobs, on_done)
+	return failed
+
+
+def file_checksum(path):
+	digest = hashlib.sha256()
+	with open(path, "rb") as file:
+		for block in iter(lambda: file.read(1 << 20), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+
+class SessionJournal:
+	"""
+				Append-only JSON Lines log of a session, one line per finished artifact
+				or failed row, written as soon as it happens.
+
+				Each line is appended with a single O_APPEND write, so the workers of a
+				batch can share the journal, and synced to disk, so it survives a
+				crash of the batch. A truncated last line is ignored when reading.
+	"""
+
+	def __init__(self, output_dir):
+		self.output_dir = output_dir
+		self.path = os.path.join(output_dir, JOURNAL_NAME)
+
+	def append(self, entry):
+		entry = dict(entry, time=datetime.datetime.now().isoformat(timespec="seconds"))
+		fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+		try:
+			line = (json.dumps(entry) + "\n").encode()
+			size = os.fstat(fd).st_size
+			if size and os.pread(fd, 1, size - 1) != b"\n":
+				line = b"\n" + line  # after a line cut off by a crash
+			os.write(fd, line)
+			os.fsync(fd)
+		finally:
+			os.close(fd)
+
+	def record(self, i, params, name):
+		"""Logs a finished artifact of row i with its parameters and checksum."""
+		checksum = file_checksum(os.path.join(self.output_dir, name))
+		self.append({"row": i, "status": "done", "file": name, "sha256": checksum, "params": params})
+
+	def record_failure(self, i, params, error):
+		self.append({"row": i, "status": "failed", "error": f"{type(error).__name__}: {error}", "params": params})
+
+	def entries(self):
+		try:
+			with open(self.path) as journal:
+				lines = journal.readlines()
+		except FileNotFoundError:
+			return []
+		entries = []
+		for line in lines:
+			try:
+				entries.append(json.loads(line))
+			except ValueError:
+				continue  # cut off by a crash
+		return entries
+
+	def finished(self):
+		"""Returns row -> set of the file names finished and still unchanged on disk."""
+		finished = {}
+		for entry in self.entries():
+			if entry.get("status") != "done":
+				continue
+			path = os.path.join(self.output_dir, entry["file"])
+			if os.path.exists(path) and file_checksum(path) == entry["sha256"]:
+				finished.setdefault(entry["row"], set()).add(entry["file"])
+		return finished
+
+
+def create_session_folder():
+	timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+	folder_path = os.path.join("output", f"session_{timestamp}")
+	os.makedirs(folder_path, exist_ok=True)
+	return folder_path, timestamp
+
+
+# === BATCH EXECUTION ===
+def generate_cached(kind, generator, output_dir, design_type, params, i, cache=None, key_params=None):
+	"""Runs generator(output_dir, design_type, params, i) unless the artifact is in the cache."""
+	if cache is None:
+		return generator(output_dir, design_type, params, i)
+	ext = "." + kind
+	name = f"{design_type.lower()}_{i + 1}{ext}"
+	dst_path = os.path.join(output_dir, name)
+	key = artifact_key(kind, design_type, key_params or params)
+	if not cache.fetch(key, ext, dst_path):
+		if os.path.exists(dst_path):
+			os.remove(dst_path)  # may be a link to a cache entry: write a new file, not through it
+		generator(output_dir, design_type, params, i)
+		cache.store(key, ext, dst_path)
+	return name
+
+
+def design_files(design_type, i, gcode=True, inp=False, thumbnail=True):
+	"""Returns the names of the files generate_design writes for row i."""
+	stem = f"{design_type.lower()}_{i + 1}"
+	kinds = (["gcode"] + (["png"] if thumbnail else []) if gcode else []) + (["inp"] if inp else [])
+	return [f"{stem}.{kind}" for kind in kinds]
+
+
+def generate_design(output_dir, design_type, params, i, gcode=True, inp=False, cache=None, thumbnail=True, journal=None, done=(),
+					inp_writer="abaqus", stacking="merge"):
+	"""
+				Generates the requested files of one design row and returns their names.
+
+				Files named in done are left as they are. Every other file is logged to
+				the SessionJournal, when given, as soon as it is written. inp_writer is
+				one of INP_WRITERS, stacking one of the STACKINGS of auxetic_FEM (Abaqus
+				CAE only, inp_writer.py always copies the layers).
+	"""
+	generators = []
+	if gcode:
+		from gcode_wrapper import CTS
+
+		key_params = dict(params, cts=CTS)
+		generators.append(("gcode", generate_gcode, key_params))
+		if thumbnail:
+			generators.append(("png", generate_thumbnail, key_params))
+	if inp:
+		if inp_writer not in INP_WRITERS:
+			raise ValueError(f"unknown .inp writer {inp_writer}")
+		# a single row is written by one CAE run in "pool" mode too: run_batch owns the pools
+		if inp_writer == "native":
+			generators.append(("inp", generate_inp_native, dict(params, writer="native")))
+		else:
+			generators.append(("inp", functools.partial(generate_inp, stacking=stacking),
+							   dict(params, writer="abaqus", stacking=stacking)))
+
+	generated_files = []
+	for (kind, generator, key_params), name in zip(generators, design_files(design_type, i, gcode, inp, thumbnail)):
+		if name not in done:
+			generate_cached(kind, generator, output_dir, design_type, params, i, cache, key_params)
+			if journal is not None:
+				journal.record(i, params, name)
+		generated_files.append(name)
+	return generated_files
+
+
+def run_batch(output_dir, design_type, param_combinations, gcode=True, inp=False, workers=None, cache=None, thumbnail=True, journal=None,
+			  inp_writer="abaqus", cae_workers=None, stacking="merge"):
+	"""
+				Generates every design row, fanned out over a process pool.
+
+				With a SessionJournal the rows whose files are all logged as finished
+				(and unchanged on disk) are skipped, so a batch that crashed or failed
+				can be resumed by running it again on the same session folder. A failed
+				row is logged and the other rows carry on; RuntimeError is raised at the
+				end if any row failed. Without a journal the first failure is raised.
+
+				Args:
+					- output_dir (str): session folder
+					- design_type (str): HCELL, SREG, SINV or STRI
+					- param_combinations (list): one dict of a, b, d, xr, yr, zr per row
+					- gcode, inp (bool): file types to generate
+					- workers (int): pool size of the G-code (and inp_writer.py) rows, None for one
+					  per CPU core, 1 to run in this process
+					- cache (ArtifactCache): reuse files generated by earlier sessions, None to regenerate
+					- thumbnail (bool): write a PNG preview next to every .gcode file
+					- journal (SessionJournal): log of the session, None for none
+					- inp_writer (str): "abaqus" to run Abaqus CAE per row, "pool" to share a few
+					  persistent CAE kernels (CAEWorkerPool) among the rows, "native" for inp_writer.py
+					- cae_workers (int): Abaqus CAE runs at a time of the "abaqus" writer, or kernels of
+					  the "pool" writer, None for CAE_WORKERS
+					- stacking (str): "merge" to build the layers of the Abaqus CAE writers with a
+					  BooleanMerge, "copy" to mesh one layer and copy it (auxetic_FEM.STACKINGS)
+
+				Returns:
+					- list: the generated file names of every row, in row order
+	"""
+	finished = journal.finished() if journal is not None else {}
+	results = [None] * len(param_combinations)
+	pending = []
+	for i in range(len(param_combinations)):
+		names = design_files(design_type, i, gcode, inp, thumbnail)
+		if set(names) <= finished.get(i, set()):
+			results[i] = names
+		else:
+			pending.append(i)
+
+	cae_pool = None
+	if inp and inp_writer == "pool" and pending:
+		# the kernels start up while the G-code is generated, then take the .inp files
+		cae_pool = CAEWorkerPool(min(cae_workers or CAE_WORKERS, len(pending)))
+	# every "abaqus" row launches Abaqus CAE and checks out a license token: those get their own,
+	# smaller pool after the G-code, the cheap inp_writer.py rows go along with the G-code
+	inp_with_gcode = inp and inp_writer == "native"
+
+	failed = []
+
+	def collect(i, result):
+		try:
+			results[i] = result()
+		except Exception as e:
+			if journal is None:
+				raise
+			journal.record_failure(i, param_combinations[i], e)
+			failed.append(i)
+
+	def fan_out(rows, size, row_gcode, row_inp):
+		size = max(1, min(size, len(rows)))
+		job = {i: (output_dir, design_type, param_combinations[i], i, row_gcode, row_inp, cache, thumbnail,
+				   journal, frozenset(finished.get(i, ())), inp_writer, stacking) for i in rows}
+		if size == 1:
+			for i in rows:
+				collect(i, lambda: generate_design(*job[i]))
+		else:
+			import concurrent.futures
+
+			with concurrent.futures.ProcessPoolExecutor(max_workers=size) as executor:
+				futures = {executor.submit(generate_design, *job[i]): i for i in rows}
+				for future in concurrent.futures.as_completed(futures):
+					collect(futures[future], future.result)
+
+	try:
+		if gcode or inp_with_gcode:
+			fan_out(pending, workers or os.cpu_count() or 1, gcode, inp_with_gcode)
+
+		if inp and inp_writer == "abaqus":
+			rows = [i for i in pending if i not in failed]
+			if rows:
+				fan_out(rows, cae_workers or CAE_WORKERS, False, True)
+
+		if cae_pool is not None:
+			rows = {i: param_combinations[i] for i in pending
+					if i not in failed and f"{design_type.lower()}_{i + 1}.inp" not in finished.get(i, ())}
+			for i, error in generate_inp_pool(cae_pool, output_dir, design_type, rows, cache, journal, stacking).items():
+				if journal is None:
+					raise RuntimeError(f"row {i + 1}: {error}")
+				journal.record_failure(i, param_combinations[i], RuntimeError(error))
+				failed.append(i)
+	finally:
+		if cae_pool is not None:
+			cae_pool.close()
+
+	for i in pending:
+		if i not in failed:
+			results[i] = design_files(design_type, i, gcode, inp, thumbnail)
+
+	if failed:
+		rows = ", ".join(str(i + 1) for i in sorted(failed))
+		raise RuntimeError(f"{len(failed)} of {len(param_combinations)} rows failed (rows {rows}), see {journal.path}")
+	return results
+
+
+def session_rows(metadata):
+	"""Returns the parameter rows of a session's metadata, in the row order of the file names."""
+	parameters = metadata["parameters"]
+	if metadata["input_mode"] == "position":
+		values = zip(*parameters.values())
+	else:
+		values = itertools.product(*parameters.values())
+	return [dict(zip(parameters.keys(), row)) for row in values]
+
+
+def read_metadata(output_dir):
+	with open(os.path.join(output_dir, "metadata.json")) as meta_file:
+		return json.load(meta_file)
+
+
+def write_metadata(output_dir, metadata):
+	"""Writes metadata.json; it is replaced atomically, as it is written again when a session ends."""
+	path = os.path.join(output_dir, "metadata.json")
+	with open(path + ".tmp", "w") as meta_file:
+		json.dump(metadata, meta_file, indent=2)
+	os.replace(path + ".tmp", path)
@@ -0,0 +1,74 @@
+"""
+Cost per line of PrintTransformation.write as a batch process runs more jobs.
+
+Every job creates its own PrintTransformation, swaps X and Y, maps Y to the
+rotational axis and writes the same lines (write: the whole line including
+the rotation, rename: the axis rename step alone). The legacy column replays
+the old rename step: one list shared by the class, growing with every job and
+applied with one str.replace per pair.
+
+	python benchmarks/axis_rename.py
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "G-code_scripts"))
+
+from Strategy.print_transformation import PrintTransformation
+
+LINES = [f"G1 X{0.1 * n} Y{-0.2 * n} F150" for n in range(200)] + ["; layer comment"] * 20
+SWAP_LIST = [('X', 'W'), ('Y', 'X'), ('W', 'Y')]
+
+
+def new_transformation():
+	t = PrintTransformation(io.StringIO())
+	t.set_rotate_angle(60)
+	t.swapxy(True)
+	t.set_rotational_axis('Y')
+	return t
+
+
+def run_job():
+	t = new_transformation()
+	for line in LINES:
+		t.write(line)
+
+
+def run_rename_job():
+	t = new_transformation()
+	out = io.StringIO()
+	for line in LINES:
+		out.write(t.rename(line) + '\n')
+
+
+shared_rename_list = []
+
+
+def run_legacy_job():
+	shared_rename_list.extend(SWAP_LIST)
+	shared_rename_list.append(('Y', 'U'))
+	out = io.StringIO()
+	for line in LINES:
+		for rename_pair in shared_rename_list:
+			line = line.replace(rename_pair[0], rename_pair[1])
+		out.write(line + '\n')
+
+
+def per_line(job, jobs):
+	start = time.perf_counter()
+	for _ in range(jobs):
+		job()
+	return (time.perf_counter() - start) / (jobs * len(LINES)) * 1e9
+
+
+if __name__ == '__main__':
+	print(f"{'jobs':>6} {'write [ns/line]':>16} {'rename [ns/line]':>17} {'legacy rename [ns/line]':>24}")
+	done = 0
+	for jobs in (1, 10, 100, 1000):
+		write = per_line(run_job, jobs - done)
+		rename = per_line(run_rename_job, jobs - done)
+		legacy = per_line(run_legacy_job, jobs - done)
+		done = jobs
+		print(f"{jobs:>6} {write:>16.0f} {rename:>17.0f} {legacy:>24.0f}")
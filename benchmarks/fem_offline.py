@@ -0,0 +1,81 @@
+"""
+Time of the auxetic_FEM design functions as the repetitions grow, run on the
+offline stand-in for the Abaqus API (scripts/FEM_scripts/offline_abaqus).
+
+mesh is the time of generateMesh and write that of Job.writeInput, both done
+by the stand-in; script is the rest, the Python of auxetic_FEM itself (sketch,
+node table, set building and constraint creation), which is what runs the same
+way inside Abaqus CAE. --copy builds the layers with stacking='copy' (one
+meshed layer copied into an orphan mesh) instead of the BooleanMerge.
+
+	python benchmarks/fem_offline.py
+	python benchmarks/fem_offline.py STRI HCELL
+	python benchmarks/fem_offline.py --copy SREG
+	python -m cProfile -s cumtime benchmarks/fem_offline.py SREG
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+FEM_SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "FEM_scripts")
+sys.path.insert(0, FEM_SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(FEM_SCRIPTS_DIR, "offline_abaqus"))
+
+import abaqus
+import auxetic_FEM
+
+A, B, DIAMETER = 200.0, 100.0, 20.0
+REPETITIONS = ((2, 2, 2), (4, 4, 2), (8, 8, 2), (16, 16, 2), (32, 32, 2), (8, 8, 4), (8, 8, 8))
+DESIGNS = {"HCELL": auxetic_FEM.hcell, "SREG": auxetic_FEM.sreg, "SINV": auxetic_FEM.sinv, "STRI": auxetic_FEM.stri}
+
+timings = {}
+
+
+def timed(name, method):
+	def wrapper(*args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return method(*args, **kwargs)
+		finally:
+			timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+	return wrapper
+
+
+abaqus.Part.generateMesh = timed("mesh", abaqus.Part.generateMesh)
+abaqus.Job.writeInput = timed("write", abaqus.Job.writeInput)
+
+
+def run(design, x_rep, y_rep, z_rep, stacking):
+	timings.clear()
+	abaqus.Mdb()
+	start = time.perf_counter()
+	DESIGNS[design](A, B, DIAMETER, x_rep, y_rep, z_rep, 1, stacking)
+	total = time.perf_counter() - start
+	model = abaqus.mdb.models["auxetic_model"]
+	part = model.parts["merged_part"]
+	return (len(part.nodes), len(part.elements), len(model.constraints),
+			timings["mesh"], total - timings["mesh"] - timings["write"], timings["write"])
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Time the auxetic_FEM designs on the offline Abaqus stand-in.')
+	parser.add_argument('designs', nargs='*', type=str.upper, metavar='DESIGN',
+						help='designs to time: %s (default all)' % ', '.join(DESIGNS))
+	parser.add_argument('--copy', action='store_true', help="build the layers with stacking='copy'")
+	args = parser.parse_args()
+	unknown = [name for name in args.designs if name not in DESIGNS]
+	if unknown:  # not choices=: an empty nargs='*' list fails that check
+		parser.error(f"unknown design {', '.join(unknown)} (choose from {', '.join(DESIGNS)})")
+	stacking = 'copy' if args.copy else 'merge'
+	designs = args.designs or list(DESIGNS)
+	print(f"{'design':>6} {'reps':>8} {'nodes':>7} {'elements':>8} {'constraints':>11} "
+		  f"{'mesh [s]':>9} {'script [s]':>10} {'write [s]':>9}")
+	with tempfile.TemporaryDirectory() as folder:
+		os.chdir(folder)  # writeInput writes <job>.inp in the working directory
+		for design in designs:
+			for x_rep, y_rep, z_rep in REPETITIONS:
+				nodes, elements, constraints, mesh, script, write = run(design, x_rep, y_rep, z_rep, stacking)
+				print(f"{design:>6} {f'{x_rep}x{y_rep}x{z_rep}':>8} {nodes:>7} {elements:>8} {constraints:>11} "
+					  f"{mesh:>9.3f} {script:>10.3f} {write:>9.3f}")
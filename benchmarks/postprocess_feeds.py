@@ -0,0 +1,47 @@
+"""
+Check of the feeds written by postprocess.py: every design is generated and
+run through the U-turn and cloverleaf strategies, and no output line may
+carry F0 (a move without its own F runs at the last F of the stream, which
+the strategies have to repeat on the moves they write).
+
+Exits with status 1 and lists the offending lines when one is found.
+
+	python benchmarks/postprocess_feeds.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "G-code_scripts"))
+
+from gcode_wrapper import generate
+from postprocess import parse_args, postprocess, stages_from_args
+
+DESIGNS = ("hcell", "sreg", "sinv", "stri")
+A, B, DIAMETER, X_REP, Y_REP, Z_REP = 200, 100, 150, 3, 3, 2
+STRATEGIES = (["--uturn", "0.3"], ["--uturn", "0.3", "--uturn-speed", "50"],
+			  ["--cloverleaf", "0.1"], ["--cloverleaf2", "0.1"])
+ZERO_FEED = re.compile(r"\bF0*(\.0*)?(\s|;|$)")
+MAX_REPORTED = 5  # lines listed per file
+
+
+if __name__ == '__main__':
+	failures = 0
+	print(f"{'design':>6} {'strategy':<32} {'lines':>7} {'F0 lines':>8}")
+	with tempfile.TemporaryDirectory() as folder:
+		for design in DESIGNS:
+			source = os.path.join(folder, design + ".gcode")
+			generate(design, A, B, DIAMETER, X_REP, Y_REP, Z_REP, source)
+			for options in STRATEGIES:
+				target = os.path.join(folder, "out.gcode")
+				strategy, transformation = stages_from_args(parse_args([source, target] + options))
+				postprocess(source, target, strategy, transformation)
+				with open(target) as file:
+					lines = file.read().splitlines()
+				zero = [line for line in lines if ZERO_FEED.search(line)]
+				failures += len(zero)
+				print(f"{design:>6} {' '.join(options):<32} {len(lines):>7} {len(zero):>8}")
+				for line in zero[:MAX_REPORTED]:
+					print(f"{'':>8}{line}")
+	sys.exit(1 if failures else 0)
@@ -0,0 +1,186 @@
+import collections
+import json
+import os
+import selectors
+import shlex
+import shutil
+import socket
+import subprocess
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FEM_SCRIPTS_DIR = os.path.join(BASE_DIR, "scripts", "FEM_scripts")
+
+WRAPPER_NAME = "abaqus_wrapper.py"
+DEFAULT_CAE_COMMAND = f"abaqus cae noGUI={WRAPPER_NAME} --"
+CAE_WORKERS = 2  # Abaqus CAE runs at a time or kernels of a pool, each holds a license token
+STOP_TIMEOUT = 60  # [s] for a kernel to exit once it is told to
+
+
+def cae_command():
+	"""
+				Returns the command that runs abaqus_wrapper.py, as a list for
+				subprocess (no shell).
+
+				AUXETIC_CAE_COMMAND replaces the default "abaqus cae noGUI=...", e.g.
+				"python abaqus_wrapper.py" with scripts/FEM_scripts/offline_abaqus on
+				PYTHONPATH to run without a license. A relative path to
+				abaqus_wrapper.py is taken from scripts/FEM_scripts, as every run has
+				a working directory of its own (cae_work_dir).
+	"""
+	command = shlex.split(os.environ.get("AUXETIC_CAE_COMMAND", DEFAULT_CAE_COMMAND))
+	command[0] = shutil.which(command[0]) or command[0]  # abaqus.bat on Windows
+	for k, word in enumerate(command):
+		option, equals, path = word.rpartition("=")
+		if os.path.basename(path) == WRAPPER_NAME and not os.path.isabs(path):
+			command[k] = option + equals + os.path.join(FEM_SCRIPTS_DIR, path)
+	return command
+
+
+def cae_environment():
+	"""
+				Returns the environment of an Abaqus CAE run: scripts/FEM_scripts first
+				on PYTHONPATH, for auxetic_FEM and node_sets, and the relative entries
+				already there taken from scripts/FEM_scripts too.
+	"""
+	paths = [FEM_SCRIPTS_DIR]
+	for path in os.environ.get("PYTHONPATH", "").split(os.pathsep):
+		if path:
+			paths.append(os.path.join(FEM_SCRIPTS_DIR, path))
+	return dict(os.environ, PYTHONPATH=os.pathsep.join(paths))
+
+
+def cae_work_dir():
+	"""
+				Returns a new, empty working directory for an Abaqus CAE run: its job
+				files and abaqus.rpy stay apart from the other runs; delete it when done.
+	"""
+	return tempfile.mkdtemp(prefix="auxetic_cae_")
+
+
+class CAEWorkerPool:
+	"""
+				Persistent Abaqus CAE kernels that write the .inp files of many designs.
+
+				Each kernel runs abaqus_wrapper.py in worker mode and connects back to a
+				local socket of this pool, then takes one design row at a time and
+				resets the model database before each. Every kernel works in a
+				directory of its own (cae_work_dir), so pools running at the same time
+				do not share job files. A kernel that dies only fails the row it was
+				writing. Idle kernels are kept for the next run() and stopped by close(),
+				which deletes the directories.
+
+					with CAEWorkerPool(4) as pool:
+						pool.run(rows, on_done)
+	"""
+
+	def __init__(self, workers=CAE_WORKERS, command=None):
+		self.server = socket.create_server(("127.0.0.1", 0))
+		self.server.setblocking(False)
+		host, port = self.server.getsockname()[:2]
+		command = (command or cae_command()) + ["worker", host, str(port)]
+		# the kernels start up (and check out their licenses) from here on, in the background
+		self.work_dirs = [cae_work_dir() for _ in range(workers)]
+		environment = cae_environment()
+		self.processes = [subprocess.Popen(command, cwd=work_dir, env=environment) for work_dir in self.work_dirs]
+		self.selector = selectors.DefaultSelector()
+		self.selector.register(self.server, selectors.EVENT_READ)
+		self.buffers = {}
+		self.idle = collections.deque()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def alive(self):
+		return any(process.poll() is None for process in self.processes)
+
+	def run(self, rows, on_done):
+		"""
+					Writes the .inp file of every row, on whichever kernel is free.
+
+					Args:
+						- rows (list): dicts of design, a, b, d, xr, yr, zr, id (the job number)
+						  and output (path of the .inp file)
+						- on_done (callable): on_done(row, error) as soon as a row is
+						  finished, error is None or the message of its failure
+		"""
+		queue = collections.deque(rows)
+		busy = {}  # connection -> its row
+		while queue and self.idle:
+			self._send(self.idle.popleft(), queue, busy)
+		while queue or busy:
+			if not busy and not self.buffers and not self.alive():
+				while queue:
+					on_done(queue.popleft(), "no Abaqus CAE worker is running (see its output above)")
+				break
+			for key, _ in self.selector.select(timeout=1.0):
+				if key.fileobj is self.server:
+					connection, _ = self.server.accept()
+					self.buffers[connection] = b""
+					self.selector.register(connection, selectors.EVENT_READ)
+					continue
+				connection = key.fileobj
+				data = connection.recv(1 << 16)
+				if not data:
+					self._drop(connection)
+					row = busy.pop(connection, None)
+					if row is not None:
+						on_done(row, "the Abaqus CAE worker exited while writing this design")
+					continue
+				self.buffers[connection] += data
+				while b"\n" in self.buffers.get(connection, b""):
+					line, self.buffers[connection] = self.buffers[connection].split(b"\n", 1)
+					reply = json.loads(line)
+					row = busy.pop(connection, None)
+					if row is not None:
+						on_done(row, None if reply.get("status") == "done" else reply.get("error", "failed"))
+					if queue:
+						self._send(connection, queue, busy)
+					else:
+						self.idle.append(connection)
+
+	def _send(self, connection, queue, busy):
+		row = queue.popleft()
+		busy[connection] = row
+		connection.sendall((json.dumps(row) + "\n").encode())
+
+	def _drop(self, connection):
+		self.selector.unregister(connection)
+		self.buffers.pop(connection, None)
+		if connection in self.idle:
+			self.idle.remove(connection)
+		connection.close()
+
+	def close(self):
+		"""
+					Stops the kernels: connected ones are told to exit, those still
+					starting up find the socket closed and exit on their own, the others
+					are killed after STOP_TIMEOUT.
+		"""
+		while True:
+			try:
+				connection, _ = self.server.accept()
+			except BlockingIOError:
+				break
+			self.buffers[connection] = b""
+			self.selector.register(connection, selectors.EVENT_READ)
+		self.selector.unregister(self.server)
+		self.server.close()
+		for connection in list(self.buffers):
+			try:
+				connection.sendall(b"null\n")
+			except OSError:
+				pass
+			self._drop(connection)
+		for process in self.processes:
+			try:
+				process.wait(timeout=STOP_TIMEOUT)
+			except subprocess.TimeoutExpired:
+				process.kill()
+				process.wait()
+		self.selector.close()
+		for work_dir in self.work_dirs:
+			shutil.rmtree(work_dir, ignore_errors=True)
@@ -1,68 +1,14 @@
-import datetime
 import glob
 import itertools
 import json
 import os
-import shutil
-import subprocess
 import sys
 
 from PyQt6 import QtWidgets, QtGui, QtCore
 
-
-# === FILE GENERATORS ===
-def generate_gcode(output_dir, design_type, params, i):
-	current_dir = os.getcwd()
-	try:
-		script_dir = os.path.join(current_dir, "scripts/G-code_scripts")
-		output_dir = os.path.join(current_dir, output_dir)
-		os.chdir(script_dir)
-
-		os.system(f"python gcode_wrapper.py {design_type} {str(params['a'])} {str(params['b'])} {str(params['d'])} {str(params['xr'])} {str(params['yr'])} {str(params['zr'])} {str(i+1)}")
-
-		gcode_name = f"{design_type.lower()}_{i + 1}.gcode"
-		src_path = os.path.join(script_dir, gcode_name)
-		dst_path = os.path.join(output_dir, gcode_name)
-
-		shutil.move(src_path, dst_path)
-
-	finally:
-		os.chdir(current_dir)
-
-
-def generate_inp(output_dir, design_type, params, i):
-	current_dir = os.getcwd()
-	try:
-		script_dir = os.path.join(current_dir, "scripts/FEM_scripts")
-		output_dir = os.path.join(current_dir, output_dir)
-		os.chdir(script_dir)
-		args = (
-			f"abaqus cae noGUI=abaqus_wrapper.py -- {design_type} {str(params['a'])} {str(params['b'])} {str(params['d'])} {str(params['xr'])} {str(params['yr'])} {str(params['zr'])} {str(i+1)}"
-		)
-		subprocess.run(args, shell=True, check=True)
-
-		inp_name = f"{design_type.lower()}_{i+1}.inp"
-		src_path = os.path.join(script_dir, inp_name)
-		dst_path = os.path.join(output_dir, inp_name)
-
-		shutil.move(src_path, dst_path)
-
-		if os.path.exists(dst_path):
-			rpy_path = os.path.join(script_dir, "abaqus.rpy")
-			if os.path.exists(rpy_path):
-				os.remove(rpy_path)
-		else:
-			raise RuntimeError(f"INP file was not successfully moved to: {dst_path}")
-
-	finally:
-		os.chdir(current_dir)
-
-
-def create_session_folder():
-	timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-	folder_path = os.path.join("output", f"session_{timestamp}")
-	os.makedirs(folder_path, exist_ok=True)
-	return folder_path, timestamp
+from artifact_cache import ArtifactCache
+from batch import SessionJournal, create_session_folder, generate_design, run_batch, write_metadata
+from toolpath_viewer import ToolpathPreview
 
 
 def find_rscript():
@@ -88,7 +34,7 @@ class ManualDesignWindow(QtWidgets.QWidget):
 	def __init__(self):
 		super().__init__()
 		self.setWindowTitle("Manual Mode")
-		self.setGeometry(100, 100, 650, 450)
+		self.setGeometry(100, 100, 1150, 600)
 		self.layout = QtWidgets.QVBoxLayout()
 
 		# Design type dropdown with image
@@ -132,11 +78,26 @@ class ManualDesignWindow(QtWidgets.QWidget):
 		self.gcode_check = QtWidgets.QCheckBox("Generate G-code")
 		self.inp_check = QtWidgets.QCheckBox("Generate ABAQUS .inp")
 
+		# Worker processes of the batch
+		self.workers_layout = QtWidgets.QHBoxLayout()
+		self.workers_label = QtWidgets.QLabel("Worker processes:")
+		self.workers_spin = QtWidgets.QSpinBox()
+		self.workers_spin.setRange(1, max(os.cpu_count() or 1, 1))
+		self.workers_spin.setValue(os.cpu_count() or 1)
+		self.workers_layout.addWidget(self.workers_label)
+		self.workers_layout.addWidget(self.workers_spin)
+
 		# Preview table
 		self.preview_label = QtWidgets.QLabel("Preview of Parameter Combinations:")
 		self.preview_table = QtWidgets.QTableWidget()
 		self.preview_table.setColumnCount(6)
 		self.preview_table.setHorizontalHeaderLabels(['a', 'b', 'd', 'xr', 'yr', 'zr'])
+		self.preview_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+		self.preview_table.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+		self.preview_table.itemSelectionChanged.connect(self.update_toolpath_preview)
+
+		# Toolpath of the selected combination
+		self.toolpath_preview = ToolpathPreview()
 
 		# Generate button
 		self.generate_button = QtWidgets.QPushButton("Generate Files")
@@ -152,12 +113,17 @@ class ManualDesignWindow(QtWidgets.QWidget):
 		self.layout.addWidget(self.input_mode_group)
 		self.layout.addWidget(self.gcode_check)
 		self.layout.addWidget(self.inp_check)
+		self.layout.addLayout(self.workers_layout)
 		self.layout.addWidget(self.preview_label)
 		self.layout.addWidget(self.preview_table)
 		self.layout.addWidget(self.generate_button)
 		self.layout.addWidget(self.status_label)
 
-		self.setLayout(self.layout)
+		self.main_layout = QtWidgets.QHBoxLayout()
+		self.main_layout.addLayout(self.layout)
+		self.main_layout.addWidget(self.toolpath_preview, 1)
+		self.setLayout(self.main_layout)
+		self.design_type_combo.currentTextChanged.connect(self.update_toolpath_preview)
 		self.position_mode.toggled.connect(self.update_preview)
 		self.combination_mode.toggled.connect(self.update_preview)
 		self.update_preview()
@@ -196,6 +162,21 @@ class ManualDesignWindow(QtWidgets.QWidget):
 		for row_idx, combo in enumerate(combinations):
 			for col_idx, key in enumerate(['a', 'b', 'd', 'xr', 'yr', 'zr']):
 				self.preview_table.setItem(row_idx, col_idx, QtWidgets.QTableWidgetItem(combo.get(key, "")))
+		self.update_toolpath_preview()
+
+	def update_toolpath_preview(self):
+		combinations, _ = self.get_param_combinations()
+		rows = self.preview_table.selectionModel().selectedRows()
+		if not rows or rows[0].row() >= len(combinations):
+			self.toolpath_preview.clear()
+			return
+		params = combinations[rows[0].row()]
+		try:
+			values = float(params['a']), float(params['b']), int(params['xr']), int(params['yr']), int(params['zr'])
+		except ValueError:
+			self.toolpath_preview.clear()
+			return
+		self.toolpath_preview.show_design(self.design_type_combo.currentText(), *values)
 
 	def generate_files(self):
 		design_type = self.design_type_combo.currentText()
@@ -208,26 +189,29 @@ class ManualDesignWindow(QtWidgets.QWidget):
 			return
 
 		output_dir, timestamp = create_session_folder()
-		generated_files = []
-
-		for i, params in enumerate(param_combinations):
-			if generate_g:
-				generate_gcode(output_dir, design_type, params, i)
-				generated_files.append(f"{design_type.lower()}_{i}.gcode")
-			if generate_i:
-				generate_inp(output_dir, design_type, params, i)
-				generated_files.append(f"{design_type.lower()}_{i}.inp")
+		self.status_label.setText(f"Generating {len(param_combinations)} designs...")
+		QtWidgets.QApplication.processEvents()
 
-		# Write metadata.json
+		# metadata.json is written first so that an interrupted session can be resumed
 		metadata = {
 			"design_type": design_type,
 			"input_mode": "position" if self.position_mode.isChecked() else "combinations",
 			"parameters": param_lists,
 			"timestamp": timestamp,
-			"output_files": generated_files
+			"outputs": {"gcode": generate_g, "inp": generate_i, "thumbnail": True},
+			"output_files": []
 		}
-		with open(os.path.join(output_dir, "metadata.json"), "w") as meta_file:
-			json.dump(metadata, meta_file, indent=2)
+		write_metadata(output_dir, metadata)
+
+		try:
+			results = run_batch(output_dir, design_type, param_combinations, generate_g, generate_i,
+								workers=self.workers_spin.value(), cache=ArtifactCache.from_env(),
+								journal=SessionJournal(output_dir))
+		except RuntimeError as e:
+			self.status_label.setText(f"{e}\nRetry the failed rows with: python auxetic.py batch --resume {output_dir}")
+			return
+		metadata["output_files"] = [name for files in results for name in files]
+		write_metadata(output_dir, metadata)
 
 		self.status_label.setText(f"Files and metadata saved in {output_dir}")
 
@@ -363,6 +347,7 @@ class InverseDesignWindow(QtWidgets.QWidget):
 			return
 
 		output_dir, timestamp = create_session_folder()
+		cache = ArtifactCache.from_env()
 		for idx, model in enumerate(selected_indexes):
 			entry = self.designs[model.row()]
 			params = {
@@ -374,10 +359,8 @@ class InverseDesignWindow(QtWidgets.QWidget):
 				"zr": 10
 			}
 
-			if self.gcode_check.isChecked():
-				generate_gcode(output_dir, str(entry["design"]).upper(), params, idx)
-			if self.inp_check.isChecked():
-				generate_inp(output_dir, str(entry["design"]).upper(), params, idx)
+			generate_design(output_dir, str(entry["design"]).upper(), params, idx,
+							self.gcode_check.isChecked(), self.inp_check.isChecked(), cache)
 
 		self.result_label.setText(f"Files saved in {output_dir}")
 
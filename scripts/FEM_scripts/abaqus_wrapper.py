@@ -1,25 +1,55 @@
+import json
+import shutil
+import socket
 import sys
 from abaqus import *
 from abaqusConstants import *
-from auxetic_FEM import hcell, sreg, sinv, stri
+from auxetic_FEM import STACKINGS, hcell, sreg, sinv, stri
 
 
-design, a, b, d, xr, yr, zr, id = sys.argv[-8:]
-a, b, d = map(float, [a, b, d])
-xr = int(xr)
-yr = int(yr)
-zr = int(zr)
+DESIGNS = {"HCELL": hcell, "SREG": sreg, "SINV": sinv, "STRI": stri}
 
-Mdb()
 
-if design == "HCELL":
-	design_func = hcell
-if design == "SREG":
-	design_func = sreg
-if design == "SINV":
-	design_func = sinv
-if design == "STRI":
-	design_func = stri
+def run_design(design, a, b, d, xr, yr, zr, id, stacking='merge'):
+	Mdb()  # a new, empty model database for every design
 
-design_func(a, b, d, xr, yr, zr, id)
+	design_func = DESIGNS[design]
 
+	design_func(float(a), float(b), float(d), int(xr), int(yr), int(zr), id, stacking)
+
+
+def run_worker(host, port):
+	"""
+				Worker mode: writes the .inp files of many designs in this one CAE
+				kernel, so the start-up and the license checkout are paid once.
+
+				Rows come from the cae_pool.py server at host:port as JSON lines with
+				design, a, b, d, xr, yr, zr, id, output, the path the .inp file is
+				moved to, and optionally stacking. Every row is answered with {"id", "status", "error"}; the
+				first line sent is {"status": "ready"} and a null row ends the worker.
+	"""
+	connection = socket.create_connection((host, int(port)))
+	rows = connection.makefile('r')
+	reply = {"status": "ready"}
+	while True:
+		connection.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+		line = rows.readline()
+		row = json.loads(line) if line.strip() else None
+		if row is None:
+			break
+		try:
+			run_design(str(row["design"]), row["a"], row["b"], row["d"], row["xr"], row["yr"], row["zr"], row["id"],
+					   str(row.get("stacking", "merge")))
+			shutil.move("%s_%s.inp" % (str(row["design"]).lower(), row["id"]), row["output"])
+			reply = {"id": row["id"], "status": "done"}
+		except Exception as e:
+			reply = {"id": row["id"], "status": "failed", "error": "%s: %s" % (type(e).__name__, e)}
+	connection.close()
+
+
+if sys.argv[-3] == "worker":
+	run_worker(*sys.argv[-2:])
+elif sys.argv[-1] in STACKINGS:
+	run_design(*sys.argv[-9:])
+else:
+	run_design(*sys.argv[-8:])
@@ -2,8 +2,72 @@ from abaqus import *
 from abaqusConstants import *
 from math import *
 
+import numpy as np
 
-def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
+from node_sets import crossing_groups, snap
+
+NO_CROSSING = (np.zeros(0, int), np.zeros(0, int))  # (ref node, node region) of a crossing without nodes
+
+# how the z_rep layers are built: InstanceFromBooleanMerge of z_rep instances of the wire part, or its mesh
+# copied z_rep times into an orphan mesh part (no geometric merge, crossings known by node index)
+STACKINGS = ('merge', 'copy')
+
+
+def node_table(nodes):
+	"""
+				Returns the labels and the (n, 3) coordinates of a MeshNodeArray as NumPy
+				arrays, read in a single pass over the nodes.
+	"""
+	table = np.array([(n.label,) + tuple(n.coordinates) for n in nodes], float).reshape(-1, 4)
+	return table[:, 0].astype(int), table[:, 1:]
+
+
+def node_array(nodes, labels, selection):
+	"""Returns the MeshNodeArray of the nodes picked by a boolean mask or an index array."""
+	import mesh
+
+	picked = labels[selection].tolist()
+	return nodes.sequenceFromLabels(picked) if picked else mesh.MeshNodeArray([])
+
+
+def copy_layers(part, name, z_rep, z_spacing):
+	"""
+				Copies the mesh of a single-layer part z_rep times at z_spacing into a new
+				orphan mesh part, in place of a LinearInstancePattern and an
+				InstanceFromBooleanMerge of its instances. Layer k takes the node and
+				element labels of the layer plus k times their largest label.
+
+				Args:
+					- part (Part): the meshed wire part of one layer
+					- name (str): name of the new part
+					- z_rep (int): number of layers
+					- z_spacing (float): distance between the layers
+
+				Returns:
+					- tuple: the new part, and the labels and (n, 3) coordinates of its nodes, layer by layer
+	"""
+	layer_labels, layer_coordinates = node_table(part.nodes)
+	node_step = int(layer_labels.max())
+	elements = [(element.label, tuple(node.label for node in element.getNodes())) for element in part.elements]
+	element_step = max(label for label, _ in elements)
+
+	merged_part = part.PartFromMesh(name=name)
+	for layer in range(1, z_rep):
+		copies = {}
+		for label, (x, y, z) in zip(layer_labels.tolist(), layer_coordinates.tolist()):
+			copies[label] = merged_part.Node(coordinates=(x, y, z + layer * z_spacing), label=layer * node_step + label)
+		for label, nodes in elements:
+			merged_part.Element(nodes=tuple(copies[node] for node in nodes), elemShape=LINE2,
+								label=layer * element_step + label)
+
+	layers = np.arange(z_rep)
+	labels = (layer_labels[None, :] + node_step * layers[:, None]).ravel()
+	coordinates = np.tile(layer_coordinates, (z_rep, 1))
+	coordinates[:, 2] += np.repeat(layers * z_spacing, len(layer_labels))
+	return merged_part, labels, coordinates
+
+
+def sinv(a, b, diameter, x_rep, y_rep, z_rep, id, stacking='merge'):
 	"""
 				Creates an auxetic model with S_INVERTED geometry design written to .inp file.
 
@@ -14,6 +78,7 @@ def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
 					- x_rep (int):
 					- y_rep (int):
 					- z_rep (int):
+					- stacking (str): how the layers are built, one of STACKINGS
 	"""
 
 	# ------------------ GLOBAL VARIABLES ----------------------------
@@ -175,16 +240,32 @@ def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	model_assembly = auxetic_model.rootAssembly
 
-	model_assembly.Instance(name=instance_name, part=part, dependent=OFF)
+	if stacking == 'copy':
+
+		part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
+
+		part.generateMesh()
+
+		merged_part, labels, coordinates = copy_layers(part, merged_part_name, z_rep, z_spacing)
+
+		model_assembly.Instance(name=merged_part_instance_name, part=merged_part, dependent=ON)
+
+		layer_size = len(labels) // z_rep
+
+	else:
 
-	model_assembly.LinearInstancePattern(instanceList=(instance_name,),
-										 direction1=(1.0, 0.0, 0.0), direction2=(0.0, 0.0, 1.0),
-										 number1=1, number2=z_rep, spacing1=1.0, spacing2=z_spacing)
+		model_assembly.Instance(name=instance_name, part=part, dependent=OFF)
 
-	model_assembly.InstanceFromBooleanMerge(name=merged_part_name, instances=model_assembly.instances.values(),
-											originalInstances=DELETE, domain=GEOMETRY)
+		model_assembly.LinearInstancePattern(instanceList=(instance_name,),
+											 direction1=(1.0, 0.0, 0.0), direction2=(0.0, 0.0, 1.0),
+											 number1=1, number2=z_rep, spacing1=1.0, spacing2=z_spacing)
 
-	model_assembly.features.changeKey(fromName=merged_part_name + '-1', toName=merged_part_instance_name)
+		model_assembly.InstanceFromBooleanMerge(name=merged_part_name, instances=model_assembly.instances.values(),
+												originalInstances=DELETE, domain=GEOMETRY)
+
+		model_assembly.features.changeKey(fromName=merged_part_name + '-1', toName=merged_part_instance_name)
+
+		layer_size = None
 
 	# -----------------------------------------------------------------
 	# Section creation and assignment
@@ -199,7 +280,10 @@ def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	merged_part = auxetic_model.parts[merged_part_name]
 
-	merged_region = regionToolset.Region(edges=merged_part.edges)
+	if stacking == 'copy':
+		merged_region = regionToolset.Region(elements=merged_part.elements)  # an orphan mesh has no edges
+	else:
+		merged_region = regionToolset.Region(edges=merged_part.edges)
 
 	merged_part.SectionAssignment(region=merged_region, sectionName=section_name)
 
@@ -210,13 +294,19 @@ def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	import mesh
 
-	merged_part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
-
 	elem_type = mesh.ElemType(elemCode=B31, elemLibrary=STANDARD)
 
-	merged_part.generateMesh()
+	if stacking == 'copy':
+
+		merged_part.setElementType(regions=(merged_part.elements,), elemTypes=(elem_type,))
+
+	else:
+
+		merged_part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
+
+		merged_part.generateMesh()
 
-	merged_part.setElementType(regions=(merged_part.edges,), elemTypes=(elem_type,))
+		merged_part.setElementType(regions=(merged_part.edges,), elemTypes=(elem_type,))
 
 	# -----------------------------------------------------------------
 	# Step creation
@@ -230,13 +320,6 @@ def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	all_nodes = merged_part.nodes
 
-	fix_nodes = []
-
-	left_nodes = []
-	bottom_nodes = []
-	right_nodes = []
-	top_nodes = []
-
 	x_coord_list, y_coord_list = [i * x_spacing / 2 for i in range(2 * x_rep + 1)], \
 								 [j * y_spacing / 2 for j in range(2 * y_rep + 1)]
 
@@ -245,48 +328,35 @@ def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	rows, columns = len(y_coord_list), len(x_coord_list)
 
-	model_constraints = [[{'ref_node': [], 'node_region': []} for _ in range(columns)] for _ in range(rows)]
-
 	tol = 0.001 * diameter
 
-	for n in all_nodes:
-		xcoord = n.coordinates[0] if n.coordinates[0] < - tol or n.coordinates[0] > tol else 0.0
-		ycoord = n.coordinates[1] if n.coordinates[1] < - tol or n.coordinates[1] > tol else 0.0
-		zcoord = n.coordinates[2] if n.coordinates[2] < - tol or n.coordinates[2] > tol else 0.0
-
-		if xcoord in x_coord_list and ycoord in y_coord_list:
-			if xcoord != x_coord_list[-1] or ycoord != y_coord_list[-1]:
-				i = x_coord_list.index(xcoord)
-				j = y_coord_list.index(ycoord)
-				if -0.01 < zcoord < 0.01:
-					model_constraints[j][i]['ref_node'].append(n)
-				else:
-					model_constraints[j][i]['node_region'].append(n)
-
-		if xcoord < g_offset and ycoord < g_offset:
-			fix_nodes.append(n)
-		if xmin_left < xcoord < xmax_left and ymax_bottom < ycoord < ymax_top - frame_length:
-			left_nodes.append(n)
-		if ymin_bottom < ycoord < ymax_bottom and xmax_left < xcoord < xmax_right - frame_length:
-			bottom_nodes.append(n)
-		if xmin_right < xcoord < xmax_right and ycoord < ymin_top:
-			right_nodes.append(n)
-		if ymin_top < ycoord < ymax_top and xcoord < xmin_right:
-			top_nodes.append(n)
+	if stacking != 'copy':  # copy_layers knows them already
+		labels, coordinates = node_table(all_nodes)
+	coordinates = snap(coordinates, tol)
+	xcoord, ycoord = coordinates[:, 0], coordinates[:, 1]
+
+	model_constraints = crossing_groups(coordinates, x_coord_list, y_coord_list, tol, layer_size=layer_size)
+
+	fix_nodes = (xcoord < g_offset) & (ycoord < g_offset)
+	left_nodes = (xmin_left < xcoord) & (xcoord < xmax_left) & (ymax_bottom < ycoord) & (ycoord < ymax_top - frame_length)
+	bottom_nodes = (ymin_bottom < ycoord) & (ycoord < ymax_bottom) & (xmax_left < xcoord) & (xcoord < xmax_right - frame_length)
+	right_nodes = (xmin_right < xcoord) & (xcoord < xmax_right) & (ycoord < ymin_top)
+	top_nodes = (ymin_top < ycoord) & (ycoord < ymax_top) & (xcoord < xmin_right)
 
 	import interaction
 
-	for j, row in enumerate(model_constraints):
-		for i, constraint in enumerate(row):
-			if j != len(model_constraints) - 1 or i != len(row) - 1:
+	for j in range(rows):
+		for i in range(columns):
+			if j != rows - 1 or i != columns - 1:
 				name = 'constraint' + str(i) + str(j)
+				ref_node, node_region = model_constraints.get((i, j), NO_CROSSING)
 
-				mesh_ref_node = mesh.MeshNodeArray(constraint['ref_node'])
+				mesh_ref_node = node_array(all_nodes, labels, ref_node)
 				set_ref_node_name = name + 'ref node'
 				merged_part.Set(nodes=mesh_ref_node, name=set_ref_node_name)
 				set_ref_node = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_ref_node_name]
 
-				mesh_node_region = mesh.MeshNodeArray(constraint['node_region'])
+				mesh_node_region = node_array(all_nodes, labels, node_region)
 				set_node_region_name = name + 'node_region'
 				merged_part.Set(nodes=mesh_node_region, name=set_node_region_name)
 				set_node_region = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[
@@ -295,19 +365,19 @@ def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
 				auxetic_model.RigidBody(name=name, refPointRegion=set_ref_node, tieRegion=set_node_region)
 
 
-	mesh_fix_nodes = mesh.MeshNodeArray(fix_nodes)
+	mesh_fix_nodes = node_array(all_nodes, labels, fix_nodes)
 	merged_part.Set(nodes=mesh_fix_nodes, name=set_fix_nodes_name)
 
-	mesh_left_nodes = mesh.MeshNodeArray(left_nodes)
+	mesh_left_nodes = node_array(all_nodes, labels, left_nodes)
 	merged_part.Set(nodes=mesh_left_nodes, name=set_left_nodes_name)
 
-	mesh_bottom_nodes = mesh.MeshNodeArray(bottom_nodes)
+	mesh_bottom_nodes = node_array(all_nodes, labels, bottom_nodes)
 	merged_part.Set(nodes=mesh_bottom_nodes, name=set_bottom_nodes_name)
 
-	mesh_right_nodes = mesh.MeshNodeArray(right_nodes)
+	mesh_right_nodes = node_array(all_nodes, labels, right_nodes)
 	merged_part.Set(nodes=mesh_right_nodes, name=set_right_nodes_name)
 
-	mesh_top_nodes = mesh.MeshNodeArray(top_nodes)
+	mesh_top_nodes = node_array(all_nodes, labels, top_nodes)
 	merged_part.Set(nodes=mesh_top_nodes, name=set_top_nodes_name)
 
 	set_fix_nodes = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_fix_nodes_name]
@@ -373,7 +443,7 @@ def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
 	# -----------------------------------------------------------------
 
 
-def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
+def sreg(a, b, diameter, x_rep, y_rep, z_rep, id, stacking='merge'):
 	"""
 				Creates an auxetic model with S_REGULAR geometry design written to .inp file.
 
@@ -384,6 +454,7 @@ def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
 					- x_rep (int):
 					- y_rep (int):
 					- z_rep (int):
+					- stacking (str): how the layers are built, one of STACKINGS
 	"""
 
 	# ------------------ GLOBAL VARIABLES ----------------------------
@@ -535,16 +606,32 @@ def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	model_assembly = auxetic_model.rootAssembly
 
-	model_assembly.Instance(name=instance_name, part=part, dependent=OFF)
+	if stacking == 'copy':
+
+		part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
+
+		part.generateMesh()
+
+		merged_part, labels, coordinates = copy_layers(part, merged_part_name, z_rep, z_spacing)
+
+		model_assembly.Instance(name=merged_part_instance_name, part=merged_part, dependent=ON)
+
+		layer_size = len(labels) // z_rep
+
+	else:
+
+		model_assembly.Instance(name=instance_name, part=part, dependent=OFF)
+
+		model_assembly.LinearInstancePattern(instanceList=(instance_name,),
+											 direction1=(1.0, 0.0, 0.0), direction2=(0.0, 0.0, 1.0),
+											 number1=1, number2=z_rep, spacing1=1.0, spacing2=z_spacing)
 
-	model_assembly.LinearInstancePattern(instanceList=(instance_name,),
-										 direction1=(1.0, 0.0, 0.0), direction2=(0.0, 0.0, 1.0),
-										 number1=1, number2=z_rep, spacing1=1.0, spacing2=z_spacing)
+		model_assembly.InstanceFromBooleanMerge(name=merged_part_name, instances=model_assembly.instances.values(),
+												originalInstances=DELETE, domain=GEOMETRY)
 
-	model_assembly.InstanceFromBooleanMerge(name=merged_part_name, instances=model_assembly.instances.values(),
-											originalInstances=DELETE, domain=GEOMETRY)
+		model_assembly.features.changeKey(fromName=merged_part_name + '-1', toName=merged_part_instance_name)
 
-	model_assembly.features.changeKey(fromName=merged_part_name + '-1', toName=merged_part_instance_name)
+		layer_size = None
 
 	# -----------------------------------------------------------------
 	# Section creation and assignment
@@ -559,7 +646,10 @@ def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	merged_part = auxetic_model.parts[merged_part_name]
 
-	merged_region = regionToolset.Region(edges=merged_part.edges)
+	if stacking == 'copy':
+		merged_region = regionToolset.Region(elements=merged_part.elements)  # an orphan mesh has no edges
+	else:
+		merged_region = regionToolset.Region(edges=merged_part.edges)
 
 	merged_part.SectionAssignment(region=merged_region, sectionName=section_name)
 
@@ -570,13 +660,19 @@ def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	import mesh
 
-	merged_part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
-
 	elem_type = mesh.ElemType(elemCode=B31, elemLibrary=STANDARD)
 
-	merged_part.generateMesh()
+	if stacking == 'copy':
+
+		merged_part.setElementType(regions=(merged_part.elements,), elemTypes=(elem_type,))
+
+	else:
+
+		merged_part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
 
-	merged_part.setElementType(regions=(merged_part.edges,), elemTypes=(elem_type,))
+		merged_part.generateMesh()
+
+		merged_part.setElementType(regions=(merged_part.edges,), elemTypes=(elem_type,))
 
 	# -----------------------------------------------------------------
 	# Step creation
@@ -590,13 +686,6 @@ def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	all_nodes = merged_part.nodes
 
-	fix_nodes = []
-
-	left_nodes = []
-	bottom_nodes = []
-	right_nodes = []
-	top_nodes = []
-
 	x_coord_list, y_coord_list = [i * x_spacing for i in range(x_rep + 1)], \
 								 [j * y_spacing for j in range(y_rep + 1)]
 
@@ -605,48 +694,35 @@ def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	rows, columns = len(y_coord_list), len(x_coord_list)
 
-	model_constraints = [[{'ref_node': [], 'node_region': []} for _ in range(columns)] for _ in range(rows)]
-
 	tol = 0.001 * diameter
 
-	for n in all_nodes:
-		xcoord = n.coordinates[0] if n.coordinates[0] < - tol or n.coordinates[0] > tol else 0.0
-		ycoord = n.coordinates[1] if n.coordinates[1] < - tol or n.coordinates[1] > tol else 0.0
-		zcoord = n.coordinates[2] if n.coordinates[2] < - tol or n.coordinates[2] > tol else 0.0
-
-		if xcoord in x_coord_list and ycoord in y_coord_list:
-			if xcoord != x_coord_list[-1] or ycoord != y_coord_list[-1]:
-				i = x_coord_list.index(xcoord)
-				j = y_coord_list.index(ycoord)
-				if -0.01 < zcoord < 0.01:
-					model_constraints[j][i]['ref_node'].append(n)
-				else:
-					model_constraints[j][i]['node_region'].append(n)
-
-		if xcoord < g_offset and ycoord < g_offset:
-			fix_nodes.append(n)
-		if xmin_left < xcoord < xmax_left and ymax_bottom < ycoord < ymax_top - frame_length:
-			left_nodes.append(n)
-		if ymin_bottom < ycoord < ymax_bottom and xmax_left < xcoord < xmax_right - frame_length:
-			bottom_nodes.append(n)
-		if xmin_right < xcoord < xmax_right and ycoord < ymin_top:
-			right_nodes.append(n)
-		if ymin_top < ycoord < ymax_top and xcoord < xmin_right:
-			top_nodes.append(n)
+	if stacking != 'copy':  # copy_layers knows them already
+		labels, coordinates = node_table(all_nodes)
+	coordinates = snap(coordinates, tol)
+	xcoord, ycoord = coordinates[:, 0], coordinates[:, 1]
+
+	model_constraints = crossing_groups(coordinates, x_coord_list, y_coord_list, tol, layer_size=layer_size)
+
+	fix_nodes = (xcoord < g_offset) & (ycoord < g_offset)
+	left_nodes = (xmin_left < xcoord) & (xcoord < xmax_left) & (ymax_bottom < ycoord) & (ycoord < ymax_top - frame_length)
+	bottom_nodes = (ymin_bottom < ycoord) & (ycoord < ymax_bottom) & (xmax_left < xcoord) & (xcoord < xmax_right - frame_length)
+	right_nodes = (xmin_right < xcoord) & (xcoord < xmax_right) & (ycoord < ymin_top)
+	top_nodes = (ymin_top < ycoord) & (ycoord < ymax_top) & (xcoord < xmin_right)
 
 	import interaction
 
-	for j, row in enumerate(model_constraints):
-		for i, constraint in enumerate(row):
-			if j != len(model_constraints) - 1 or i != len(row) - 1:
+	for j in range(rows):
+		for i in range(columns):
+			if j != rows - 1 or i != columns - 1:
 				name = 'constraint' + str(i) + str(j)
+				ref_node, node_region = model_constraints.get((i, j), NO_CROSSING)
 
-				mesh_ref_node = mesh.MeshNodeArray(constraint['ref_node'])
+				mesh_ref_node = node_array(all_nodes, labels, ref_node)
 				set_ref_node_name = name + 'ref node'
 				merged_part.Set(nodes=mesh_ref_node, name=set_ref_node_name)
 				set_ref_node = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_ref_node_name]
 
-				mesh_node_region = mesh.MeshNodeArray(constraint['node_region'])
+				mesh_node_region = node_array(all_nodes, labels, node_region)
 				set_node_region_name = name + 'node_region'
 				merged_part.Set(nodes=mesh_node_region, name=set_node_region_name)
 				set_node_region = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[
@@ -659,19 +735,19 @@ def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
 				auxetic_model.RigidBody(name=name, refPointRegion=set_ref_node, tieRegion=set_node_region)
 
 
-	mesh_fix_nodes = mesh.MeshNodeArray(fix_nodes)
+	mesh_fix_nodes = node_array(all_nodes, labels, fix_nodes)
 	merged_part.Set(nodes=mesh_fix_nodes, name=set_fix_nodes_name)
 
-	mesh_left_nodes = mesh.MeshNodeArray(left_nodes)
+	mesh_left_nodes = node_array(all_nodes, labels, left_nodes)
 	merged_part.Set(nodes=mesh_left_nodes, name=set_left_nodes_name)
 
-	mesh_bottom_nodes = mesh.MeshNodeArray(bottom_nodes)
+	mesh_bottom_nodes = node_array(all_nodes, labels, bottom_nodes)
 	merged_part.Set(nodes=mesh_bottom_nodes, name=set_bottom_nodes_name)
 
-	mesh_right_nodes = mesh.MeshNodeArray(right_nodes)
+	mesh_right_nodes = node_array(all_nodes, labels, right_nodes)
 	merged_part.Set(nodes=mesh_right_nodes, name=set_right_nodes_name)
 
-	mesh_top_nodes = mesh.MeshNodeArray(top_nodes)
+	mesh_top_nodes = node_array(all_nodes, labels, top_nodes)
 	merged_part.Set(nodes=mesh_top_nodes, name=set_top_nodes_name)
 
 	set_fix_nodes = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_fix_nodes_name]
@@ -737,7 +813,7 @@ def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
 	# -----------------------------------------------------------------
 
 
-def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
+def stri(a, b, diameter, x_rep, y_rep, z_rep, id, stacking='merge'):
 	"""
 				Creates an auxetic model with S_TRIANGULAR geometry design written to .inp file.
 
@@ -748,6 +824,7 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 					- x_rep (int):
 					- y_rep (int):
 					- z_rep (int):
+					- stacking (str): how the layers are built, one of STACKINGS
 	"""
 
 	# ------------------ GLOBAL VARIABLES ----------------------------
@@ -881,7 +958,7 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 		part_sketch.linearPattern(geomList=(g[38], g[39]), vertexList=(),
 								  number1=1, spacing1=x_spacing, angle1=0.0,
-								  number2=y_rep / 2 + 1, spacing2=2 * y_spacing, angle2=90.0)
+								  number2=y_rep // 2 + 1, spacing2=2 * y_spacing, angle2=90.0)
 
 		part_sketch.linearPattern(geomList=(g[40],), vertexList=(),
 								  number1=x_rep + 1, spacing1=x_spacing, angle1=0.0,
@@ -899,11 +976,11 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 		part_sketch.linearPattern(geomList=(g[38],), vertexList=(),
 								  number1=1, spacing1=x_spacing, angle1=0.0,
-								  number2=y_rep / 2 + 1, spacing2=2 * y_spacing, angle2=90.0)
+								  number2=y_rep // 2 + 1, spacing2=2 * y_spacing, angle2=90.0)
 
 		part_sketch.linearPattern(geomList=(g[39],), vertexList=(),
 								  number1=1, spacing1=x_spacing, angle1=0.0,
-								  number2=y_rep / 2, spacing2=2 * y_spacing, angle2=90.0)
+								  number2=y_rep // 2, spacing2=2 * y_spacing, angle2=90.0)
 
 		part_sketch.linearPattern(geomList=(g[40],), vertexList=(),
 								  number1=x_rep, spacing1=x_spacing, angle1=0.0,
@@ -914,7 +991,7 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 										g[25], g[26], g[27], g[28], g[29], g[30], g[31], g[32], g[33], g[34], g[35],
 										g[36], g[37]), vertexList=(),
 							  number1=x_rep - 1, spacing1=x_spacing, angle1=0.0,
-							  number2=y_rep / 2, spacing2=2 * y_spacing, angle2=90.0)
+							  number2=y_rep // 2, spacing2=2 * y_spacing, angle2=90.0)
 
 	part = auxetic_model.Part(name=part_name, dimensionality=THREE_D, type=DEFORMABLE_BODY)
 	part.BaseWire(sketch=part_sketch)
@@ -926,16 +1003,32 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	model_assembly = auxetic_model.rootAssembly
 
-	model_assembly.Instance(name=instance_name, part=part, dependent=OFF)
+	if stacking == 'copy':
 
-	model_assembly.LinearInstancePattern(instanceList=(instance_name,),
-										 direction1=(1.0, 0.0, 0.0), direction2=(0.0, 0.0, 1.0),
-										 number1=1, number2=z_rep, spacing1=1.0, spacing2=z_spacing)
+		part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
 
-	model_assembly.InstanceFromBooleanMerge(name=merged_part_name, instances=model_assembly.instances.values(),
-											originalInstances=DELETE, domain=GEOMETRY)
+		part.generateMesh()
 
-	model_assembly.features.changeKey(fromName=merged_part_name + '-1', toName=merged_part_instance_name)
+		merged_part, labels, coordinates = copy_layers(part, merged_part_name, z_rep, z_spacing)
+
+		model_assembly.Instance(name=merged_part_instance_name, part=merged_part, dependent=ON)
+
+		layer_size = len(labels) // z_rep
+
+	else:
+
+		model_assembly.Instance(name=instance_name, part=part, dependent=OFF)
+
+		model_assembly.LinearInstancePattern(instanceList=(instance_name,),
+											 direction1=(1.0, 0.0, 0.0), direction2=(0.0, 0.0, 1.0),
+											 number1=1, number2=z_rep, spacing1=1.0, spacing2=z_spacing)
+
+		model_assembly.InstanceFromBooleanMerge(name=merged_part_name, instances=model_assembly.instances.values(),
+												originalInstances=DELETE, domain=GEOMETRY)
+
+		model_assembly.features.changeKey(fromName=merged_part_name + '-1', toName=merged_part_instance_name)
+
+		layer_size = None
 
 	# -----------------------------------------------------------------
 	# Section creation and assignment
@@ -950,7 +1043,10 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	merged_part = auxetic_model.parts[merged_part_name]
 
-	merged_region = regionToolset.Region(edges=merged_part.edges)
+	if stacking == 'copy':
+		merged_region = regionToolset.Region(elements=merged_part.elements)  # an orphan mesh has no edges
+	else:
+		merged_region = regionToolset.Region(edges=merged_part.edges)
 
 	merged_part.SectionAssignment(region=merged_region, sectionName=section_name)
 
@@ -961,13 +1057,19 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	import mesh
 
-	merged_part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
-
 	elem_type = mesh.ElemType(elemCode=B31, elemLibrary=STANDARD)
 
-	merged_part.generateMesh()
+	if stacking == 'copy':
 
-	merged_part.setElementType(regions=(merged_part.edges,), elemTypes=(elem_type,))
+		merged_part.setElementType(regions=(merged_part.elements,), elemTypes=(elem_type,))
+
+	else:
+
+		merged_part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
+
+		merged_part.generateMesh()
+
+		merged_part.setElementType(regions=(merged_part.edges,), elemTypes=(elem_type,))
 
 	# -----------------------------------------------------------------
 	# Step creation
@@ -981,13 +1083,6 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	all_nodes = merged_part.nodes
 
-	fix_nodes = []
-
-	left_nodes = []
-	bottom_nodes = []
-	right_nodes = []
-	top_nodes = []
-
 	x_coord_list_short, y_coord_list_short = [round(i * x_spacing, 1) for i in range(x_rep)],\
 											 [round(j * 2 * y_spacing, 1) for j in range(int(y_rep / 2) + 1)]
 
@@ -1005,83 +1100,49 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 	rows_short, columns_short = len(y_coord_list_short), len(x_coord_list_short)
 	rows_long, columns_long = len(y_coord_list_long), len(x_coord_list_long)
 
-	model_constraints_short = [[{'ref_node': [], 'node_region': []} for _ in range(columns_short)] for _ in
-							   range(rows_short)]
-	model_constraints_long = [[{'ref_node': [], 'node_region': []} for _ in range(columns_long)] for _ in
-							  range(rows_long)]
 
 	tol = 0.01
 
-	for n in all_nodes:
-		xcoord = n.coordinates[0] if n.coordinates[0] < - tol or n.coordinates[0] > tol else 0.0
-		ycoord = n.coordinates[1] if n.coordinates[1] < - tol or n.coordinates[1] > tol else 0.0
-		zcoord = n.coordinates[2] if n.coordinates[2] < - tol or n.coordinates[2] > tol else 0.0
-
-		if y_rep % 2 != 0:
-			if round(xcoord, 1) in x_coord_list_short and round(ycoord, 1) in y_coord_list_short:
-				i = x_coord_list_short.index(round(xcoord, 1))
-				j = y_coord_list_short.index(round(ycoord, 1))
-				if -0.01 < zcoord < 0.01:
-					model_constraints_short[j][i]['ref_node'].append(n)
-				else:
-					model_constraints_short[j][i]['node_region'].append(n)
-
-			if round(xcoord, 1) in x_coord_list_long and round(ycoord, 1) in y_coord_list_long:
-				if round(xcoord, 1) != x_coord_list_long[-1] or round(ycoord, 1) != y_coord_list_long[-1]:
-					i = x_coord_list_long.index(round(xcoord, 1))
-					j = y_coord_list_long.index(round(ycoord, 1))
-					if -0.01 < zcoord < 0.01:
-						model_constraints_long[j][i]['ref_node'].append(n)
-					else:
-						model_constraints_long[j][i]['node_region'].append(n)
-
-		if y_rep % 2 == 0:
-			if round(xcoord, 1) in x_coord_list_short and round(ycoord, 1) in y_coord_list_short:
-				if round(xcoord, 1) != x_coord_list_long[-1] or round(ycoord, 1) != y_coord_list_long[-1]:
-					i = x_coord_list_short.index(round(xcoord, 1))
-					j = y_coord_list_short.index(round(ycoord, 1))
-					if -0.01 < zcoord < 0.01:
-						model_constraints_short[j][i]['ref_node'].append(n)
-					else:
-						model_constraints_short[j][i]['node_region'].append(n)
-
-			if round(xcoord, 1) in x_coord_list_long and round(ycoord, 1) in y_coord_list_long:
-				i = x_coord_list_long.index(round(xcoord, 1))
-				j = y_coord_list_long.index(round(ycoord, 1))
-				if -0.01 < zcoord < 0.01:
-					model_constraints_long[j][i]['ref_node'].append(n)
-				else:
-					model_constraints_long[j][i]['node_region'].append(n)
-
-		if xcoord < g_offset and ycoord < g_offset:
-			fix_nodes.append(n)
-		if xmin_left < xcoord < xmax_left and ymax_bottom < ycoord < ymax_top - frame_length:
-			left_nodes.append(n)
-		if ymin_bottom < ycoord < ymax_bottom and xmax_left < xcoord < xmax_right - frame_length:
-			for i in range(1, x_rep):
-				x_bottom = x_spacing * i
-				if abs(x_bottom - xcoord) < g_offset:
-					bottom_nodes.append(n)
-		if xmin_right < xcoord < xmax_right and ycoord < ymin_top:
-			right_nodes.append(n)
-		if ymin_top < ycoord < ymax_top and xcoord < xmin_right:
-			top_nodes.append(n)
+	if stacking != 'copy':  # copy_layers knows them already
+		labels, coordinates = node_table(all_nodes)
+	coordinates = snap(coordinates, tol)
+	xcoord, ycoord = coordinates[:, 0], coordinates[:, 1]
+
+	# crossings are matched on coordinates rounded to 0.1, as the coordinate lists are
+	rounded = np.column_stack([np.round(xcoord, 1), np.round(ycoord, 1), coordinates[:, 2]])
+	model_constraints_short = crossing_groups(rounded, x_coord_list_short, y_coord_list_short, 1e-6,
+											  skip_last=y_rep % 2 == 0, layer_size=layer_size)
+	model_constraints_long = crossing_groups(rounded, x_coord_list_long, y_coord_list_long, 1e-6,
+											 skip_last=y_rep % 2 != 0, layer_size=layer_size)
+
+	on_bottom_fibers = np.zeros(len(xcoord), bool)
+	for i in range(1, x_rep):
+		x_bottom = x_spacing * i
+		on_bottom_fibers |= np.abs(x_bottom - xcoord) < g_offset
+
+	fix_nodes = (xcoord < g_offset) & (ycoord < g_offset)
+	left_nodes = (xmin_left < xcoord) & (xcoord < xmax_left) & (ymax_bottom < ycoord) & (ycoord < ymax_top - frame_length)
+	bottom_nodes = (ymin_bottom < ycoord) & (ycoord < ymax_bottom) & (xmax_left < xcoord) & (xcoord < xmax_right - frame_length) \
+		& on_bottom_fibers
+	right_nodes = (xmin_right < xcoord) & (xcoord < xmax_right) & (ycoord < ymin_top)
+	top_nodes = (ymin_top < ycoord) & (ycoord < ymax_top) & (xcoord < xmin_right)
 
 	import interaction
 
 	if y_rep % 2 != 0:
 
-		for j, row in enumerate(model_constraints_short):
-			for i, constraint in enumerate(row):
-				# if j != len(model_constraints_short) - 1 or i != len(row) - 1:
+		for j in range(rows_short):
+			for i in range(columns_short):
+				# if j != rows_short - 1 or i != columns_short - 1:
 				name = 'constraint_short' + str(i) + str(j)
+				ref_node, node_region = model_constraints_short.get((i, j), NO_CROSSING)
 
-				mesh_ref_node = mesh.MeshNodeArray(constraint['ref_node'])
+				mesh_ref_node = node_array(all_nodes, labels, ref_node)
 				set_ref_node_name = name + 'ref node'
 				merged_part.Set(nodes=mesh_ref_node, name=set_ref_node_name)
 				set_ref_node = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_ref_node_name]
 
-				mesh_node_region = mesh.MeshNodeArray(constraint['node_region'])
+				mesh_node_region = node_array(all_nodes, labels, node_region)
 				set_node_region_name = name + 'node_region'
 				merged_part.Set(nodes=mesh_node_region, name=set_node_region_name)
 				set_node_region = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[
@@ -1089,17 +1150,18 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 				auxetic_model.RigidBody(name=name, refPointRegion=set_ref_node, tieRegion=set_node_region)
 
-		for j, row in enumerate(model_constraints_long):
-			for i, constraint in enumerate(row):
-				if j != len(model_constraints_long) - 1 or i != len(row) - 1:
+		for j in range(rows_long):
+			for i in range(columns_long):
+				if j != rows_long - 1 or i != columns_long - 1:
 					name = 'constraint_long' + str(i) + str(j)
+					ref_node, node_region = model_constraints_long.get((i, j), NO_CROSSING)
 
-					mesh_ref_node = mesh.MeshNodeArray(constraint['ref_node'])
+					mesh_ref_node = node_array(all_nodes, labels, ref_node)
 					set_ref_node_name = name + 'ref node'
 					merged_part.Set(nodes=mesh_ref_node, name=set_ref_node_name)
 					set_ref_node = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_ref_node_name]
 
-					mesh_node_region = mesh.MeshNodeArray(constraint['node_region'])
+					mesh_node_region = node_array(all_nodes, labels, node_region)
 					set_node_region_name = name + 'node_region'
 					merged_part.Set(nodes=mesh_node_region, name=set_node_region_name)
 					set_node_region = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[
@@ -1109,17 +1171,18 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	if y_rep % 2 == 0:
 
-		for j, row in enumerate(model_constraints_short):
-			for i, constraint in enumerate(row):
-				if j != len(model_constraints_short) - 1 or i != len(row) - 1:
+		for j in range(rows_short):
+			for i in range(columns_short):
+				if j != rows_short - 1 or i != columns_short - 1:
 					name = 'constraint_short' + str(i) + str(j)
+					ref_node, node_region = model_constraints_short.get((i, j), NO_CROSSING)
 
-					mesh_ref_node = mesh.MeshNodeArray(constraint['ref_node'])
+					mesh_ref_node = node_array(all_nodes, labels, ref_node)
 					set_ref_node_name = name + 'ref node'
 					merged_part.Set(nodes=mesh_ref_node, name=set_ref_node_name)
 					set_ref_node = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_ref_node_name]
 
-					mesh_node_region = mesh.MeshNodeArray(constraint['node_region'])
+					mesh_node_region = node_array(all_nodes, labels, node_region)
 					set_node_region_name = name + 'node_region'
 					merged_part.Set(nodes=mesh_node_region, name=set_node_region_name)
 					set_node_region = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[
@@ -1127,18 +1190,19 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 					auxetic_model.RigidBody(name=name, refPointRegion=set_ref_node, tieRegion=set_node_region)
 
-		for j, row in enumerate(model_constraints_long):
-			for i, constraint in enumerate(row):
-				# if j != len(model_constraints_long) - 1 or i != len(row) - 1:
+		for j in range(rows_long):
+			for i in range(columns_long):
+				# if j != rows_long - 1 or i != columns_long - 1:
 				name = 'constraint_long' + str(i) + str(j)
+				ref_node, node_region = model_constraints_long.get((i, j), NO_CROSSING)
 
-				mesh_ref_node = mesh.MeshNodeArray(constraint['ref_node'])
+				mesh_ref_node = node_array(all_nodes, labels, ref_node)
 				set_ref_node_name = name + 'ref node'
 				merged_part.Set(nodes=mesh_ref_node, name=set_ref_node_name)
 				set_ref_node = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[
 					set_ref_node_name]
 
-				mesh_node_region = mesh.MeshNodeArray(constraint['node_region'])
+				mesh_node_region = node_array(all_nodes, labels, node_region)
 				set_node_region_name = name + 'node_region'
 				merged_part.Set(nodes=mesh_node_region, name=set_node_region_name)
 				set_node_region = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[
@@ -1146,19 +1210,19 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 				auxetic_model.RigidBody(name=name, refPointRegion=set_ref_node, tieRegion=set_node_region)
 
-	mesh_fix_nodes = mesh.MeshNodeArray(fix_nodes)
+	mesh_fix_nodes = node_array(all_nodes, labels, fix_nodes)
 	merged_part.Set(nodes=mesh_fix_nodes, name=set_fix_nodes_name)
 
-	mesh_left_nodes = mesh.MeshNodeArray(left_nodes)
+	mesh_left_nodes = node_array(all_nodes, labels, left_nodes)
 	merged_part.Set(nodes=mesh_left_nodes, name=set_left_nodes_name)
 
-	mesh_bottom_nodes = mesh.MeshNodeArray(bottom_nodes)
+	mesh_bottom_nodes = node_array(all_nodes, labels, bottom_nodes)
 	merged_part.Set(nodes=mesh_bottom_nodes, name=set_bottom_nodes_name)
 
-	mesh_right_nodes = mesh.MeshNodeArray(right_nodes)
+	mesh_right_nodes = node_array(all_nodes, labels, right_nodes)
 	merged_part.Set(nodes=mesh_right_nodes, name=set_right_nodes_name)
 
-	mesh_top_nodes = mesh.MeshNodeArray(top_nodes)
+	mesh_top_nodes = node_array(all_nodes, labels, top_nodes)
 	merged_part.Set(nodes=mesh_top_nodes, name=set_top_nodes_name)
 
 	set_fix_nodes = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_fix_nodes_name]
@@ -1224,7 +1288,7 @@ def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
 	# -----------------------------------------------------------------
 
 
-def hcell(a, b, diameter, x_rep, y_rep, z_rep, id):
+def hcell(a, b, diameter, x_rep, y_rep, z_rep, id, stacking='merge'):
 	"""
 		Creates an auxetic model with H_CELL geometry design written to .inp file.
 
@@ -1235,6 +1299,7 @@ def hcell(a, b, diameter, x_rep, y_rep, z_rep, id):
 					- x_rep (int):
 					- y_rep (int):
 					- z_rep (int):
+					- stacking (str): how the layers are built, one of STACKINGS
 	"""
 
 	# ------------------ VARIABLES ----------------------------
@@ -1425,16 +1490,28 @@ def hcell(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	model_assembly = auxetic_model.rootAssembly
 
-	model_assembly.Instance(name=instance_name, part=part, dependent=OFF)
+	if stacking == 'copy':
+
+		part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
+
+		part.generateMesh()
 
-	model_assembly.LinearInstancePattern(instanceList=(instance_name,),
-										 direction1=(1.0, 0.0, 0.0), direction2=(0.0, 0.0, 1.0),
-										 number1=1, number2=z_rep, spacing1=1.0, spacing2=z_spacing)
+		merged_part, labels, coordinates = copy_layers(part, merged_part_name, z_rep, z_spacing)
+
+		model_assembly.Instance(name=merged_part_instance_name, part=merged_part, dependent=ON)
+
+	else:
 
-	model_assembly.InstanceFromBooleanMerge(name=merged_part_name, instances=model_assembly.instances.values(),
-											originalInstances=DELETE, domain=GEOMETRY)
+		model_assembly.Instance(name=instance_name, part=part, dependent=OFF)
 
-	model_assembly.features.changeKey(fromName=merged_part_name + '-1', toName=merged_part_instance_name)
+		model_assembly.LinearInstancePattern(instanceList=(instance_name,),
+											 direction1=(1.0, 0.0, 0.0), direction2=(0.0, 0.0, 1.0),
+											 number1=1, number2=z_rep, spacing1=1.0, spacing2=z_spacing)
+
+		model_assembly.InstanceFromBooleanMerge(name=merged_part_name, instances=model_assembly.instances.values(),
+												originalInstances=DELETE, domain=GEOMETRY)
+
+		model_assembly.features.changeKey(fromName=merged_part_name + '-1', toName=merged_part_instance_name)
 
 	# -----------------------------------------------------------------
 	# Section creation and assignment
@@ -1449,7 +1526,10 @@ def hcell(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	merged_part = auxetic_model.parts[merged_part_name]
 
-	merged_region = regionToolset.Region(edges=merged_part.edges)
+	if stacking == 'copy':
+		merged_region = regionToolset.Region(elements=merged_part.elements)  # an orphan mesh has no edges
+	else:
+		merged_region = regionToolset.Region(edges=merged_part.edges)
 
 	merged_part.SectionAssignment(region=merged_region, sectionName=section_name)
 
@@ -1460,13 +1540,19 @@ def hcell(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	import mesh
 
-	merged_part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
-
 	elem_type = mesh.ElemType(elemCode=B31, elemLibrary=STANDARD)
 
-	merged_part.generateMesh()
+	if stacking == 'copy':
+
+		merged_part.setElementType(regions=(merged_part.elements,), elemTypes=(elem_type,))
 
-	merged_part.setElementType(regions=(merged_part.edges,), elemTypes=(elem_type,))
+	else:
+
+		merged_part.seedPart(size=elem_size, deviationFactor=0.1, minSizeFactor=0.8)
+
+		merged_part.generateMesh()
+
+		merged_part.setElementType(regions=(merged_part.edges,), elemTypes=(elem_type,))
 
 	# -----------------------------------------------------------------
 	# Step creation
@@ -1480,40 +1566,29 @@ def hcell(a, b, diameter, x_rep, y_rep, z_rep, id):
 
 	all_nodes = merged_part.nodes
 
-	fix_nodes = []
-
-	left_nodes = []
-	bottom_nodes = []
-	right_nodes = []
-	top_nodes = []
-
-	for n in all_nodes:
-		xcoord = n.coordinates[0]
-		ycoord = n.coordinates[1]
-		if xcoord < g_offset and ymin_bottom < ycoord < ymax_bottom:
-			fix_nodes.append(n)
-		if xmin_left < xcoord < xmax_left and ymax_bottom < ycoord < ymax_top:
-			left_nodes.append(n)
-		if ymin_bottom < ycoord < ymax_bottom and g_offset < xcoord < xmax_right:
-			bottom_nodes.append(n)
-		if xmin_right < xcoord < xmax_right and ycoord < ymin_top:
-			right_nodes.append(n)
-		if ymin_top < ycoord < ymax_top and xcoord < xmin_right:
-			top_nodes.append(n)
-
-	mesh_fix_nodes = mesh.MeshNodeArray(fix_nodes)
+	if stacking != 'copy':  # copy_layers knows them already
+		labels, coordinates = node_table(all_nodes)
+	xcoord, ycoord = coordinates[:, 0], coordinates[:, 1]
+
+	fix_nodes = (xcoord < g_offset) & (ymin_bottom < ycoord) & (ycoord < ymax_bottom)
+	left_nodes = (xmin_left < xcoord) & (xcoord < xmax_left) & (ymax_bottom < ycoord) & (ycoord < ymax_top)
+	bottom_nodes = (ymin_bottom < ycoord) & (ycoord < ymax_bottom) & (g_offset < xcoord) & (xcoord < xmax_right)
+	right_nodes = (xmin_right < xcoord) & (xcoord < xmax_right) & (ycoord < ymin_top)
+	top_nodes = (ymin_top < ycoord) & (ycoord < ymax_top) & (xcoord < xmin_right)
+
+	mesh_fix_nodes = node_array(all_nodes, labels, fix_nodes)
 	merged_part.Set(nodes=mesh_fix_nodes, name=set_fix_nodes_name)
 
-	mesh_left_nodes = mesh.MeshNodeArray(left_nodes)
+	mesh_left_nodes = node_array(all_nodes, labels, left_nodes)
 	merged_part.Set(nodes=mesh_left_nodes, name=set_left_nodes_name)
 
-	mesh_bottom_nodes = mesh.MeshNodeArray(bottom_nodes)
+	mesh_bottom_nodes = node_array(all_nodes, labels, bottom_nodes)
 	merged_part.Set(nodes=mesh_bottom_nodes, name=set_bottom_nodes_name)
 
-	mesh_right_nodes = mesh.MeshNodeArray(right_nodes)
+	mesh_right_nodes = node_array(all_nodes, labels, right_nodes)
 	merged_part.Set(nodes=mesh_right_nodes, name=set_right_nodes_name)
 
-	mesh_top_nodes = mesh.MeshNodeArray(top_nodes)
+	mesh_top_nodes = node_array(all_nodes, labels, top_nodes)
 	merged_part.Set(nodes=mesh_top_nodes, name=set_top_nodes_name)
 
 	set_fix_nodes = auxetic_model.rootAssembly.instances[merged_part_instance_name].sets[set_fix_nodes_name]
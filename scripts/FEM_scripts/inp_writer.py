@@ -0,0 +1,710 @@
+"""
+Writes the ABAQUS .inp files of auxetic_FEM without Abaqus CAE.
+
+Each design replays the sketch of its auxetic_FEM function (same Spline, Line,
+copyRotate, radialPattern and linearPattern calls, same geometry ids), meshes
+the wire with B31 beams at elem_size, stacks z_rep layers at z_spacing and
+builds the same node sets and RigidBody crossing constraints with NumPy
+masks. The .inp is written in the parts and assembly layout of
+Job.writeInput.
+
+	python inp_writer.py SINV 200 100 20 3 3 2 1
+"""
+import math
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from node_sets import crossing_groups, snap
+
+MODEL_NAME = 'auxetic_model'
+PART_NAME = 'auxetic cell'
+MATERIAL_NAME = 'PCL'
+SECTION_NAME = 'beam_section'
+PROFILE_NAME = 'circular_profile'
+MERGED_PART_NAME = 'merged_part'
+MERGED_PART_INSTANCE_NAME = 'merged_part_instance'
+STEP_NAME = 'loading_step'
+
+STEP_TIME = 20
+MAX_INCREMENT = 0.00012
+TIME_INTERVAL = 0.1
+
+DEVIATION_FACTOR = 0.1  # seedPart(deviationFactor=...)
+MIN_SIZE_FACTOR = 0.8  # seedPart(minSizeFactor=...)
+SPLINE_SAMPLES = 64  # samples per spline interval to measure and seed it
+MERGE_TOLERANCE = 1e-7  # points closer than this fraction of the sketch size are one vertex
+
+BOUNDARY_SETS = ('fix_nodes', 'left_nodes', 'bottom_nodes', 'right_nodes', 'top_nodes')
+
+Curve = namedtuple('Curve', ['kind', 'points'])  # kind: 'line' or 'spline', points: (n, 2) control points
+
+
+def rotate(points, center, angle):
+	"""Rotates (n, 2) points by angle [deg] counterclockwise about center."""
+	c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+	center = np.asarray(center, float)
+	return (points - center) @ np.array([[c, s], [-s, c]]) + center
+
+
+class Sketch:
+	"""
+				Geometry of an Abaqus ConstrainedSketch with the same ids: 0 and 1 are
+				the construction lines of the sheet, so the first curve is g[2], and
+				every copy made by a pattern takes the next id.
+	"""
+
+	def __init__(self):
+		self.geometry = {}
+		self._next_id = 2
+
+	def _add(self, kind, points):
+		self.geometry[self._next_id] = Curve(kind, np.asarray(points, float))
+		self._next_id += 1
+
+	def Spline(self, points):
+		self._add('spline', points)
+
+	def Line(self, point1, point2):
+		self._add('line', (point1, point2))
+
+	def copyRotate(self, centerPoint, angle, objectList):
+		for curve in objectList:
+			self._add(curve.kind, rotate(curve.points, centerPoint, angle))
+
+	def radialPattern(self, geomList, vertexList, number, totalAngle, centerPoint):
+		# copies are numbered copy by copy, each in geomList order
+		step = totalAngle / number if abs(totalAngle) == 360 else totalAngle / (number - 1)
+		for k in range(1, number):
+			for curve in geomList:
+				self._add(curve.kind, rotate(curve.points, centerPoint, k * step))
+
+	def linearPattern(self, geomList, vertexList, number1, spacing1, angle1, number2, spacing2, angle2):
+		direction1 = spacing1 * np.array([math.cos(math.radians(angle1)), math.sin(math.radians(angle1))])
+		direction2 = spacing2 * np.array([math.cos(math.radians(angle2)), math.sin(math.radians(angle2))])
+		for j in range(number2):
+			for i in range(number1):
+				if i or j:
+					for curve in geomList:
+						self._add(curve.kind, curve.points + i * direction1 + j * direction2)
+
+
+# === MESH ===
+def merge_points(points, quantum):
+	"""
+				Returns (unique, inverse) of (n, 2) points merged on a grid of size quantum.
+
+				Args:
+					- points (np.ndarray): (n, 2) coordinates
+					- quantum (float): points that round to the same multiple of it are merged
+
+				Returns:
+					- tuple: the (m, 2) merged points and the index of each point in them
+	"""
+	keys = np.rint(points / quantum).astype(np.int64)
+	order = np.lexsort((keys[:, 1], keys[:, 0]))
+	sorted_keys = keys[order]
+	new = np.ones(len(points), bool)
+	new[1:] = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+	inverse = np.empty(len(points), np.int64)
+	inverse[order] = np.cumsum(new) - 1
+	return points[order[new]], inverse
+
+
+def spline_samples(points, samples=SPLINE_SAMPLES):
+	"""
+				Samples the natural cubic spline through points, parametrized by chord
+				length, with samples points per interval.
+
+				Returns:
+					- tuple: the (m * samples + 1, 2) samples, starting with points[0] and
+					  ending with points[-1], and the curvature at each sample
+	"""
+	h = np.hypot(*np.diff(points, axis=0).T)
+	m = len(h)
+	# second derivatives of the spline at the knots, zero at both ends
+	system = np.eye(m + 1)
+	rhs = np.zeros((m + 1, 2))
+	for k in range(1, m):
+		system[k, k - 1:k + 2] = (h[k - 1], 2 * (h[k - 1] + h[k]), h[k])
+		rhs[k] = 6 * ((points[k + 1] - points[k]) / h[k] - (points[k] - points[k - 1]) / h[k - 1])
+	second = np.linalg.solve(system, rhs)
+
+	u = np.linspace(0, 1, samples + 1)[:-1, None]
+	positions, curvatures = [], []
+	for k in range(m):
+		s, w = u * h[k], (1 - u) * h[k]
+		m0, m1 = second[k], second[k + 1]
+		c0, c1 = points[k] / h[k] - m0 * h[k] / 6, points[k + 1] / h[k] - m1 * h[k] / 6
+		positions.append(m0 * w ** 3 / (6 * h[k]) + m1 * s ** 3 / (6 * h[k]) + c0 * w + c1 * s)
+		d1 = -m0 * w ** 2 / (2 * h[k]) + m1 * s ** 2 / (2 * h[k]) - c0 + c1
+		d2 = m0 * w / h[k] + m1 * s / h[k]
+		cross = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+		curvatures.append(np.abs(cross) / np.maximum(np.hypot(d1[:, 0], d1[:, 1]) ** 3, 1e-300))
+	positions.append(points[-1:])
+	curvatures.append(curvatures[-1][-1:])
+	return np.concatenate(positions), np.concatenate(curvatures)
+
+
+def seed_count(length, curvature, elem_size):
+	"""
+				Returns the number of elements seedPart gives an edge: the global size,
+				refined where the chord deviation would pass DEVIATION_FACTOR of the
+				element length, but not below MIN_SIZE_FACTOR of the global size.
+	"""
+	count = max(1, int(round(length / elem_size)))
+	if curvature > 0:
+		# a chord of length l on a radius 1/k deviates by about k * l^2 / 8
+		by_deviation = math.ceil(length * curvature / (8 * DEVIATION_FACTOR))
+		count = max(count, min(by_deviation, max(1, int(length // (MIN_SIZE_FACTOR * elem_size)))))
+	return count
+
+
+def edge_nodes(curve, splits, elem_size):
+	"""
+				Seeds one curve of a sketch.
+
+				Args:
+					- curve (Curve): control points relative to the first one
+					- splits (list): control point indices where the curve is split into edges
+					- elem_size (float): global element size
+
+				Returns:
+					- list: the (n + 1, 2) nodes of every edge, end nodes included
+	"""
+	if curve.kind == 'line':
+		start, end = curve.points
+		count = seed_count(float(np.hypot(*(end - start))), 0.0, elem_size)
+		return [start + np.linspace(0, 1, count + 1)[:, None] * (end - start)]
+
+	samples, curvature = spline_samples(curve.points)
+	edges = []
+	for k0, k1 in zip(splits[:-1], splits[1:]):
+		part = samples[k0 * SPLINE_SAMPLES:k1 * SPLINE_SAMPLES + 1]
+		arc = np.concatenate([[0], np.cumsum(np.hypot(*np.diff(part, axis=0).T))])
+		count = seed_count(arc[-1], curvature[k0 * SPLINE_SAMPLES:k1 * SPLINE_SAMPLES + 1].max(), elem_size)
+		at = np.linspace(0, arc[-1], count + 1)
+		edges.append(np.column_stack([np.interp(at, arc, part[:, 0]), np.interp(at, arc, part[:, 1])]))
+	return edges
+
+
+def mesh_sketch(sketch, elem_size):
+	"""
+				Meshes the wire of a sketch with 2-node beams, as part.BaseWire,
+				seedPart and generateMesh do.
+
+				Coincident curves are meshed once. Curves are split into edges at
+				their end points and at the spline points they share with other curves
+				(where the H-cell splines cross), and edges meeting at a vertex share
+				its node. Curves that are translated copies of each other are seeded
+				once.
+
+				Returns:
+					- tuple: (n, 2) node coordinates and (m, 2) element connectivity (0-based)
+	"""
+	curves = list(sketch.geometry.values())
+	extent = max(float(np.abs(curve.points).max()) for curve in curves)
+	quantum = MERGE_TOLERANCE * max(extent, 1.0)
+
+	# coincident curves: the same control points, in either direction
+	unique = {}
+	for curve in curves:
+		keys = np.rint(curve.points / quantum).astype(np.int64)
+		key = (curve.kind, min(keys.tobytes(), keys[::-1].tobytes()))
+		unique.setdefault(key, curve)
+	curves = list(unique.values())
+
+	# vertices: curve ends, and inner spline points shared by two curves
+	points = np.concatenate([curve.points for curve in curves])
+	ends = np.concatenate([[0, len(curve.points) - 1] for curve in curves]) + \
+		np.repeat(np.cumsum([0] + [len(curve.points) for curve in curves[:-1]]), 2)
+	_, point_ids = merge_points(points, quantum)
+	counts = np.bincount(point_ids)
+	vertex = counts[point_ids] > 1
+	vertex[ends] = True
+	vertex[np.isin(point_ids, point_ids[ends])] = True
+
+	# translated copies share their seeds
+	groups = {}
+	start = 0
+	for curve in curves:
+		n = len(curve.points)
+		splits = np.flatnonzero(vertex[start:start + n])
+		relative = curve.points - curve.points[0]
+		key = (curve.kind, np.rint(relative / quantum).astype(np.int64).tobytes(), splits.tobytes())
+		groups.setdefault(key, (Curve(curve.kind, relative), list(splits), []))[2].append(curve.points[0])
+		start += n
+
+	end_points, inner_points, chains = [], [], []
+	ends_count = inner_count = 0
+	for curve, splits, origins in groups.values():
+		origins = np.array(origins)
+		for nodes in edge_nodes(curve, splits, elem_size):
+			placed = origins[:, None, :] + nodes[None, :, :]  # (copies, n + 1, 2)
+			copies, n = len(origins), len(nodes) - 1
+			end_points.append(placed[:, [0, -1]].reshape(-1, 2))
+			inner_points.append(placed[:, 1:-1].reshape(-1, 2))
+			chain = np.empty((copies, n + 1), np.int64)
+			chain[:, 0] = ends_count + 2 * np.arange(copies)
+			chain[:, -1] = chain[:, 0] + 1
+			# inner nodes are numbered after all vertices, see below
+			chain[:, 1:-1] = -1 - (inner_count + np.arange(copies * (n - 1)).reshape(copies, n - 1))
+			chains.append(chain)
+			ends_count += 2 * copies
+			inner_count += copies * (n - 1)
+
+	vertices, vertex_ids = merge_points(np.concatenate(end_points), quantum)
+	nodes = np.concatenate([vertices] + inner_points)
+	elements = []
+	for chain in chains:
+		ids = np.where(chain >= 0, vertex_ids[np.maximum(chain, 0)], len(vertices) - 1 - chain)
+		elements.append(np.column_stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()]))
+	return nodes, np.concatenate(elements)
+
+
+def stack_layers(nodes, elements, z_rep, z_spacing):
+	"""
+				Copies a meshed layer z_rep times at z_spacing, as LinearInstancePattern
+				and InstanceFromBooleanMerge do for layers that do not touch.
+
+				Returns:
+					- tuple: (n * z_rep, 3) node coordinates, layer by layer, and the elements
+	"""
+	count = len(nodes)
+	layers = np.arange(z_rep)
+	coordinates = np.empty((z_rep, count, 3))
+	coordinates[:, :, :2] = nodes
+	coordinates[:, :, 2] = (layers * z_spacing)[:, None]
+	elements = (elements[None] + (layers * count)[:, None, None]).reshape(-1, 2)
+	return coordinates.reshape(-1, 3), elements
+
+
+# === MODEL ===
+class FEMModel:
+	"""
+				Mesh, node sets and constraints of one design, as auxetic_FEM leaves
+				them in the merged part before Job.writeInput.
+
+				sets maps the set names to 0-based node indices. constraints maps the
+				RigidBody names to their (ref node set, tie region set) names; like in
+				CAE, a later constraint or set of the same name replaces the earlier one.
+	"""
+
+	def __init__(self, job_name, nodes, elements, diameter, vel_x, vel_y):
+		self.job_name = job_name
+		self.nodes = nodes
+		self.elements = elements
+		self.diameter = diameter
+		self.vel_x = vel_x
+		self.vel_y = vel_y
+		self.sets = {}
+		self.constraints = {}
+
+	def add_crossings(self, prefix, groups):
+		"""Adds a RigidBody per crossing group, named prefix + str(i) + str(j) as in auxetic_FEM."""
+		for (i, j), (ref_nodes, region_nodes) in groups.items():
+			if not len(ref_nodes) or not len(region_nodes):
+				continue  # nothing to tie, e.g. a single layer
+			name = prefix + str(i) + str(j)
+			self.sets[name + 'ref node'] = ref_nodes
+			self.sets[name + 'node_region'] = region_nodes
+			self.constraints[name] = (name + 'ref node', name + 'node_region')
+
+	def add_boundary_sets(self, masks):
+		for name, mask in zip(BOUNDARY_SETS, masks):
+			self.sets[name] = np.flatnonzero(mask)
+
+
+def layer_model(sketch, job_name, diameter, z_rep, displacement_x, displacement_y):
+	nodes, elements = mesh_sketch(sketch, 10 * diameter)
+	nodes, elements = stack_layers(nodes, elements, z_rep, diameter)
+	return FEMModel(job_name, nodes, elements, diameter, displacement_x / STEP_TIME, displacement_y / STEP_TIME)
+
+
+# === DESIGNS ===
+def s_model(a, b, diameter, x_rep, y_rep, z_rep, id, inverted):
+	"""S_REGULAR and S_INVERTED: the second adds the inner S fibers and twice as many crossings."""
+	g_offset = 10
+	x_spacing = y_spacing = 4 * a
+	x_size, y_size = 4 * a * x_rep, 4 * a * y_rep
+	frame_length = 10 * a
+
+	sketch = Sketch()
+	sketch.Spline(points=((0.0, 0.0), (b, a), (0.0, 2 * a)))
+	sketch.Spline(points=((0.0, 2 * a), (- b, 3 * a), (0.0, 4 * a)))
+	sketch.Spline(points=((0.0, 0.0), (a, - b), (2 * a, 0.0)))
+	sketch.Spline(points=((2 * a, 0.0), (3 * a, b), (4 * a, 0.0)))
+	if inverted:
+		sketch.Spline(points=((2 * a, 0.0), (2 * a - b, a), (2 * a, 2 * a)))
+		sketch.Spline(points=((2 * a, 2 * a), (2 * a + b, 3 * a), (2 * a, 4 * a)))
+		sketch.Spline(points=((0.0, 2 * a), (a, 2 * a + b), (2 * a, 2 * a)))
+		sketch.Spline(points=((2 * a, 2 * a), (3 * a, 2 * a - b), (4 * a, 2 * a)))
+	sketch.Line(point1=(0.0, y_size), point2=(0.0, y_size + frame_length))
+	sketch.Line(point1=(x_size, 0.0), point2=(x_size + frame_length, 0.0))
+	g = sketch.geometry
+
+	sketch.linearPattern(geomList=(g[2], g[3]), vertexList=(), number1=x_rep + 1, spacing1=x_spacing, angle1=0.0,
+		number2=y_rep, spacing2=y_spacing, angle2=90.0)
+	sketch.linearPattern(geomList=(g[4], g[5]), vertexList=(), number1=x_rep, spacing1=x_spacing, angle1=0.0,
+		number2=y_rep + 1, spacing2=y_spacing, angle2=90.0)
+	if inverted:
+		sketch.linearPattern(geomList=(g[6], g[7], g[8], g[9]), vertexList=(), number1=x_rep, spacing1=x_spacing,
+			angle1=0.0, number2=y_rep, spacing2=y_spacing, angle2=90.0)
+		sketch.linearPattern(geomList=(g[10],), vertexList=(), number1=2 * x_rep + 1, spacing1=x_spacing / 2,
+			angle1=0.0, number2=1, spacing2=y_spacing, angle2=90.0)
+		sketch.linearPattern(geomList=(g[11],), vertexList=(), number1=1, spacing1=x_spacing, angle1=0.0,
+			number2=2 * y_rep + 1, spacing2=y_spacing / 2, angle2=90.0)
+		x_coord_list = [i * x_spacing / 2 for i in range(2 * x_rep + 1)]
+		y_coord_list = [j * y_spacing / 2 for j in range(2 * y_rep + 1)]
+	else:
+		sketch.linearPattern(geomList=(g[6],), vertexList=(), number1=x_rep + 1, spacing1=x_spacing, angle1=0.0,
+			number2=1, spacing2=y_spacing, angle2=90.0)
+		sketch.linearPattern(geomList=(g[7],), vertexList=(), number1=1, spacing1=x_spacing, angle1=0.0,
+			number2=y_rep + 1, spacing2=y_spacing, angle2=90.0)
+		x_coord_list = [i * x_spacing for i in range(x_rep + 1)]
+		y_coord_list = [j * y_spacing for j in range(y_rep + 1)]
+
+	displacement = 3 * math.sqrt(a ** 2 + b ** 2)
+	model = layer_model(sketch, ('sinv_' if inverted else 'sreg_') + str(id), diameter, z_rep,
+		displacement * x_rep, displacement * y_rep)
+
+	tol = 0.001 * diameter
+	xyz = snap(model.nodes, tol)
+	x, y = xyz[:, 0], xyz[:, 1]
+	x_coord_list.append(x_size + frame_length)
+	y_coord_list.append(y_size + frame_length)
+	model.add_crossings('constraint', crossing_groups(xyz, x_coord_list, y_coord_list, tol,
+													   layer_size=len(model.nodes) // z_rep))
+
+	xmin_left, xmax_left = - g_offset, g_offset
+	ymin_bottom, ymax_bottom = - g_offset, g_offset
+	xmin_right, xmax_right = x_size + frame_length - g_offset, x_size + frame_length + g_offset
+	ymin_top, ymax_top = y_size + frame_length - g_offset, y_size + frame_length + g_offset
+	model.add_boundary_sets((
+		(x < g_offset) & (y < g_offset),
+		(xmin_left < x) & (x < xmax_left) & (ymax_bottom < y) & (y < ymax_top - frame_length),
+		(ymin_bottom < y) & (y < ymax_bottom) & (xmax_left < x) & (x < xmax_right - frame_length),
+		(xmin_right < x) & (x < xmax_right) & (y < ymin_top),
+		(ymin_top < y) & (y < ymax_top) & (x < xmin_right),
+	))
+	return model
+
+
+def sinv(a, b, diameter, x_rep, y_rep, z_rep, id):
+	return s_model(a, b, diameter, x_rep, y_rep, z_rep, id, inverted=True)
+
+
+def sreg(a, b, diameter, x_rep, y_rep, z_rep, id):
+	return s_model(a, b, diameter, x_rep, y_rep, z_rep, id, inverted=False)
+
+
+def stri(a, b, diameter, x_rep, y_rep, z_rep, id):
+	g_offset = 0.01
+	x_spacing = 4 * a
+	y_spacing = 4 * a * math.sin(math.pi / 3)
+	x_size, y_size = x_spacing * x_rep, y_spacing * y_rep
+	frame_length = 10 * a
+	half = y_rep // 2  # y_rep / 2 in the Python 2 of Abaqus CAE
+
+	sketch = Sketch()
+	sketch.Spline(points=((0.0, 0.0), (a, - b), (2 * a, 0.0)))
+	sketch.Spline(points=((2 * a, 0.0), (3 * a, b), (4 * a, 0.0)))
+	g = sketch.geometry
+	sketch.copyRotate(centerPoint=(0.0, 0.0), angle=60.0, objectList=(g[2], g[3]))
+	sketch.copyRotate(centerPoint=(4 * a, 0.0), angle=- 60.0, objectList=(g[2], g[3]))
+	sketch.radialPattern(geomList=[g[k] for k in range(2, 8)], vertexList=(), number=6, totalAngle=360.0,
+		centerPoint=(x_spacing / 2, y_spacing))
+	sketch.Line(point1=(x_size - x_spacing, 0.0), point2=(x_size - x_spacing + frame_length, 0.0))
+	sketch.Line(point1=(x_size - x_spacing / 2, y_spacing), point2=(x_size - x_spacing + frame_length, y_spacing))
+	if y_rep % 2 != 0:
+		sketch.Line(point1=(- 2 * a, y_size), point2=(- 2 * a, y_size + frame_length))
+		sketch.linearPattern(geomList=(g[38], g[39]), vertexList=(), number1=1, spacing1=x_spacing, angle1=0.0,
+			number2=half + 1, spacing2=2 * y_spacing, angle2=90.0)
+		sketch.linearPattern(geomList=(g[40],), vertexList=(), number1=x_rep + 1, spacing1=x_spacing, angle1=0.0,
+			number2=1, spacing2=y_spacing, angle2=90.0)
+		sketch.linearPattern(geomList=[g[k] for k in (4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 16, 17, 30, 31, 32, 33, 34, 35, 36, 37)],
+			vertexList=(), number1=x_rep - 1, spacing1=x_spacing, angle1=0.0,
+			number2=2, spacing2=y_size - y_spacing, angle2=90.0)
+	else:
+		sketch.Line(point1=(0.0, y_size), point2=(0.0, y_size + frame_length))
+		sketch.linearPattern(geomList=(g[38],), vertexList=(), number1=1, spacing1=x_spacing, angle1=0.0,
+			number2=half + 1, spacing2=2 * y_spacing, angle2=90.0)
+		sketch.linearPattern(geomList=(g[39],), vertexList=(), number1=1, spacing1=x_spacing, angle1=0.0,
+			number2=half, spacing2=2 * y_spacing, angle2=90.0)
+		sketch.linearPattern(geomList=(g[40],), vertexList=(), number1=x_rep, spacing1=x_spacing, angle1=0.0,
+			number2=1, spacing2=y_spacing, angle2=90.0)
+	sketch.linearPattern(geomList=[g[k] for k in range(2, 38)], vertexList=(), number1=x_rep - 1, spacing1=x_spacing,
+		angle1=0.0, number2=half, spacing2=2 * y_spacing, angle2=90.0)
+
+	displacement = 3 * math.sqrt(a ** 2 + b ** 2)
+	model = layer_model(sketch, 'stri_' + str(id), diameter, z_rep, displacement * x_rep, displacement * y_rep)
+
+	# crossings on two grids, matched on coordinates rounded to 0.1
+	xyz = snap(model.nodes, 0.01)
+	x, y = xyz[:, 0], xyz[:, 1]
+	rounded = np.column_stack([np.round(x, 1), np.round(y, 1), xyz[:, 2]])
+	layer_size = len(model.nodes) // z_rep
+	x_coord_list_short = [round(i * x_spacing, 1) for i in range(x_rep)] + [round(x_size - x_spacing + frame_length, 1)]
+	y_coord_list_short = [round(j * 2 * y_spacing, 1) for j in range(half + 1)]
+	x_coord_list_long = [round((i - 0.5) * x_spacing, 1) for i in range(x_rep + 1)] + [round(x_size - x_spacing + frame_length, 1)]
+	y_coord_list_long = [round((2 * j + 1) * y_spacing, 1) for j in range(int((y_rep + 1) / 2))]
+	if y_rep % 2 == 0:
+		y_coord_list_short.append(round(y_size + frame_length, 1))
+	else:
+		y_coord_list_long.append(round(y_size + frame_length, 1))
+	model.add_crossings('constraint_short',
+		crossing_groups(rounded, x_coord_list_short, y_coord_list_short, 1e-6, skip_last=y_rep % 2 == 0,
+						layer_size=layer_size))
+	model.add_crossings('constraint_long',
+		crossing_groups(rounded, x_coord_list_long, y_coord_list_long, 1e-6, skip_last=y_rep % 2 != 0,
+						layer_size=layer_size))
+
+	xmin_left, xmax_left = - x_spacing / 2 - g_offset, - x_spacing / 2 + g_offset
+	ymin_bottom, ymax_bottom = - g_offset, g_offset
+	xmin_right = x_size - x_spacing + frame_length - g_offset
+	xmax_right = x_size - x_spacing + frame_length + g_offset
+	ymin_top, ymax_top = y_size + frame_length - g_offset, y_size + frame_length + g_offset
+	on_bottom_fiber = np.zeros(len(x), bool)
+	for i in range(1, x_rep):
+		on_bottom_fiber |= np.abs(x_spacing * i - x) < g_offset
+	model.add_boundary_sets((
+		(x < g_offset) & (y < g_offset),
+		(xmin_left < x) & (x < xmax_left) & (ymax_bottom < y) & (y < ymax_top - frame_length),
+		(ymin_bottom < y) & (y < ymax_bottom) & (xmax_left < x) & (x < xmax_right - frame_length) & on_bottom_fiber,
+		(xmin_right < x) & (x < xmax_right) & (y < ymin_top),
+		(ymin_top < y) & (y < ymax_top) & (x < xmin_right),
+	))
+	return model
+
+
+def hcell(a, b, diameter, x_rep, y_rep, z_rep, id):
+	g_offset = 0.1
+	x_spacing = y_spacing = 4 * a + 2 * b
+	x_size = 2 * x_rep * (2 * a + b)
+	y_size = 4 * a * y_rep + b * (2 * y_rep - 1)
+
+	sketch = Sketch()
+	sketch.Spline(points=((0, 0), (0.2 * a, 0.8 * a), (a, a), (a + 0.8 * a, a + 0.2 * a), (2 * a, 2 * a)))
+	sketch.Spline(points=((0, 2 * a), (0.8 * a, 2 * a - 0.2 * a), (a, a), (a + 0.2 * a, 0.2 * a), (2 * a, 0)))
+	sketch.Spline(points=((2 * a, 2 * a + b), (2 * a - 0.2 * a, 2 * a + b + 0.8 * a), (a, 2 * a + b + a),
+		(0.2 * a, 2 * a + b + a + 0.2 * a), (0, 4 * a + b)))
+	sketch.Spline(points=((0, 2 * a + b), (0.8 * a, 2 * a + b + 0.2 * a), (a, 2 * a + b + a),
+		(a + 0.2 * a, 2 * a + b + a + 0.8 * a), (2 * a, 4 * a + b)))
+	sketch.Spline(points=((2 * a + b, 0), (2 * a + b + 0.8 * a, 0.2 * a), (2 * a + b + a, a),
+		(2 * a + b + a + 0.2 * a, a + 0.8 * a), (4 * a + b, 2 * a)))
+	sketch.Spline(points=((4 * a + b, 0), (4 * a + b - 0.2 * a, 0.8 * a), (2 * a + b + a, a),
+		(2 * a + b + 0.2 * a, a + 0.2 * a), (2 * a + b, 2 * a)))
+	sketch.Spline(points=((2 * a + b, 4 * a + b), (2 * a + b + 0.8 * a, 4 * a + b - 0.2 * a), (3 * a + b, 3 * a + b),
+		(3 * a + b + 0.2 * a, 3 * a + b - 0.8 * a), (4 * a + b, 2 * a + b)))
+	sketch.Spline(points=((2 * a + b, 2 * a + b), (2 * a + b + 0.2 * a, 2 * a + b + 0.8 * a), (3 * a + b, 3 * a + b),
+		(3 * a + b + 0.8 * a, 3 * a + b + 0.2 * a), (4 * a + b, 4 * a + b)))
+	sketch.Line(point1=(- b, 2 * a), point2=(0, 2 * a))
+	sketch.Line(point1=(- b, 2 * a + b), point2=(0, 2 * a + b))
+	sketch.Line(point1=(2 * a, 0), point2=(2 * a + b, 0))
+	sketch.Line(point1=(2 * a, 4 * a + b), point2=(2 * a + b, 4 * a + b))
+	sketch.Line(point1=(2 * a, 2 * a), point2=(2 * a, 2 * a + b))
+	sketch.Line(point1=(2 * a + b, 2 * a), point2=(2 * a + b, 2 * a + b))
+	sketch.Line(point1=(0, 4 * a + b), point2=(0, 4 * a + 2 * b))
+	sketch.Line(point1=(4 * a + b, 4 * a + b), point2=(4 * a + b, 4 * a + 2 * b))
+	sketch.Line(point1=(0, 0), point2=(0, - b))
+	sketch.Line(point1=(4 * a + b, 0), point2=(4 * a + b, - b))
+	g = sketch.geometry
+	sketch.linearPattern(geomList=[g[k] for k in (2, 3, 4, 5, 6, 7, 8, 9, 12, 13, 14, 15)], vertexList=(),
+		number1=x_rep, spacing1=x_spacing, angle1=0.0, number2=y_rep, spacing2=y_spacing, angle2=90.0)
+	sketch.linearPattern(geomList=(g[10], g[11]), vertexList=(), number1=x_rep + 1, spacing1=x_spacing, angle1=0.0,
+		number2=y_rep, spacing2=y_spacing, angle2=90.0)
+	sketch.linearPattern(geomList=(g[16], g[17]), vertexList=(), number1=x_rep, spacing1=x_spacing, angle1=0.0,
+		number2=y_rep - 1, spacing2=y_spacing, angle2=90.0)
+	sketch.linearPattern(geomList=(g[18], g[19]), vertexList=(), number1=x_rep, spacing1=x_spacing, angle1=0.0,
+		number2=2, spacing2=y_size + b, angle2=90.0)
+
+	model = layer_model(sketch, 'hcell_' + str(id), diameter, z_rep, x_rep * 4 * a, y_rep * 4 * a)
+
+	# no crossing constraints in this design
+	x, y = model.nodes[:, 0], model.nodes[:, 1]
+	xmin_left, xmax_left = - b - g_offset, - b + g_offset
+	ymin_bottom, ymax_bottom = - b - g_offset, - b + g_offset
+	xmin_right, xmax_right = x_size - g_offset, x_size + g_offset
+	ymin_top, ymax_top = y_size + b - g_offset, y_size + b + g_offset
+	model.add_boundary_sets((
+		(x < g_offset) & (ymin_bottom < y) & (y < ymax_bottom),
+		(xmin_left < x) & (x < xmax_left) & (ymax_bottom < y) & (y < ymax_top),
+		(ymin_bottom < y) & (y < ymax_bottom) & (g_offset < x) & (x < xmax_right),
+		(xmin_right < x) & (x < xmax_right) & (y < ymin_top),
+		(ymin_top < y) & (y < ymax_top) & (x < xmin_right),
+	))
+	return model
+
+
+DESIGNS = {"HCELL": hcell, "SREG": sreg, "SINV": sinv, "STRI": stri}
+
+
+# === INPUT FILE ===
+def number(value):
+	"""Formats a float as Abaqus does: 12 significant digits and always a decimal point."""
+	text = '%.12g' % value
+	return text if ('.' in text or 'e' in text or 'n' in text) else text + '.'
+
+
+def id_lines(ids, per_line=16):
+	"""Data lines of a 1-based node or element list, per_line ids a line."""
+	ids = [str(n) for n in np.asarray(ids) + 1]
+	return [', '.join(ids[k:k + per_line]) for k in range(0, len(ids), per_line)]
+
+
+def inp_lines(model):
+	"""Yields the .inp file of a model chunk by chunk."""
+	instance = MERGED_PART_INSTANCE_NAME
+	yield '\n'.join([
+		'*Heading',
+		'** Job name: %s Model name: %s' % (model.job_name, MODEL_NAME),
+		'** Generated by: inp_writer.py',
+		'*Preprint, echo=NO, model=NO, history=NO, contact=NO',
+		'**',
+		'** PARTS',
+		'**',
+		'*Part, name="%s"' % PART_NAME,
+		'*End Part',
+		'**',
+		'*Part, name=%s' % MERGED_PART_NAME,
+		'*Node',
+		'',
+	])
+	table = np.column_stack([np.arange(1, len(model.nodes) + 1), model.nodes]).ravel().tolist()
+	yield ('%7d, %.12g, %.12g, %.12g\n' * len(model.nodes)) % tuple(table)
+	yield '*Element, type=B31\n'
+	table = np.column_stack([np.arange(1, len(model.elements) + 1), model.elements + 1]).ravel().tolist()
+	yield ('%d, %d, %d\n' * len(model.elements)) % tuple(table)
+	for name, nodes in model.sets.items():
+		yield '\n'.join(['*Nset, nset=%s' % (('"%s"' % name) if ' ' in name else name)] + id_lines(nodes) + [''])
+	yield '\n'.join([
+		'*Elset, elset=_beam_section_elements, internal, generate',
+		'%d, %d, 1' % (1, len(model.elements)),
+		'** Section: %s  Profile: %s' % (SECTION_NAME, PROFILE_NAME),
+		'*Beam Section, elset=_beam_section_elements, material=%s, poisson = 0.3, temperature=GRADIENTS, section=CIRC'
+		% MATERIAL_NAME,
+		number(model.diameter / 2),
+		'0.,0.,-1.',
+		'*End Part',
+		'**',
+		'**',
+		'** ASSEMBLY',
+		'**',
+		'*Assembly, name=Assembly',
+		'**',
+		'*Instance, name=%s, part=%s' % (instance, MERGED_PART_NAME),
+		'*End Instance',
+		'**',
+		'',
+	])
+	for name, (ref_set, region_set) in model.constraints.items():
+		# the reference node is given by label: set names with spaces cannot be prefixed by the instance
+		yield '** Constraint: %s\n*Rigid Body, ref node=%s.%d, tie nset=%s.%s\n' % (
+			name, instance, model.sets[ref_set][0] + 1, instance, region_set)
+	yield '\n'.join([
+		'*End Assembly',
+		'**',
+		'** MATERIALS',
+		'**',
+		'*Material, name=%s' % MATERIAL_NAME,
+		'*Density',
+		'1.145e-12,',
+		'*Elastic',
+		'0.1, 0.3',
+		'*Plastic',
+		'0.012, 0.',
+		'0.0145, 0.25',
+		'0.017, 0.5',
+		'0.0195, 1.',
+		'** ----------------------------------------------------------------',
+		'**',
+		'** STEP: %s' % STEP_NAME,
+		'**',
+		'*Step, name=%s, nlgeom=YES' % STEP_NAME,
+		'*Dynamic, Explicit',
+		', %s, , %s' % (number(STEP_TIME), number(MAX_INCREMENT)),
+		'*Bulk Viscosity',
+		'0.06, 1.2',
+		'**',
+		'** BOUNDARY CONDITIONS',
+		'**',
+		'** Name: fix_nodes_bc Type: Symmetry/Antisymmetry/Encastre',
+		'*Boundary',
+		'%s.fix_nodes, ENCASTRE' % instance,
+		'** Name: bottom_bc Type: Symmetry/Antisymmetry/Encastre',
+		'*Boundary',
+		'%s.bottom_nodes, YSYMM' % instance,
+		'** Name: top_bc Type: Velocity/Angular velocity',
+		'*Boundary, type=VELOCITY',
+		'%s.top_nodes, 1, 1' % instance,
+		'%s.top_nodes, 2, 2, %s' % (instance, number(model.vel_y)),
+		'%s.top_nodes, 3, 3' % instance,
+		'** Name: left_bc Type: Symmetry/Antisymmetry/Encastre',
+		'*Boundary',
+		'%s.left_nodes, XSYMM' % instance,
+		'** Name: right_bc Type: Velocity/Angular velocity',
+		'*Boundary, type=VELOCITY',
+		'%s.right_nodes, 1, 1, %s' % (instance, number(model.vel_x)),
+		'%s.right_nodes, 2, 2' % instance,
+		'%s.right_nodes, 3, 3' % instance,
+		'**',
+		'** OUTPUT REQUESTS',
+		'**',
+		'*Restart, write, number interval=1, time marks=NO',
+		'**',
+		'** FIELD OUTPUT: F-Output-1',
+		'**',
+		'*Output, field, variable=PRESELECT, number interval=20',
+		'',
+	])
+	for side, component in (('left', 1), ('bottom', 2), ('right', 1), ('top', 2)):
+		for variable in ('RF', 'U'):
+			yield '\n'.join([
+				'**',
+				'** HISTORY OUTPUT: %s_%s_output' % (side, variable),
+				'**',
+				'*Output, history, time interval=%s' % number(TIME_INTERVAL),
+				'*Node Output, nset=%s.%s_nodes' % (instance, side),
+				'%s%d, ' % (variable, component),
+				'',
+			])
+	yield '\n'.join([
+		'**',
+		'** HISTORY OUTPUT: H-Output-1',
+		'**',
+		'*Output, history, variable=PRESELECT',
+		'*End Step',
+		'',
+	])
+
+
+def write_inp(model, path):
+	with open(path, 'w') as inp_file:
+		for chunk in inp_lines(model):
+			inp_file.write(chunk)
+
+
+def generate(design, a, b, d, xr, yr, zr, id, path=None):
+	"""
+				Writes the .inp file of one design, as abaqus_wrapper.py does in Abaqus
+				CAE.
+
+				Args:
+					- design (str): HCELL, SREG, SINV or STRI
+					- a, b, d (float): design parameters and fiber diameter
+					- xr, yr, zr (int): repetitions in x, y and z (layers)
+					- id: job number, the file is <design>_<id>.inp
+					- path (str): output file, None for <design>_<id>.inp in the working directory
+
+				Returns:
+					- str: the path written
+	"""
+	model = DESIGNS[design.upper()](float(a), float(b), float(d), int(xr), int(yr), int(zr), id)
+	path = path or model.job_name + '.inp'
+	write_inp(model, path)
+	return path
+
+
+if __name__ == '__main__':
+	generate(*sys.argv[-8:])
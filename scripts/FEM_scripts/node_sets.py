@@ -0,0 +1,73 @@
+"""
+Node classification shared by auxetic_FEM (inside Abaqus CAE) and inp_writer:
+coordinates as one NumPy array, crossings looked up in a sorted index and
+boundary sets as boolean masks. Kept compatible with the Python 2 of older
+Abaqus releases.
+"""
+import numpy as np
+
+
+def snap(coordinates, tol):
+	"""Returns the coordinates with the values within tol of zero set to zero."""
+	return np.where(np.abs(coordinates) <= tol, 0.0, coordinates)
+
+
+def grid_index(values, coords, tol=0.0):
+	"""
+				Returns the index in coords of each value within tol of one of them, -1
+				elsewhere. Repeated coords give the first index, as list.index does.
+
+				Args:
+					- values (np.ndarray): coordinates to look up
+					- coords (list): coordinates of the grid lines, in any order
+					- tol (float): distance within which a value is on a grid line, 0 to match exactly
+
+				Returns:
+					- np.ndarray: index of each value in coords, or -1
+	"""
+	coords = np.asarray(coords, float)
+	order = np.argsort(coords, kind='mergesort')  # stable: the first of repeated coords
+	ordered = coords[order]
+	after = np.clip(np.searchsorted(ordered, values - tol), 0, len(ordered) - 1)
+	return np.where(np.abs(ordered[after] - values) <= tol, order[after], -1)
+
+
+def crossing_groups(coordinates, x_coords, y_coords, tol=0.0, skip_last=True, layer_size=None):
+	"""
+				Groups the nodes on the fiber crossings of a design by crossing.
+
+				Args:
+					- coordinates (np.ndarray): (n, 3) snapped node coordinates
+					- x_coords, y_coords (list): coordinates of the crossings
+					- tol (float): distance within which a node is on a crossing
+					- skip_last (bool): leave out the crossing of the last x and y
+					- layer_size (int): the nodes are copies of the first layer_size ones
+					  (the first layer), layer by layer: only those are searched, None to
+					  search all
+
+				Returns:
+					- dict: (i, j) -> (ref_nodes, region_nodes) node indices of every crossing
+					  with nodes, in (j, i) order; ref_nodes are on the first layer (z = 0),
+					  region_nodes on the others
+	"""
+	if layer_size is not None:
+		groups = crossing_groups(coordinates[:layer_size], x_coords, y_coords, tol, skip_last)
+		shifts = layer_size * np.arange(1, len(coordinates) // layer_size)
+		return dict((cell, (ref_nodes, (shifts[:, None] + ref_nodes[None, :]).ravel()))
+					for cell, (ref_nodes, _) in groups.items())
+	i = grid_index(coordinates[:, 0], x_coords, tol)
+	j = grid_index(coordinates[:, 1], y_coords, tol)
+	on = (i >= 0) & (j >= 0)
+	if skip_last:
+		on &= (i != len(x_coords) - 1) | (j != len(y_coords) - 1)
+	nodes = np.flatnonzero(on)
+	cells = j[nodes] * len(x_coords) + i[nodes]
+	order = np.argsort(cells, kind='mergesort')
+	nodes, cells = nodes[order], cells[order]
+	ref = np.abs(coordinates[nodes, 2]) < 0.01
+	groups = {}
+	for run in np.split(np.arange(len(nodes)), np.flatnonzero(np.diff(cells)) + 1):
+		if len(run):
+			cell = int(cells[run[0]])
+			groups[(cell % len(x_coords), cell // len(x_coords))] = (nodes[run][ref[run]], nodes[run][~ref[run]])
+	return groups
@@ -0,0 +1,324 @@
+"""
+Offline stand-in for the subset of the Abaqus scripting API that auxetic_FEM
+uses, to run, profile and benchmark its design functions without Abaqus CAE
+or a license.
+
+The model database records what the scripts create. ConstrainedSketch is the
+Sketch of inp_writer (same geometry ids and patterns), generateMesh meshes it
+with mesh_sketch and places a copy per merged instance, so parts get a
+realistic node and element population; PartFromMesh, Node and Element build
+orphan meshes. Job.writeInput writes the sets, RigidBody constraints and
+boundary conditions of the model with write_inp.
+Instances that touch are not merged, which is all auxetic_FEM needs (its
+layers are one diameter apart).
+
+Put this folder before scripts/FEM_scripts on sys.path (or PYTHONPATH):
+
+	PYTHONPATH=offline_abaqus python abaqus_wrapper.py SREG 200 100 20 3 3 2 1
+"""
+import numpy as np
+
+import inp_writer
+from abaqusConstants import LINE2
+from mesh import MeshElement, MeshElementArray, MeshNode, MeshNodeArray
+
+__all__ = ['Mdb', 'mdb', 'session']
+
+
+class Viewport(object):
+
+	def setValues(self, **options):
+		pass
+
+
+class Session(object):
+
+	def __init__(self):
+		self.viewports = {'Viewport: 1': Viewport()}
+
+
+class Material(object):
+
+	def __init__(self, name):
+		self.name = name
+		self.behaviours = {}
+
+	def Density(self, table):
+		self.behaviours['density'] = table
+
+	def Elastic(self, table):
+		self.behaviours['elastic'] = table
+
+	def Plastic(self, table):
+		self.behaviours['plastic'] = table
+
+
+class ConstrainedSketch(inp_writer.Sketch):
+
+	def __init__(self, name, sheetSize, **options):
+		inp_writer.Sketch.__init__(self)
+		self.name = name
+
+
+class Set(object):
+	"""Node set of a part; labels holds the labels of its nodes."""
+
+	def __init__(self, name, labels):
+		self.name = name
+		self.labels = labels
+
+
+class Part(object):
+	"""
+				A wire part: the sketches of its BaseWire, each placed at one or more
+				offsets (one per instance it was merged from), and after generateMesh
+				its B31 mesh. PartFromMesh, Node and Element build orphan meshes.
+	"""
+
+	def __init__(self, model, name, dimensionality=None, type=None):
+		self.model = model
+		self.name = name
+		self.wires = []  # (sketch, (k, 3) offsets)
+		self.elem_size = None
+		self.nodes = MeshNodeArray([])
+		self.elements = MeshElementArray()
+		self.sets = {}
+		self.sections = []
+
+	def BaseWire(self, sketch):
+		self.wires.append((sketch, np.zeros((1, 3))))
+
+	@property
+	def edges(self):
+		return [curve for sketch, _ in self.wires for curve in sketch.geometry.values()]
+
+	def SectionAssignment(self, region, sectionName, **options):
+		self.sections.append(sectionName)
+
+	def assignBeamSectionOrientation(self, region, method, n1):
+		pass
+
+	def seedPart(self, size, deviationFactor=inp_writer.DEVIATION_FACTOR, minSizeFactor=inp_writer.MIN_SIZE_FACTOR):
+		self.elem_size = size
+
+	def generateMesh(self):
+		self.nodes = MeshNodeArray([])
+		self.elements = MeshElementArray()
+		for sketch, offsets in self.wires:
+			nodes, elements = inp_writer.mesh_sketch(sketch, self.elem_size)
+			for offset in offsets:
+				placed = np.zeros((len(nodes), 3))
+				placed[:, :2] = nodes
+				placed = [self.Node(tuple(xyz)) for xyz in (placed + offset).tolist()]
+				for a, b in elements.tolist():
+					self.Element((placed[a], placed[b]), LINE2)
+
+	def setElementType(self, regions, elemTypes):
+		pass
+
+	def PartFromMesh(self, name, copySets=False):
+		"""Copies the mesh into a new orphan mesh part, with the same labels."""
+		orphan = self.model.Part(name=name)
+		copies = {}
+		for node in self.nodes:
+			copies[node.label] = orphan.Node(node.coordinates, label=node.label)
+		for element in self.elements:
+			orphan.Element(tuple(copies[node.label] for node in element.getNodes()), LINE2, label=element.label)
+		return orphan
+
+	def Node(self, coordinates, localCsys=None, label=None):
+		node = MeshNode(label or (self.nodes[-1].label + 1 if len(self.nodes) else 1), tuple(coordinates))
+		self.nodes.append(node)
+		return node
+
+	def Element(self, nodes, elemShape, label=None):
+		element = MeshElement(label or (self.elements[-1].label + 1 if self.elements else 1), tuple(nodes))
+		self.elements.append(element)
+		return element
+
+	def Set(self, name, nodes):
+		self.sets[name] = Set(name, [node.label for node in nodes])
+		return self.sets[name]
+
+	def mesh_arrays(self):
+		"""
+					Returns the (n, 3) node coordinates, the (m, 2) 0-based element
+					connectivity and a dict of the 0-based index of every node label.
+		"""
+		index = dict((node.label, i) for i, node in enumerate(self.nodes))
+		coordinates = np.array([node.coordinates for node in self.nodes], float).reshape(-1, 3)
+		connectivity = np.array([[index[node.label] for node in element.getNodes()] for element in self.elements],
+								int).reshape(-1, 2)
+		return coordinates, connectivity, index
+
+
+class Instance(object):
+	"""A dependent instance: its sets are those of its part."""
+
+	def __init__(self, name, part, offset=(0.0, 0.0, 0.0)):
+		self.name = name
+		self.part = part
+		self.offset = np.asarray(offset, float)
+
+	@property
+	def sets(self):
+		return self.part.sets
+
+
+class Features(object):
+
+	def __init__(self, assembly):
+		self.assembly = assembly
+
+	def changeKey(self, fromName, toName):
+		instances = self.assembly.instances
+		instances[toName] = instances.pop(fromName)
+		instances[toName].name = toName
+
+
+class Assembly(object):
+
+	def __init__(self, model):
+		self.model = model
+		self.instances = {}
+		self.features = Features(self)
+
+	def Instance(self, name, part, dependent=None):
+		self.instances[name] = Instance(name, part)
+		return self.instances[name]
+
+	def LinearInstancePattern(self, instanceList, direction1, direction2, number1, number2, spacing1, spacing2):
+		"""Copies the instances on a grid, named <instance>-lin-<i>-<j> as in CAE."""
+		step1 = spacing1 * np.asarray(direction1, float)
+		step2 = spacing2 * np.asarray(direction2, float)
+		for name in instanceList:
+			original = self.instances[name]
+			for j in range(number2):
+				for i in range(number1):
+					if i or j:
+						copy_name = '%s-lin-%d-%d' % (name, i + 1, j + 1)
+						self.instances[copy_name] = Instance(copy_name, original.part,
+															 original.offset + i * step1 + j * step2)
+
+	def InstanceFromBooleanMerge(self, name, instances, originalInstances=None, domain=None):
+		"""Merges the wires of the instances into a new part and instances it as <name>-1."""
+		merged = self.model.Part(name=name)
+		offsets = {}
+		for instance in list(instances):
+			for sketch, part_offsets in instance.part.wires:
+				offsets.setdefault(id(sketch), (sketch, []))[1].append(part_offsets + instance.offset)
+		merged.wires = [(sketch, np.concatenate(placed)) for sketch, placed in offsets.values()]
+		if originalInstances == 'DELETE':
+			for instance in list(instances):
+				self.instances.pop(instance.name, None)
+		return self.Instance(name + '-1', merged)
+
+
+class Model(object):
+
+	def __init__(self, name):
+		self.name = name
+		self.materials = {}
+		self.sketches = {}
+		self.parts = {}
+		self.profiles = {}
+		self.sections = {}
+		self.steps = {}
+		self.constraints = {}
+		self.boundaryConditions = {}
+		self.historyOutputRequests = {}
+		self.rootAssembly = Assembly(self)
+
+	def setValues(self, **options):
+		pass
+
+	def Material(self, name):
+		self.materials[name] = Material(name)
+		return self.materials[name]
+
+	def ConstrainedSketch(self, name, sheetSize, **options):
+		self.sketches[name] = ConstrainedSketch(name, sheetSize)
+		return self.sketches[name]
+
+	def Part(self, name, dimensionality=None, type=None):
+		self.parts[name] = Part(self, name, dimensionality, type)
+		return self.parts[name]
+
+	def CircularProfile(self, name, r):
+		self.profiles[name] = r
+
+	def BeamSection(self, name, profile, material, **options):
+		self.sections[name] = (profile, material)
+
+	def ExplicitDynamicsStep(self, name, previous, **options):
+		self.steps[name] = options
+
+	def RigidBody(self, name, refPointRegion, tieRegion):
+		self.constraints[name] = (refPointRegion, tieRegion)
+
+	def EncastreBC(self, name, createStepName, region):
+		self.boundaryConditions[name] = (region, {})
+
+	def XsymmBC(self, name, createStepName, region):
+		self.boundaryConditions[name] = (region, {})
+
+	def YsymmBC(self, name, createStepName, region):
+		self.boundaryConditions[name] = (region, {})
+
+	def VelocityBC(self, name, createStepName, region, **velocities):
+		self.boundaryConditions[name] = (region, velocities)
+
+	def HistoryOutputRequest(self, name, createStepName, variables, region, **options):
+		self.historyOutputRequests[name] = (region, variables)
+
+
+class Job(object):
+
+	def __init__(self, name, model, **options):
+		self.name = name
+		self.model = model
+
+	def writeInput(self, consistencyChecking=None):
+		"""
+					Writes <name>.inp with inp_writer from the mesh, sets and constraints
+					of the merged part, its nodes and elements numbered from 1 in order.
+		"""
+		model = mdb.models[self.model]
+		part = model.parts[inp_writer.MERGED_PART_NAME]
+		coordinates, connectivity, index = part.mesh_arrays()
+		velocities = [options for _, options in model.boundaryConditions.values() if options]
+		femmodel = inp_writer.FEMModel(self.name, coordinates, connectivity,
+									   2 * model.profiles[inp_writer.PROFILE_NAME],
+									   max(options.get('v1', 0.0) for options in velocities),
+									   max(options.get('v2', 0.0) for options in velocities))
+		femmodel.sets = dict((name, np.array([index[label] for label in node_set.labels], int))
+							 for name, node_set in part.sets.items())
+		for name, (ref_set, region_set) in model.constraints.items():
+			if len(ref_set.labels) and len(region_set.labels):  # as add_crossings, nothing to tie otherwise
+				femmodel.constraints[name] = (ref_set.name, region_set.name)
+		inp_writer.write_inp(femmodel, self.name + '.inp')
+
+
+class ModelDatabase(object):
+
+	def __init__(self):
+		self.models = {}
+		self.jobs = {}
+
+	def Model(self, name):
+		self.models[name] = Model(name)
+		return self.models[name]
+
+	def Job(self, name, model, **options):
+		self.jobs[name] = Job(name, model, **options)
+		return self.jobs[name]
+
+
+mdb = ModelDatabase()
+session = Session()
+
+
+def Mdb():
+	"""Empties the model database; in place, since the scripts hold mdb from their import."""
+	ModelDatabase.__init__(mdb)
+	return mdb
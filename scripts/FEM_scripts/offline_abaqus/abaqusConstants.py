@@ -0,0 +1,13 @@
+"""Symbolic constants of the offline stand-in for the Abaqus scripting API, see abaqus.py."""
+
+
+class SymbolicConstant(str):
+	"""A constant that compares and prints as its name, like abaqusConstants.SymbolicConstant."""
+
+	def __repr__(self):
+		return str(self)
+
+
+for _name in ('ANALYSIS', 'B31', 'DEFAULT', 'DEFORMABLE_BODY', 'DELETE', 'DOMAIN', 'DOUBLE', 'DURING_ANALYSIS',
+			  'GEOMETRY', 'LINE2', 'N1_COSINES', 'OFF', 'ON', 'PERCENTAGE', 'SINGLE', 'STANDARD', 'THREE_D'):
+	globals()[_name] = SymbolicConstant(_name)
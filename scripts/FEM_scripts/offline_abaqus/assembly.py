@@ -0,0 +1 @@
+"""Offline stand-in for the assembly module of Abaqus CAE, see abaqus.py. The assembly is abaqus.Assembly."""
@@ -0,0 +1 @@
+"""Offline stand-in for the interaction module of Abaqus CAE, see abaqus.py. Constraints are recorded by abaqus.Model."""
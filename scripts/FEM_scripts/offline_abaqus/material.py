@@ -0,0 +1 @@
+"""Offline stand-in for the material module of Abaqus CAE, see abaqus.py. Material behaviours are recorded by abaqus.Material."""
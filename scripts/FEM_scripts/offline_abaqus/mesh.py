@@ -0,0 +1,70 @@
+"""Offline stand-in for the mesh module of Abaqus CAE, see abaqus.py."""
+
+
+class ElemType(object):
+
+	def __init__(self, elemCode, elemLibrary, **options):
+		self.elemCode = elemCode
+		self.elemLibrary = elemLibrary
+
+
+class MeshNode(object):
+	"""One node of a part mesh: its 1-based label and its (x, y, z) coordinates."""
+
+	__slots__ = ('label', 'coordinates')
+
+	def __init__(self, label, coordinates):
+		self.label = label
+		self.coordinates = coordinates
+
+
+class MeshElement(object):
+	"""One element of a part mesh: its label and the MeshNode objects it connects."""
+
+	__slots__ = ('label', 'nodes')
+
+	def __init__(self, label, nodes):
+		self.label = label
+		self.nodes = nodes
+
+	def getNodes(self):
+		return self.nodes
+
+
+class MeshNodeArray(object):
+	"""
+				Sequence of MeshNode objects, as part.nodes returns.
+
+				Iterating it hands out the nodes one by one, which is what makes node
+				loops slow in Abaqus CAE, and sequenceFromLabels looks labels up in the
+				nodes of the part.
+	"""
+
+	def __init__(self, nodes, by_label=None):
+		self._nodes = list(nodes)
+		self._by_label = by_label
+
+	def __len__(self):
+		return len(self._nodes)
+
+	def __iter__(self):
+		return iter(self._nodes)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return MeshNodeArray(self._nodes[index], self._by_label)
+		return self._nodes[index]
+
+	def append(self, node):
+		self._nodes.append(node)
+		if self._by_label is not None:
+			self._by_label[node.label] = node
+
+	def sequenceFromLabels(self, labels):
+		if self._by_label is None:
+			self._by_label = dict((node.label, node) for node in self._nodes)
+		return MeshNodeArray([self._by_label[label] for label in labels], self._by_label)
+
+
+class MeshElementArray(list):
+	"""Sequence of MeshElement objects, as part.elements returns."""
@@ -0,0 +1 @@
+"""Offline stand-in for the part module of Abaqus CAE, see abaqus.py. Parts are abaqus.Part."""
@@ -0,0 +1,8 @@
+"""Offline stand-in for the regionToolset module of Abaqus CAE, see abaqus.py."""
+
+
+class Region(object):
+	"""Entities a section, orientation or element type is assigned to."""
+
+	def __init__(self, **entities):
+		self.entities = entities
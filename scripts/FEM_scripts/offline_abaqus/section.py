@@ -0,0 +1 @@
+"""Offline stand-in for the section module of Abaqus CAE, see abaqus.py. Profiles and sections are recorded by abaqus.Model."""
@@ -0,0 +1 @@
+"""Offline stand-in for the sketch module of Abaqus CAE, see abaqus.py. ConstrainedSketch is abaqus.ConstrainedSketch."""
@@ -0,0 +1 @@
+"""Offline stand-in for the step module of Abaqus CAE, see abaqus.py. Steps are recorded by abaqus.Model."""
@@ -0,0 +1,87 @@
+MOTION_CODES = ('G0', 'G1', 'G2', 'G3')
+WORDS = ('X', 'Y', 'I', 'J', 'F')
+
+
+class Move:
+  """
+  One relative G0-G3 move passed between the streaming stages.
+
+  x, y, i, j and f are None when the word is left out. fmt holds the format
+  spec of every word ('' writes str() of the value) and axes the letter every
+  word is written with, so renaming an axis does not touch the values.
+  """
+  __slots__ = ('code', 'x', 'y', 'i', 'j', 'f', 'fmt', 'axes')
+
+  def __init__(self, code, x=None, y=None, i=None, j=None, f=None, fmt=('', '', '', '', ''), axes=WORDS):
+    self.code = code
+    self.x = x
+    self.y = y
+    self.i = i
+    self.j = j
+    self.f = f
+    self.fmt = fmt
+    self.axes = axes
+
+  @classmethod
+  def parse(cls, code:str):
+    """Returns the Move of a G0-G3 line (U is read as Y), None for any other line."""
+    splited_code = code.split()
+    if len(splited_code) < 2 or splited_code[0] not in MOTION_CODES:
+      return None
+    move = cls(splited_code[0])
+    for word in splited_code[1:]:
+      prefix = word[0].upper()
+      val = float(word[1:])
+      if prefix == 'X':
+        move.x = val
+      elif prefix == 'Y' or prefix == 'U':
+        move.y = val
+      elif prefix == 'I':
+        move.i = val
+      elif prefix == 'J':
+        move.j = val
+      elif prefix == 'F':
+        move.f = val
+    return move
+
+  def to_gcode(self):
+    words = [self.code]
+    for axis, val, spec in zip(self.axes, (self.x, self.y, self.i, self.j, self.f), self.fmt):
+      if val is not None:
+        words.append(axis + format(val, spec))
+    return ' '.join(words)
+
+  def __repr__(self):
+    return f'Move({self.to_gcode()!r})'
+
+
+def emit(target, item):
+  """
+  Passes a Move or a text line to the next stage.
+
+  Stages (PrintTransformation, PrintingStrategy, GcodeWriter) take the item
+  as it is through send(); any other target is a text file and gets the line.
+  """
+  send = getattr(target, 'send', None)
+  if send is not None:
+    send(item)
+  elif isinstance(item, Move):
+    target.write(item.to_gcode() + '\n')
+  else:
+    target.write(item + '\n')
+
+
+class GcodeWriter:
+  """Last stage of a pipeline: formats the moves and writes the lines to a text file."""
+
+  def __init__(self, file):
+    self.file = file
+
+  def send(self, item):
+    if isinstance(item, Move):
+      self.file.write(item.to_gcode() + '\n')
+    else:
+      self.file.write(item.strip() + '\n')
+
+  def write(self, code):
+    self.send(code)
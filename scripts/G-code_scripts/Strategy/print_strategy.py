@@ -1,5 +1,7 @@
 import math
 
+from .move import Move, emit
+
 class PrintingStrategy():
   #***** Printing strategies ******
   STRATEGY_NONE = 1
@@ -42,37 +44,36 @@ class PrintingStrategy():
       if cloverleaf_speed:
         self.cloverleaf_speed = cloverleaf_speed
 
-  def move(self, code:str, strategy:int=None):
-    # pre processing
-    code = code.strip()
+  def move(self, code, strategy:int=None):
+    # code is a G-code line or a Move record from the previous stage
+    if isinstance(code, Move):
+      move = code
+    else:
+      # pre processing
+      code = code.strip()
+      move = Move.parse(code)
+      assert move is not None, f'not a G0-G3 move: {code}'
+    self._apply(code, move, strategy)
 
+  def _apply(self, code, move:Move, strategy:int=None):
     if not strategy:
       strategy = self.strategy
 
-    # parse x and y position
-    splited_code = code.split(' ')
-    assert len(splited_code) >= 2
-    assert splited_code[0][0] == 'G'
-
-    dx = 0
-    dy = 0
-    next_speed = None
-    for i in range(1, len(splited_code)):
-      prefix = splited_code[i][0].upper()
-      val = float(splited_code[i][1:])
-      if prefix == 'X':
-        dx = val
-      elif prefix == 'Y' or prefix == 'U':
-        dy = val
-      elif prefix == 'F':
-        next_speed = val
+    dx = move.x if move.x is not None else 0
+    dy = move.y if move.y is not None else 0
+    next_speed = move.f
     if not next_speed:
       next_speed = self.default_speed
 
+    if strategy != self.STRATEGY_PAUSE and abs(dx) < 1e-9 and abs(dy) < 1e-9:
+      # nothing to overshoot or round off (e.g. G0 X0 Y0), and not a corner for the next move
+      self.write(code)
+      return
+
     # post processing
     if strategy == self.STRATEGY_PAUSE:
-      self.file.write(code+'\n')
-      self.file.write(f'G4 P{self.pause_msec}\n')
+      self.write(code)
+      self.write(f'G4 P{self.pause_msec}')
     elif strategy == self.STRATEGY_UTURN:
       theta = math.atan2(dy,dx)
       L = math.sqrt(dx**2 + dy**2)
@@ -83,25 +84,10 @@ class PrintingStrategy():
       dx_backward = -self.uturn_length * math.cos(theta)
       dy_backward = -self.uturn_length * math.sin(theta)
       
-      forward_code = splited_code[0]
-      backward_code = splited_code[0]
-      
-      if abs(dx_forward) > 1e-9:
-        forward_code += f' X{dx_forward:.6f}'
-      if abs(dy_forward) > 1e-9:
-        forward_code += f' Y{dy_forward:.6f}'
-
-      forward_code += f' F{next_speed:.0f}\n'
-      self.file.write(forward_code)
-
-      if abs(dx_backward) > 1e-9:
-        backward_code += f' X{dx_backward:.6f}'
-      if abs(dy_backward) > 1e-9:
-        backward_code += f' Y{dy_backward:.6f}'
-        
+      nonzero = lambda val: val if abs(val) > 1e-9 else None
+      self.write(self._move(move, move.code, nonzero(dx_forward), nonzero(dy_forward), f=next_speed))
       uturn_speed = self.uturn_speed if self.uturn_speed > 0 else next_speed
-      backward_code += f' F{uturn_speed:.0f}\n'
-      self.file.write(backward_code)
+      self.write(self._move(move, move.code, nonzero(dx_backward), nonzero(dy_backward), f=uturn_speed))
     
     elif strategy == self.STRATEGY_CLOVERLEAF or strategy == self.STRATEGY_CLOVERLEAF2:
       prev_dx = self.prev_dx
@@ -120,11 +106,11 @@ class PrintingStrategy():
         speed = self.cloverleaf_speed if self.cloverleaf_speed > 0 else next_speed
         
         if strategy == self.STRATEGY_CLOVERLEAF:
-          self.write(f'{dir_code} I{x1 + 0.5*x3:.6f} J{y1 + 0.5*y3:.6f} F{speed:.0f}')
+          self.write(self._move(move, dir_code, i=x1 + 0.5*x3, j=y1 + 0.5*y3, f=speed))
         else:
-          self.write(f'G1 X{x1:.6f} Y{y1:.6f} F{self.default_speed:.0f}')
-          self.write(f'{dir_code} X{x3:.6f} Y{y3:.6f} I{-x1:.6f} J{-y1:.6f} F{speed:.0f}')
-          self.write(f'G1 X{x2:.6f} Y{y2:.6f} F{self.default_speed:.0f}')
+          self.write(self._move(move, 'G1', x1, y1, f=self.default_speed))
+          self.write(self._move(move, dir_code, x3, y3, -x1, -y1, f=speed))
+          self.write(self._move(move, 'G1', x2, y2, f=self.default_speed))
           self.write(code)
         
         self.write(code)
@@ -136,6 +122,11 @@ class PrintingStrategy():
     self.prev_dx = dx
     self.prev_dy = dy
 
+  @staticmethod
+  def _move(move, code, x=None, y=None, i=None, j=None, f=None):
+    """Returns a move generated by the strategy: 6 decimals, integer feed, axes of the original move."""
+    return Move(code, x, y, i, j, f, ('.6f', '.6f', '.6f', '.6f', '.0f'), move.axes)
+
   def move_with_pause(self, code:str, msec):
     prev_pause = self.pause_msec
     self.pause_msec = msec
@@ -154,9 +145,22 @@ class PrintingStrategy():
     self.move(code, strategy=self.STRATEGY_CLOVERLEAF)
     self.set_cloverleaf_radius(prev_cloverleaf_radius)
 
-  def write(self, code:str):
+  def write(self, code):
+    if not isinstance(code, Move):
+      code = code.strip()
+    emit(self.file, code)
+
+  def send(self, code):
+    """Streaming stage entry point (see move.emit): moves get the strategy, other lines pass through."""
+    if isinstance(code, Move):
+      self._apply(code, code)
+      return
     code = code.strip()
-    self.file.write(code+'\n')
+    move = Move.parse(code)
+    if move is None:
+      self.write(code)
+    else:
+      self._apply(code, move)
 
   def __str__(self):
     if self.strategy == self.STRATEGY_NONE:
@@ -178,4 +182,4 @@ class PrintingStrategy():
       return f'_s-uturn{self.uturn_length*1000:.0f}um-{self.uturn_speed:.0f}_'
     elif self.strategy == self.STRATEGY_CLOVERLEAF:
       return f'_s-cloverleaf{self.cloverleaf_radius*1000:.0f}um_'
-    return ''
\ No newline at end of file
+    return ''
\ No newline at end of file
@@ -1,16 +1,74 @@
+import functools
 import math
 
+import numpy as np
+
+from .move import Move, emit
+
 sin = lambda deg : math.sin(math.radians(deg))
 cos = lambda deg : math.cos(math.radians(deg))
 
+
+@functools.lru_cache(maxsize=64)
+def cos_sin(deg):
+  """Returns (cos, sin) of an angle [degree], computed once per angle."""
+  return cos(deg), sin(deg)
+
+
+@functools.lru_cache(maxsize=64)
+def rotation_matrix(deg):
+  """Returns the 2x2 rotation matrix of an angle [degree], computed once per angle."""
+  c, s = cos_sin(deg)
+  return np.array([[c, -s], [s, c]])
+
+
+def compile_rename(rename_axis_list):
+  """
+  Returns a function applying the rename pairs in order to a string.
+
+  Single-letter pairs are composed into one str.translate table (a string
+  indexed by code point, the fastest table form), so a line is renamed in a
+  single pass whatever the number of pairs.
+  """
+  for rename_pair in rename_axis_list:
+    assert len(rename_pair) >= 2
+  if not rename_axis_list:
+    return lambda code: code
+  if any(len(old) != 1 or len(new) != 1 or max(ord(old), ord(new)) > 255 for old, new, *_ in rename_axis_list):
+    def rename(code):
+      for rename_pair in rename_axis_list:
+        code = code.replace(rename_pair[0], rename_pair[1])
+      return code
+    return rename
+  table = _translation_table(tuple((old, new) for old, new, *_ in rename_axis_list))
+  return lambda code: code.translate(table)
+
+
+@functools.lru_cache(maxsize=64)
+def _translation_table(rename_pairs):
+  table = [chr(n) for n in range(256)]  # characters past the table are left as they are
+  for letter in set(''.join(old + new for old, new in rename_pairs)):
+    renamed = letter
+    for old, new in rename_pairs:
+      renamed = renamed.replace(old, new)
+    table[ord(letter)] = renamed
+  return ''.join(table)
+
+
 class PrintTransformation:
 
   ROTATIONAL_AXIS_NAME = 'U'
-  rename_axis_list = []
+  # format specs of the X, Y, I, J and F words written by write()
+  LINE_FORMAT = ('', '', '', '', '.2f')
+  ARC_FORMAT = ('.3f', '.3f', '.3f', '.3f', '.2f')
   base_angle = 0 # [degree]
 
   def __init__(self, file):
     self.file = file
+    self.rename_axis_list = []
+    self._rename_source = []
+    self._rename = compile_rename([])
+    self._renamed_axes = {}
 
   def swapxy(self, enable:bool):
     # axis = 0: Y
@@ -25,9 +83,22 @@ class PrintTransformation:
 
   def set_rotational_axis(self, axis:str):
     if axis == 'X' or axis == 'Y':
-      self.rename_axis_list.append((axis, self.ROTATIONAL_AXIS_NAME))
+      pair = (axis, self.ROTATIONAL_AXIS_NAME)
+      if pair not in self.rename_axis_list:
+        self.rename_axis_list.append(pair)
     else:
-      ValueError('Invalid axis')
+      raise ValueError('Invalid axis')
+
+  def _renamer(self):
+    # the pairs are compiled again only when rename_axis_list changed
+    if self.rename_axis_list != self._rename_source:
+      self._rename_source = list(self.rename_axis_list)
+      self._rename = compile_rename(self._rename_source)
+      self._renamed_axes = {}
+    return self._rename
+
+  def rename(self, code:str):
+    return self._renamer()(code)
 
   def set_rotate_angle(self, deg):
     self.base_angle = deg
@@ -35,48 +106,55 @@ class PrintTransformation:
   def rotate(self, x=0, y=0):
     x = float(x) if x else 0.0
     y = float(y) if y else 0.0
-    x_new = x * cos(self.base_angle) - y * sin(self.base_angle)
-    y_new = x * sin(self.base_angle) + y * cos(self.base_angle)
+    c, s = cos_sin(self.base_angle)
+    x_new = x * c - y * s
+    y_new = x * s + y * c
     return x_new, y_new
+
+  def rotate_array(self, x, y):
+    """
+    Rotates whole arrays of relative coordinates (dx/dy or I/J) at once.
+
+    The products are taken element-wise rather than through a matrix
+    product, so every value is bit-identical to rotate().
+    """
+    (c, minus_s), (s, _) = rotation_matrix(self.base_angle)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return x * c + y * minus_s, x * s + y * c
   
+  def rename_axes(self, axes):
+    if not self.rename_axis_list:
+      return axes
+    rename = self._renamer()
+    renamed = self._renamed_axes.get(axes)
+    if renamed is None:
+      renamed = self._renamed_axes[axes] = tuple(rename(axis) for axis in axes)
+    return renamed
+
+  def transform(self, move:Move):
+    """Returns the rotated and renamed copy of a Move (arcs with 3 decimals, feed with 2)."""
+    x, y = self.rotate(move.x, move.y)
+    if move.i or move.j:
+      circle_i, circle_j = self.rotate(move.i, move.j)
+      fmt = self.ARC_FORMAT
+    else:
+      circle_i = circle_j = None
+      fmt = self.LINE_FORMAT
+    speed = move.f if move.f else None
+    return Move(move.code, x, y, circle_i, circle_j, speed, fmt, self.rename_axes(move.axes))
+
   def write(self, code):
-    code = code.strip()
-    # parse x and y position
-    splited_code = code.split(' ')
-    if len(splited_code) >= 2 and splited_code[0][0] == 'G':
-      x = None
-      y = None
-      circle_i = None
-      circle_j = None
-      speed = None
-      for i in range(1, len(splited_code)):
-        prefix = splited_code[i][0].upper()
-        val = float(splited_code[i][1:])
-        if prefix == 'X':
-          x = val
-        elif prefix == 'Y':
-          y = val
-        elif prefix == 'F':
-          speed = val
-        elif prefix == 'I':
-          circle_i = val
-        elif prefix == 'J':
-          circle_j = val
-      x, y = self.rotate(x, y)
-      if circle_i or circle_j:
-        circle_i, circle_j = self.rotate(circle_i, circle_j)
-        code = f'{splited_code[0]} X{x:.3f} Y{y:.3f} I{circle_i:.3f} J{circle_j:.3f}'
-      else:
-        code = f'{splited_code[0]} X{x} Y{y}'
-      
-      if speed:
-        code += f' F{speed:.2f}'
+    # code is a G-code line or a Move record from the previous stage
+    move = code if isinstance(code, Move) else Move.parse(code.strip())
+    if move is not None:
+      emit(self.file, self.transform(move))
+      return
     # transform the axis
-    for rename_pair in self.rename_axis_list:
-      assert len(rename_pair) >= 2
-      code = code.replace(rename_pair[0], rename_pair[1])
-    
-    self.file.write(code+'\n')
+    emit(self.file, self.rename(code.strip()))
+
+  # streaming stage entry point (see move.emit)
+  send = write
 
   def __str__(self):
     return "PrintTransformation()"
@@ -1,10 +1,44 @@
-import sys
-import os
 import math
 from Strategy.print_transformation import PrintTransformation
+from toolpath import Toolpath, G0, G1, G2, G3, block, move, collect_parts, iter_chunks, layer_cache, write_parts
 
 
-def hcell(a, b, cts, xr, yr, zr, id):
+def new_speed(CTS, layer):
+	assert layer >= 0, 'layer must be >= 0'
+	if layer <= 15:
+		decreased_speed = 0.015 * layer * CTS
+	else:
+		decreased_speed = 0.02 * layer * CTS
+	return CTS - decreased_speed
+
+
+def start_gcode(p, title):
+	p.text(f'; {title}')
+	p.text('; start gcode')
+	p.text('; Relative positioning')
+	p.text('G91')
+	p.text('; start at bottom-left corner')
+	p.add(move(G0, x=0, y=0))
+	p.text('')
+
+
+def end_gcode(p):
+	p.text('M42 P0 S0')
+	p.text('G0 Z10')
+	p.text('; end gcode')
+
+
+def stabilization_lines(p, wx, speed, ystep=0.3, n=5):
+	p.text('; Stabilization lines')
+	for i in range(n):
+		p.add(move(G0, x=wx, f=speed), move(G0, y=ystep, f=speed), move(G0, x=-wx, f=speed), move(G0, y=ystep, f=speed))
+		p.text('')
+	p.add(move(G0, y=2 * ystep, f=speed))
+	p.text('')
+
+
+def hcell_parts(a, b, cts, xr, yr, zr, reuse_layers=True):
+	"""Yields the hcell Toolpath after the start code, after every layer and at the end."""
 	a = a / 1000
 	b = b / 1000
 	xr = 2 * xr
@@ -19,93 +53,100 @@ def hcell(a, b, cts, xr, yr, zr, id):
 	x_sep = b
 	y_sep = 4 * a + b
 
-	filename = f'hcell_{id}.gcode'
-
-	def stabilization_lines(f, wx, ystep=0.3, speed=cts, n=5):
-		f.write('; Stabilization lines\n')
-		for i in range(n):
-			f.write(f'G0 X{wx} F{speed}\n')
-			f.write(f'G0 Y{ystep} F{speed}\n')
-			f.write(f'G0 X{-wx} F{speed}\n')
-			f.write(f'G0 Y{ystep} F{speed}\n\n')
-		f.write(f'G0 Y{2 * ystep} F{speed}\n\n')
-
-	with open(filename, 'w') as f:
-		f.write(f'; h_cell design\n')
-		f.write(f'; start gcode\n')
-		f.write(f'; Relative positioning\n')
-		f.write(f'G91\n; start at bottom-left corner\nG0 X0 Y0\n\n')
-
-		stabilization_ystep = 0.3
-		stabilization_n = 5
-
-		def new_speed(CTS, layer):
-			assert layer >= 0, 'layer must be >= 0'
-			if layer <= 15:
-				decreased_speed = 0.015 * layer * CTS
-			else:
-				decreased_speed = 0.02 * layer * CTS
-			return CTS - decreased_speed
-
-		stabilization_lines(f, total_x, ystep=0.3, speed=cts, n=5)
-		for l in range(zr):
-			f.write(f"\n; START layer {l + 1}/{zr}\n")
-			last_j = yr - 1
-			f.write(f'; START Printing horizontally\n')
-			speed = new_speed(cts, l)
-			for j in range(yr):
-				for i in range(xr):
-					f.write(f'G1 X{2 * a + b} F{speed}\n')
-					f.write(f'G1 Y{- 2 * a} F{speed}\n')
-					f.write(f'G1 X{2 * a + b} F{speed}\n')
-					f.write(f'G1 Y{2 * a} F{speed}\n')
-				f.write(f'G1 X{2 * a + b} F{speed}\n')
-				f.write(f'G1 Y{b} F{speed}\n')
-				for i in range(xr):
-					f.write(f'G1 X{- 2 * a - b} F{speed}\n')
-					f.write(f'G1 Y{2 * a} F{speed}\n')
-					f.write(f'G1 X{- 2 * a - b} F{speed}\n')
-					f.write(f'G1 Y{- 2 * a} F{speed}\n')
-				f.write(f'G1 X{- 2 * a - b} F{speed}\n')
-				f.write(f'G1 Y{y_sep} F{speed}\n')
-				if j == last_j:
-					f.write(f'G1 X{a + b} F{speed}\n')
-					f.write(f'G1 Y{- a} F{speed}\n')
-			f.write(f'; END Printing horizontally\n')
-			last_i = xr - 1
-			f.write(f'; START Printing vertically\n')
-			f.write(f'G1 Y{- 2 * a - b} F{speed}\n')
-			for i in range(xr):
-				for j in range(yr):
-					f.write(f'G1 X{2 * a} F{speed}\n')
-					f.write(f'G1 Y{- 2 * a - b} F{speed}\n')
-					f.write(f'G1 X{- 2 * a} F{speed}\n')
-					f.write(f'G1 Y{- 2 * a - b} F{speed}\n')
-				f.write(f'G1 X{4 * a + b} F{speed}\n')
-				for j in range(yr):
-					f.write(f'G1 Y{2 * a + b} F{speed}\n')
-					f.write(f'G1 X{- 2 * a} F{speed}\n')
-					f.write(f'G1 Y{2 * a + b} F{speed}\n')
-					f.write(f'G1 X{2 * a} F{speed}\n')
-				f.write(f'G1 Y{2 * a + b} F{speed}\n')
-				f.write(f'G1 X{b} F{speed}\n')
-				f.write(f'G1 Y{- 2 * a - b} F{speed}\n')
-				if i == last_i:
-					f.write(f'G1 X{a} F{speed}\n')
-					f.write(f'G1 Y{- total_y} F{speed}\n')
-					f.write(f'G1 X{- total_x} F{speed}\n')
-					f.write(f'G1 X{- 2 * a - b} F{speed}\n')
-					if l < zr - 1:
-						f.write(f'G1 Y{3 * a + b} F{speed}\n')
-					else:
-						f.write(f'G1 Y{-2 * stabilization_ystep * stabilization_n + 0.1} F{speed}\n')
-		f.write(f'G90\n')
-		f.write(f'M42 P0 S0\n')
-		f.write(f'G0 Z10\n')
-		f.write(f'; end gcode\n')
+	p = Toolpath()
+	start_gcode(p, 'h_cell design')
+
+	stabilization_ystep = 0.3
+	stabilization_n = 5
+
+	def layer(p, speed, last):
+		p.text('; START Printing horizontally')
+		row = block(
+			block([
+				move(G1, x=2 * a + b, f=speed),
+				move(G1, y=- 2 * a, f=speed),
+				move(G1, x=2 * a + b, f=speed),
+				move(G1, y=2 * a, f=speed),
+			], repeat=xr),
+			move(G1, x=2 * a + b, f=speed),
+			move(G1, y=b, f=speed),
+			block([
+				move(G1, x=- 2 * a - b, f=speed),
+				move(G1, y=2 * a, f=speed),
+				move(G1, x=- 2 * a - b, f=speed),
+				move(G1, y=- 2 * a, f=speed),
+			], repeat=xr),
+			move(G1, x=- 2 * a - b, f=speed),
+			move(G1, y=y_sep, f=speed),
+		)
+		p.add(row, repeat=yr)
+		p.add(move(G1, x=a + b, f=speed), move(G1, y=- a, f=speed))
+		p.text('; END Printing horizontally')
+		p.text('; START Printing vertically')
+		p.add(move(G1, y=- 2 * a - b, f=speed))
+		column = block(
+			block([
+				move(G1, x=2 * a, f=speed),
+				move(G1, y=- 2 * a - b, f=speed),
+				move(G1, x=- 2 * a, f=speed),
+				move(G1, y=- 2 * a - b, f=speed),
+			], repeat=yr),
+			move(G1, x=4 * a + b, f=speed),
+			block([
+				move(G1, y=2 * a + b, f=speed),
+				move(G1, x=- 2 * a, f=speed),
+				move(G1, y=2 * a + b, f=speed),
+				move(G1, x=2 * a, f=speed),
+			], repeat=yr),
+			move(G1, y=2 * a + b, f=speed),
+			move(G1, x=b, f=speed),
+			move(G1, y=- 2 * a - b, f=speed),
+		)
+		p.add(column, repeat=xr)
+		p.add(
+			move(G1, x=a, f=speed),
+			move(G1, y=- total_y, f=speed),
+			move(G1, x=- total_x, f=speed),
+			move(G1, x=- 2 * a - b, f=speed),
+		)
+		if not last:
+			p.add(move(G1, y=3 * a + b, f=speed))
+		else:
+			p.add(move(G1, y=-2 * stabilization_ystep * stabilization_n + 0.1, f=speed))
+
+	stabilization_lines(p, total_x, ystep=0.3, speed=cts, n=5)
+	yield p
+	layers = layer_cache(('hcell', a, b, xr, yr)) if reuse_layers else None
+	for l in range(zr):
+		p.layer = l
+		p.text('')
+		p.text(f'; START layer {l + 1}/{zr}')
+		speed = new_speed(cts, l)
+		p.add_layer(layer, speed, l == zr - 1, cache=layers)
+		yield p
+	p.layer = -1
+	p.text('G90')
+	end_gcode(p)
+	yield p
+
 
+def hcell_toolpath(a, b, cts, xr, yr, zr, reuse_layers=True):
+	return collect_parts(hcell_parts(a, b, cts, xr, yr, zr, reuse_layers))
 
-def sreg(a, b, cts, xr, yr, zr, id):
+
+def iter_hcell(a, b, cts, xr, yr, zr, lines=False, precision=None):
+	"""Yields the hcell G-code as byte chunks (one per layer) or, with lines=True, line by line."""
+	return iter_chunks(hcell_parts(a, b, cts, xr, yr, zr), lines=lines, precision=precision)
+
+
+def hcell(a, b, cts, xr, yr, zr, id, filename=None, precision=None):
+	if filename is None:
+		filename = f'hcell_{id}.gcode'
+	write_parts(hcell_parts(a, b, cts, xr, yr, zr), filename, precision)
+
+
+def sreg_parts(a, b, cts, xr, yr, zr, reuse_layers=True):
+	"""Yields the sreg Toolpath after the start code, after every layer and at the end."""
 	a = a / 1000
 	b = b / 1000
 	xr = 2 * xr
@@ -118,105 +159,109 @@ def sreg(a, b, cts, xr, yr, zr, id):
 
 	total_x = pore_size * xr
 
-	filename = f'sreg_{id}.gcode'
-
-	def stabilization_lines(f, wx, ystep=0.3, speed=cts, n=5):
-		f.write('; Stabilization lines\n')
-		for i in range(n):
-			f.write(f'G0 X{wx} F{speed}\n')
-			f.write(f'G0 Y{ystep} F{speed}\n')
-			f.write(f'G0 X{-wx} F{speed}\n')
-			f.write(f'G0 Y{ystep} F{speed}\n\n')
-		f.write(f'G0 Y{2 * ystep} F{speed}\n\n')
-
-	with open(filename, 'w') as f:
-		f.write(f'; sreg design\n')
-		f.write(f'; start gcode\n')
-		f.write(f'; Relative positioning\n')
-		f.write(f'G91\n; start at bottom-left corner\nG0 X0 Y0\n\n')
-
-		stabilization_ystep = 0.3
-		stabilization_n = 5
-
-		def new_speed(CTS, layer):
-			assert layer >= 0, 'layer must be >= 0'
-			if layer <= 15:
-				decreased_speed = 0.015 * layer * CTS
-			else:
-				decreased_speed = 0.02 * layer * CTS
-			return CTS - decreased_speed
-
-		stabilization_lines(f, total_x, ystep=0.3, speed=cts, n=5)
-		for l in range(zr):
-			f.write(f"\n; START layer {l + 1}/{zr}\n")
-			last_j = round(yr / 2) - 1
-			f.write(f'; START Printing horizontally\n')
-			speed = new_speed(cts, l)
-			for j in range(round(yr / 2)):
-				for i in range(xr):
-					f.write(f'G1 X{a} Y{-b} F{speed}\n')
-					f.write(f'G1 X{a} Y{b} F{speed}\n')
-					f.write(f'G1 X{a} Y{b} F{speed}\n')
-					f.write(f'G1 X{a} Y{-b} F{speed}\n')
-				f.write(f'G1 X{uturn_length} F{speed}\n')
-				f.write(f'G3 Y{pore_size} I{uturn_radius} J{pore_size/2} F{speed}\n')
-				f.write(f'G1 X{-uturn_length} F{speed}\n')
-				for i in range(xr):
-					f.write(f'G1 X{-a} Y{b} F{speed}\n')
-					f.write(f'G1 X{-a} Y{-b} F{speed}\n')
-					f.write(f'G1 X{-a} Y{-b} F{speed}\n')
-					f.write(f'G1 X{-a} Y{b} F{speed}\n')
-				f.write(f'G1 X{-uturn_length} F{speed}\n')
-				f.write(f'G2 Y{pore_size} I{-uturn_radius} J{pore_size / 2} F{speed}\n')
-				f.write(f'G1 X{uturn_length} F{speed}\n')
-				if j == last_j:
-					for i in range(xr):
-						f.write(f'G1 X{a} Y{-b} F{speed}\n')
-						f.write(f'G1 X{a} Y{b} F{speed}\n')
-						f.write(f'G1 X{a} Y{b} F{speed}\n')
-						f.write(f'G1 X{a} Y{-b} F{speed}\n')
-			f.write(f'; END Printing horizontally\n')
-			f.write(f'G1 X{uturn_length} F{speed}\n')
-			f.write(f'G1 Y{uturn_length} F{speed}\n')
-			f.write(f'G1 X{-uturn_length} F{speed}\n')
-			f.write(f'G1 Y{-uturn_length} F{speed}\n')
-			f.write(f'; START Printing vertically\n')
-			last_i = round(xr / 2) - 1
-			for i in range(round(xr / 2)):
-				for j in range(round(yr)):
-					f.write(f'G1 X{-b} Y{-a} F{speed}\n')
-					f.write(f'G1 X{b} Y{-a} F{speed}\n')
-					f.write(f'G1 X{b} Y{-a} F{speed}\n')
-					f.write(f'G1 X{-b} Y{-a} F{speed}\n')
-				f.write(f'G1 Y{-uturn_length} F{speed}\n')
-				f.write(f'G2 X{-pore_size} I{-pore_size / 2} J{-uturn_radius} F{speed}\n')
-				f.write(f'G1 Y{uturn_length} F{speed}\n')
-				for j in range(round(yr)):
-					f.write(f'G1 X{b} Y{a} F{speed}\n')
-					f.write(f'G1 X{-b} Y{a} F{speed}\n')
-					f.write(f'G1 X{-b} Y{a} F{speed}\n')
-					f.write(f'G1 X{b} Y{a} F{speed}\n')
-				f.write(f'G1 Y{uturn_length} F{speed}\n')
-				f.write(f'G3 X{-pore_size} I{-pore_size / 2} J{uturn_radius} F{speed}\n')
-				f.write(f'G1 Y{-uturn_length} F{speed}\n')
-				if i == last_i:
-					for j in range(round(yr)):
-						f.write(f'G1 X{-b} Y{-a} F{speed}\n')
-						f.write(f'G1 X{b} Y{-a} F{speed}\n')
-						f.write(f'G1 X{b} Y{-a} F{speed}\n')
-						f.write(f'G1 X{-b} Y{-a} F{speed}\n')
-					f.write(f'G1 Y{-uturn_length}\n')
-					f.write(f'G1 X{-uturn_length}\n')
-					f.write(f'G1 Y{uturn_length}\n')
-					f.write(f'G1 X{uturn_length}\n')
-		f.write(f'G0 Y-3.6 X-3 F{speed}\n')
-		f.write(f'G90\n\n')
-		f.write(f'M42 P0 S0\n')
-		f.write(f'G0 Z10\n')
-		f.write(f'; end gcode\n')
-
-
-def sinv(a, b, cts, xr, yr, zr, id):
+	p = Toolpath()
+	start_gcode(p, 'sreg design')
+
+	def layer(p, speed):
+		p.text('; START Printing horizontally')
+		forward = block([
+			move(G1, x=a, y=-b, f=speed),
+			move(G1, x=a, y=b, f=speed),
+			move(G1, x=a, y=b, f=speed),
+			move(G1, x=a, y=-b, f=speed),
+		], repeat=xr)
+		backward = block([
+			move(G1, x=-a, y=b, f=speed),
+			move(G1, x=-a, y=-b, f=speed),
+			move(G1, x=-a, y=-b, f=speed),
+			move(G1, x=-a, y=b, f=speed),
+		], repeat=xr)
+		row = block(
+			forward,
+			move(G1, x=uturn_length, f=speed),
+			move(G3, y=pore_size, i=uturn_radius, j=pore_size / 2, f=speed),
+			move(G1, x=-uturn_length, f=speed),
+			backward,
+			move(G1, x=-uturn_length, f=speed),
+			move(G2, y=pore_size, i=-uturn_radius, j=pore_size / 2, f=speed),
+			move(G1, x=uturn_length, f=speed),
+		)
+		p.add(row, repeat=round(yr / 2))
+		p.add(forward)
+		p.text('; END Printing horizontally')
+		p.add(
+			move(G1, x=uturn_length, f=speed),
+			move(G1, y=uturn_length, f=speed),
+			move(G1, x=-uturn_length, f=speed),
+			move(G1, y=-uturn_length, f=speed),
+		)
+		p.text('; START Printing vertically')
+		downward = block([
+			move(G1, x=-b, y=-a, f=speed),
+			move(G1, x=b, y=-a, f=speed),
+			move(G1, x=b, y=-a, f=speed),
+			move(G1, x=-b, y=-a, f=speed),
+		], repeat=round(yr))
+		upward = block([
+			move(G1, x=b, y=a, f=speed),
+			move(G1, x=-b, y=a, f=speed),
+			move(G1, x=-b, y=a, f=speed),
+			move(G1, x=b, y=a, f=speed),
+		], repeat=round(yr))
+		column = block(
+			downward,
+			move(G1, y=-uturn_length, f=speed),
+			move(G2, x=-pore_size, i=-pore_size / 2, j=-uturn_radius, f=speed),
+			move(G1, y=uturn_length, f=speed),
+			upward,
+			move(G1, y=uturn_length, f=speed),
+			move(G3, x=-pore_size, i=-pore_size / 2, j=uturn_radius, f=speed),
+			move(G1, y=-uturn_length, f=speed),
+		)
+		p.add(column, repeat=round(xr / 2))
+		p.add(
+			downward,
+			move(G1, y=-uturn_length),
+			move(G1, x=-uturn_length),
+			move(G1, y=uturn_length),
+			move(G1, x=uturn_length),
+		)
+
+	stabilization_lines(p, total_x, ystep=0.3, speed=cts, n=5)
+	yield p
+	layers = layer_cache(('sreg', a, b, xr, yr)) if reuse_layers else None
+	for l in range(zr):
+		p.layer = l
+		p.text('')
+		p.text(f'; START layer {l + 1}/{zr}')
+		speed = new_speed(cts, l)
+		p.add_layer(layer, speed, cache=layers)
+		yield p
+	p.layer = -1
+	p.text(f'G0 Y-3.6 X-3 F{speed}')
+	p.text('G90')
+	p.text('')
+	end_gcode(p)
+	yield p
+
+
+def sreg_toolpath(a, b, cts, xr, yr, zr, reuse_layers=True):
+	return collect_parts(sreg_parts(a, b, cts, xr, yr, zr, reuse_layers))
+
+
+def iter_sreg(a, b, cts, xr, yr, zr, lines=False, precision=None):
+	"""Yields the sreg G-code as byte chunks (one per layer) or, with lines=True, line by line."""
+	return iter_chunks(sreg_parts(a, b, cts, xr, yr, zr), lines=lines, precision=precision)
+
+
+def sreg(a, b, cts, xr, yr, zr, id, filename=None, precision=None):
+	if filename is None:
+		filename = f'sreg_{id}.gcode'
+	write_parts(sreg_parts(a, b, cts, xr, yr, zr), filename, precision)
+
+
+def sinv_parts(a, b, cts, xr, yr, zr, reuse_layers=True):
+	"""Yields the sinv Toolpath after the start code, after every layer and at the end."""
 	a = a / 1000
 	b = b / 1000
 	xr = 4 * xr
@@ -230,108 +275,113 @@ def sinv(a, b, cts, xr, yr, zr, id):
 	total_x = pore_size * xr
 	total_y = pore_size * yr
 
-	filename = f'sinv_{id}.gcode'
-
-	def stabilization_lines(f, wx, ystep=0.3, speed=cts, n=5):
-		f.write('; Stabilization lines\n')
-		for i in range(n):
-			f.write(f'G0 X{wx} F{speed}\n')
-			f.write(f'G0 Y{ystep} F{speed}\n')
-			f.write(f'G0 X{-wx} F{speed}\n')
-			f.write(f'G0 Y{ystep} F{speed}\n\n')
-		f.write(f'G0 Y{2 * ystep} F{speed}\n\n')
-
-	with open(filename, 'w') as f:
-		f.write(f'; sinv design\n')
-		f.write(f'; start gcode\n')
-		f.write(f'; Relative positioning\n')
-		f.write(f'G91\n; start at bottom-left corner\nG0 X0 Y0\n\n')
-
-		stabilization_ystep = 0.3
-		stabilization_n = 5
-
-		def new_speed(CTS, layer):
-			assert layer >= 0, 'layer must be >= 0'
-			if layer <= 15:
-				decreased_speed = 0.015 * layer * CTS
-			else:
-				decreased_speed = 0.02 * layer * CTS
-			return CTS - decreased_speed
-
-		stabilization_lines(f, total_x, ystep=0.3, speed=cts, n=5)
-		for l in range(zr):
-			f.write(f"\n; START layer {l + 1}/{zr}\n")
-			speed = new_speed(cts, l)
-			last_j = round(yr / 2) - 1
-			f.write(f'; START Printing horizontally\n')
-			for j in range(round(yr / 2)):
-				for i in range(round(xr / 2)):
-					f.write(f'G1 X{a} Y{-b:.6f} F{speed}\n')
-					f.write(f'G1 X{a} Y{b:.6f} F{speed}\n')
-					f.write(f'G1 X{a} Y{b:.6f} F{speed}\n')
-					f.write(f'G1 X{a} Y{-b:.6f} F{speed}\n')
-				f.write(f'G1 X{uturn_length} F{speed}\n')
-				f.write(f'G3 Y{pore_size} I{uturn_radius} J{pore_size / 2} F{speed}\n')
-				f.write(f'G1 X{-uturn_length} F{speed}\n')
-				for i in range(round(xr / 2)):
-					f.write(f'G1 X{-a} Y{-b:.6f} F{speed}\n')
-					f.write(f'G1 X{-a} Y{b:.6f} F{speed}\n')
-					f.write(f'G1 X{-a} Y{b:.6f} F{speed}\n')
-					f.write(f'G1 X{-a} Y{-b:.6f} F{speed}\n')
-				f.write(f'G1 X{-uturn_length} F{speed}\n')
-				f.write(f'G2 Y{pore_size} I{-uturn_radius} J{pore_size / 2} F{speed}\n')
-				f.write(f'G1 X{uturn_length} F{speed}\n')
-				if j == last_j:
-					for i in range(round(xr / 2)):
-						f.write(f'G1 X{a} Y{-b:.6f} F{speed}\n')
-						f.write(f'G1 X{a} Y{b:.6f} F{speed}\n')
-						f.write(f'G1 X{a} Y{b:.6f} F{speed}\n')
-						f.write(f'G1 X{a} Y{-b:.6f} F{speed}\n')
-			f.write(f'; END Printing horizontally\n')
-			f.write(f'G1 X{uturn_length} F{speed}\n')
-			f.write(f'G1 Y{uturn_length} F{speed}\n')
-			f.write(f'G1 X{-uturn_length} F{speed}\n')
-			f.write(f'G1 Y{-uturn_length} F{speed}\n')
-			f.write(f'; START Printing vertically\n')
-			last_i = round(xr / 2) - 1
-			for i in range(round(xr / 2)):
-				for j in range(round(yr / 2)):
-					f.write(f'G1 X{-b:.6f} Y{-a} F{speed}\n')
-					f.write(f'G1 X{b:.6f} Y{-a} F{speed}\n')
-					f.write(f'G1 X{b:.6f} Y{-a} F{speed}\n')
-					f.write(f'G1 X{-b:.6f} Y{-a} F{speed}\n')
-				f.write(f'G1 Y{-uturn_length} F{speed}\n')
-				f.write(f'G2 X{-pore_size} I{-pore_size / 2} J{-uturn_radius} F{speed}\n')
-				f.write(f'G1 Y{uturn_length} F{speed}\n')
-				for j in range(round(yr / 2)):
-					f.write(f'G1 X{-b:.6f} Y{a} F{speed}\n')
-					f.write(f'G1 X{b:.6f} Y{a} F{speed}\n')
-					f.write(f'G1 X{b:.6f} Y{a} F{speed}\n')
-					f.write(f'G1 X{-b:.6f} Y{a} F{speed}\n')
-				f.write(f'G1 Y{uturn_length} F{speed}\n')
-				f.write(f'G3 X{-pore_size} I{-pore_size / 2} J{uturn_radius} F{speed}\n')
-				f.write(f'G1 Y{-uturn_length} F{speed}\n')
-				if i == last_i:
-					for j in range(round(yr / 2)):
-						f.write(f'G1 X{-b:.6f} Y{-a} F{speed}\n')
-						f.write(f'G1 X{b:.6f} Y{-a} F{speed}\n')
-						f.write(f'G1 X{b:.6f} Y{-a} F{speed}\n')
-						f.write(f'G1 X{-b:.6f} Y{-a} F{speed}\n')
-					f.write(f'G1 Y{-uturn_length}\n')
-					f.write(f'G1 X{-uturn_length}\n')
-					f.write(f'G1 Y{uturn_length}\n')
-					f.write(f'G1 X{uturn_length}\n')
-		f.write(f'G0 Y-3.6 X-3 F{speed}\n')
-		f.write(f'G90\n\n')
-		f.write(f'M42 P0 S0\n')
-		f.write(f'G0 Z10\n')
-		f.write(f'; end gcode\n')
-
-
-def stri(a, b, cts, xr, yr, zr, id):
-	# Import PrintStrategy
-	sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
+	# the b offsets are written with 6 decimals
+	bx = {'x': 6}
+	by = {'y': 6}
+
+	p = Toolpath()
+	start_gcode(p, 'sinv design')
+
+	def layer(p, speed):
+		p.text('; START Printing horizontally')
+		forward = block([
+			move(G1, x=a, y=-b, f=speed, digits=by),
+			move(G1, x=a, y=b, f=speed, digits=by),
+			move(G1, x=a, y=b, f=speed, digits=by),
+			move(G1, x=a, y=-b, f=speed, digits=by),
+		], repeat=round(xr / 2))
+		backward = block([
+			move(G1, x=-a, y=-b, f=speed, digits=by),
+			move(G1, x=-a, y=b, f=speed, digits=by),
+			move(G1, x=-a, y=b, f=speed, digits=by),
+			move(G1, x=-a, y=-b, f=speed, digits=by),
+		], repeat=round(xr / 2))
+		row = block(
+			forward,
+			move(G1, x=uturn_length, f=speed),
+			move(G3, y=pore_size, i=uturn_radius, j=pore_size / 2, f=speed),
+			move(G1, x=-uturn_length, f=speed),
+			backward,
+			move(G1, x=-uturn_length, f=speed),
+			move(G2, y=pore_size, i=-uturn_radius, j=pore_size / 2, f=speed),
+			move(G1, x=uturn_length, f=speed),
+		)
+		p.add(row, repeat=round(yr / 2))
+		p.add(forward)
+		p.text('; END Printing horizontally')
+		p.add(
+			move(G1, x=uturn_length, f=speed),
+			move(G1, y=uturn_length, f=speed),
+			move(G1, x=-uturn_length, f=speed),
+			move(G1, y=-uturn_length, f=speed),
+		)
+		p.text('; START Printing vertically')
+		downward = block([
+			move(G1, x=-b, y=-a, f=speed, digits=bx),
+			move(G1, x=b, y=-a, f=speed, digits=bx),
+			move(G1, x=b, y=-a, f=speed, digits=bx),
+			move(G1, x=-b, y=-a, f=speed, digits=bx),
+		], repeat=round(yr / 2))
+		upward = block([
+			move(G1, x=-b, y=a, f=speed, digits=bx),
+			move(G1, x=b, y=a, f=speed, digits=bx),
+			move(G1, x=b, y=a, f=speed, digits=bx),
+			move(G1, x=-b, y=a, f=speed, digits=bx),
+		], repeat=round(yr / 2))
+		column = block(
+			downward,
+			move(G1, y=-uturn_length, f=speed),
+			move(G2, x=-pore_size, i=-pore_size / 2, j=-uturn_radius, f=speed),
+			move(G1, y=uturn_length, f=speed),
+			upward,
+			move(G1, y=uturn_length, f=speed),
+			move(G3, x=-pore_size, i=-pore_size / 2, j=uturn_radius, f=speed),
+			move(G1, y=-uturn_length, f=speed),
+		)
+		p.add(column, repeat=round(xr / 2))
+		p.add(
+			downward,
+			move(G1, y=-uturn_length),
+			move(G1, x=-uturn_length),
+			move(G1, y=uturn_length),
+			move(G1, x=uturn_length),
+		)
+
+	stabilization_lines(p, total_x, ystep=0.3, speed=cts, n=5)
+	yield p
+	layers = layer_cache(('sinv', a, b, xr, yr)) if reuse_layers else None
+	for l in range(zr):
+		p.layer = l
+		p.text('')
+		p.text(f'; START layer {l + 1}/{zr}')
+		speed = new_speed(cts, l)
+		p.add_layer(layer, speed, cache=layers)
+		yield p
+	p.layer = -1
+	p.text(f'G0 Y-3.6 X-3 F{speed}')
+	p.text('G90')
+	p.text('')
+	end_gcode(p)
+	yield p
+
+
+def sinv_toolpath(a, b, cts, xr, yr, zr, reuse_layers=True):
+	return collect_parts(sinv_parts(a, b, cts, xr, yr, zr, reuse_layers))
+
+
+def iter_sinv(a, b, cts, xr, yr, zr, lines=False, precision=None):
+	"""Yields the sinv G-code as byte chunks (one per layer) or, with lines=True, line by line."""
+	return iter_chunks(sinv_parts(a, b, cts, xr, yr, zr), lines=lines, precision=precision)
+
+
+def sinv(a, b, cts, xr, yr, zr, id, filename=None, precision=None):
+	if filename is None:
+		filename = f'sinv_{id}.gcode'
+	write_parts(sinv_parts(a, b, cts, xr, yr, zr), filename, precision)
+
+
+def stri_parts(a, b, cts, xr, yr, zr, reuse_layers=True):
+	"""Yields the stri Toolpath after the start code, after every layer and at the end."""
 	a = a / 1000
 	b = b / 1000
 	xr = 2 * xr
@@ -365,73 +415,98 @@ def stri(a, b, cts, xr, yr, zr, id):
 
 	total_x = triangle_side * xr
 
-	filename = f'stri_{id}.gcode'
-
-	def zero_degrees_printing(b=b, speed=cts):
-		f.write(f'; START Printing horizontally\n')
+	p = Toolpath()
+
+	def rotated(t, op, x=None, y=None, speed=None):
+		# same line as PrintTransformation.write: rotated X and Y, feed with 2 decimals
+		x, y = t.rotate(x, y)
+		return move(op, x=x, y=y, f=speed if speed else None, digits={'f': 2})
+
+	def rotated_block(t, op, x, y, speed=None):
+		# rotated() of whole coordinate lists, in one PrintTransformation.rotate_array call
+		x, y = t.rotate_array(x, y)
+		segments = block([move(op, x=0.0, y=0.0, f=speed if speed else None, digits={'f': 2})], repeat=len(x))
+		segments['dx'] = x
+		segments['dy'] = y
+		return segments
+
+	def zero_degrees_printing(p, b=b, speed=cts):
+		p.text('; START Printing horizontally')
+		forward = block([
+			move(G1, x=a, y=-b, f=speed),
+			move(G1, x=a, y=b, f=speed),
+			move(G1, x=a, y=b, f=speed),
+			move(G1, x=a, y=-b, f=speed),
+		], repeat=xr)
+		backward = block([
+			move(G1, x=-a, y=b, f=speed),
+			move(G1, x=-a, y=-b, f=speed),
+			move(G1, x=-a, y=-b, f=speed),
+			move(G1, x=-a, y=b, f=speed),
+		], repeat=xr)
+		row = block(
+			forward,
+			move(G0, x=zero_degrees_length, f=speed),
+			move(G0, y=triangle_dy, f=speed),
+			move(G0, x=-zero_degrees_length + triangle_dx, f=speed),
+			backward,
+			move(G0, x=-zero_degrees_length - triangle_dx, f=speed),
+			move(G0, y=triangle_dy, f=speed),
+			move(G0, x=zero_degrees_length, f=speed),
+		)
 		index_j = int(yr / 2) + 1 if odd_Y else int(yr / 2)
-		for j in range(index_j):
-			for i in range(xr):
-				f.write(f'G1 X{a} Y{-b} F{speed}\n')
-				f.write(f'G1 X{a} Y{b} F{speed}\n')
-				f.write(f'G1 X{a} Y{b} F{speed}\n')
-				f.write(f'G1 X{a} Y{-b} F{speed}\n')
-			f.write(f'G0 X{zero_degrees_length} F{speed}\n')
-			f.write(f'G0 Y{triangle_dy} F{speed}\n')
-			f.write(f'G0 X{-zero_degrees_length + triangle_dx} F{speed}\n')
-			for i in range(xr):
-				f.write(f'G1 X{-a} Y{b} F{speed}\n')
-				f.write(f'G1 X{-a} Y{-b} F{speed}\n')
-				f.write(f'G1 X{-a} Y{-b} F{speed}\n')
-				f.write(f'G1 X{-a} Y{b} F{speed}\n')
-			f.write(f'G0 X{-zero_degrees_length - triangle_dx} F{speed}\n')
-			f.write(f'G0 Y{triangle_dy} F{speed}\n')
-			f.write(f'G0 X{zero_degrees_length} F{speed}\n')
+		p.add(row, repeat=index_j)
 		if odd_Y:
-			f.write(f'G0 X{triangle_side * (xr - 1)} F{speed}\n')
-			f.write(f'G0 X{triangle_dx} Y{-triangle_dy} F{speed}\n')
+			p.add(move(G0, x=triangle_side * (xr - 1), f=speed), move(G0, x=triangle_dx, y=-triangle_dy, f=speed))
 		else:
-			for i in range(xr):
-				f.write(f'G1 X{a} Y{-b} F{speed}\n')
-				f.write(f'G1 X{a} Y{b} F{speed}\n')
-				f.write(f'G1 X{a} Y{b} F{speed}\n')
-				f.write(f'G1 X{a} Y{-b} F{speed}\n')
-		f.write(f'; END Printing horizontally\n')
-
-	def relocate_A(speed=cts):
-		f.write(f'; move to top-left corner\n')
-		f.write(f'G0 X{- zero_degrees_length} F{speed}\n')
-		f.write(f'G0 Y{triangle_dy * (yr + 1)} F{speed}\n')
+			p.add(forward)
+		p.text('; END Printing horizontally')
+
+	def relocate_A(p, speed=cts):
+		p.text('; move to top-left corner')
+		p.add(move(G0, x=- zero_degrees_length, f=speed), move(G0, y=triangle_dy * (yr + 1), f=speed))
 		if odd_Y:
-			f.write(f'G0 X{zero_degrees_length + triangle_side} F{speed}\n')
+			p.add(move(G0, x=zero_degrees_length + triangle_side, f=speed))
 		else:
-			f.write(f'G0 X{zero_degrees_length + triangle_side + triangle_dx} F{speed}\n')
-		f.write(f'G0 X{-triangle_dx} Y{-triangle_dy} F{speed}\n')
+			p.add(move(G0, x=zero_degrees_length + triangle_side + triangle_dx, f=speed))
+		p.add(move(G0, x=-triangle_dx, y=-triangle_dy, f=speed))
 
-	def relocate_B(sign, speed=cts):
-		f.write(f'; move to bottom-left corner\n')
+	def relocate_B(p, sign, speed=cts):
+		p.text('; move to bottom-left corner')
 		if sign < 0:
-			f.write(f'G0 Y{- zero_degrees_length} F{speed}\n')
-			f.write(f'G0 X{- triangle_side * xr - zero_degrees_length} F{speed}\n')
-			f.write(f'G0 Y{zero_degrees_length} F{speed}\n')
-			f.write(f'G0 X{zero_degrees_length} F{speed}\n')
+			p.add(
+				move(G0, y=- zero_degrees_length, f=speed),
+				move(G0, x=- triangle_side * xr - zero_degrees_length, f=speed),
+				move(G0, y=zero_degrees_length, f=speed),
+				move(G0, x=zero_degrees_length, f=speed),
+			)
 		else:
-			f.write(f'G0 X{zero_degrees_length} F{speed}\n')
-			f.write(f'G0 Y{- zero_degrees_length} F{speed}\n')
-			f.write(f'G0 X{- triangle_side * xr - 2 * zero_degrees_length - triangle_dx} F{speed}\n')
-			f.write(f'G0 Y{zero_degrees_length - triangle_dy} F{speed}\n')
-			f.write(f'G0 X{zero_degrees_length} F{speed}\n')
-
-	def sixty_degrees_printing_A(b, speed=cts):
-		f.write(f'; START Printing -60deg\n')
-		t = PrintTransformation(f)
+			p.add(
+				move(G0, x=zero_degrees_length, f=speed),
+				move(G0, y=- zero_degrees_length, f=speed),
+				move(G0, x=- triangle_side * xr - 2 * zero_degrees_length - triangle_dx, f=speed),
+				move(G0, y=zero_degrees_length - triangle_dy, f=speed),
+				move(G0, x=zero_degrees_length, f=speed),
+			)
+
+	def diagonal_motifs(t, speed):
+		# the diagonal motif of both signs, rotated in one call
+		signs = (-1, 1)
+		x = [sign * a for sign in signs for _ in range(4)]
+		y = [sign * dy for sign in signs for dy in (-b, b, b, -b)]
+		segments = rotated_block(t, G1, x, y, speed)
+		return {-1: segments[:4], 1: segments[4:]}
+
+	def sixty_degrees_printing_A(p, b, speed=cts):
+		p.text('; START Printing -60deg')
+		t = PrintTransformation(None)
 		t.set_rotate_angle(-60)
 
 		def extra_lines(case):
 			if case == '':
-				f.write('; ERROR\n')
+				p.text('; ERROR')
 			else:
-				f.write(f'; extra line {case}\n')
+				p.text(f'; extra line {case}')
 				if case == 'up':
 					x = sign * -sixty_dg_length + sign * triangle_dx
 				if case == 'right':
@@ -444,7 +519,7 @@ def stri(a, b, cts, xr, yr, zr, id):
 					x = sign * -sixty_dg_length + sign * triangle_dx - 2 * sign * triangle_side
 				if case == 'bottom':
 					x = sign * -sixty_dg_length + sign * triangle_dx - sign * triangle_side
-				t.write(f'G0 X{x} F{speed}\n')
+				p.add(rotated(t, G0, x, speed=speed))
 
 		total_i = int(yr / 2) + xr
 		last_i = total_i
@@ -453,8 +528,10 @@ def stri(a, b, cts, xr, yr, zr, id):
 
 		loop_range = range(1, total_i + 1)
 
+		diagonals = diagonal_motifs(t, speed)
+
 		for i in loop_range:
-			f.write(f'; Printing -60deg lines: {i}/{total_i}\n')
+			p.text(f'; Printing -60deg lines: {i}/{total_i}')
 
 			sign = -1 if i % 2 == 0 else 1
 
@@ -473,18 +550,13 @@ def stri(a, b, cts, xr, yr, zr, id):
 				else:
 					inner_step -= 2 * (i - (last_i - end_limit)) - 1
 
-			f.write(f'; inner step: {inner_step}\n')
-			for j in range(inner_step):
-				t.write(f'G1 X{sign * a} Y{sign * -b} F{speed}\n')
-				t.write(f'G1 X{sign * a} Y{sign * b} F{speed}\n')
-				t.write(f'G1 X{sign * a} Y{sign * b} F{speed}\n')
-				t.write(f'G1 X{sign * a} Y{sign * -b} F{speed}\n')
+			p.text(f'; inner step: {inner_step}')
+			if inner_step > 0:
+				p.add(diagonals[sign], repeat=inner_step)
 
 			# Print extra-scaffold lines
-			t.write(f'G0 X{sign * sixty_dg_length } F{speed}\n')
-
 			offset_factor = 13 / 15
-			t.write(f'G0 Y{- 4 * a * offset_factor} F{speed}\n')
+			p.add(rotated(t, G0, sign * sixty_dg_length, speed=speed), rotated(t, G0, y=- 4 * a * offset_factor, speed=speed))
 
 			if i % 2 == 0:
 				odd_i = False
@@ -526,18 +598,19 @@ def stri(a, b, cts, xr, yr, zr, id):
 			extra_lines(case)
 
 		# [End] print extra-scaffold lines
-		f.write(f'; END Printing -60deg\n\n')
+		p.text('; END Printing -60deg')
+		p.text('')
 
-	def sixty_degrees_printing_B(b, speed=cts):
-		f.write(f'; START Printing +60deg\n')
-		t = PrintTransformation(f)
+	def sixty_degrees_printing_B(p, b, speed=cts, base=cts):
+		p.text('; START Printing +60deg')
+		t = PrintTransformation(None)
 		t.set_rotate_angle(60)
 
 		def extra_lines(case):
 			if case == '':
-				f.write('; ERROR\n')
+				p.text('; ERROR')
 			else:
-				f.write(f'; extra line {case}\n')
+				p.text(f'; extra line {case}')
 				if case == 'up':
 					x = sign * -sixty_dg_length + sign * triangle_dx
 				if case == 'right':
@@ -550,7 +623,7 @@ def stri(a, b, cts, xr, yr, zr, id):
 					x = sign * -sixty_dg_length + sign * triangle_dx + sign * triangle_side
 				if case == 'bottom':
 					x = sign * -sixty_dg_length + sign * triangle_dx - sign * triangle_side
-				t.write(f'G0 X{x} F{speed}\n')
+				p.add(rotated(t, G0, x, speed=speed))
 
 		total_i = int(yr / 2) + xr if not odd_Y else int(yr / 2) + xr + 1
 		last_i = total_i
@@ -559,8 +632,10 @@ def stri(a, b, cts, xr, yr, zr, id):
 
 		loop_range = range(1, total_i + 1)
 
+		diagonals = diagonal_motifs(t, speed)
+
 		for i in loop_range:
-			f.write(f'; Printing +60deg lines: {i}/{total_i}\n')
+			p.text(f'; Printing +60deg lines: {i}/{total_i}')
 
 			sign = 1 if i % 2 == 0 else -1
 
@@ -579,18 +654,14 @@ def stri(a, b, cts, xr, yr, zr, id):
 				else:
 					inner_step -= 2 * (i - (last_i - end_limit))
 
-			f.write(f'; inner step: {inner_step}\n')
-			for j in range(inner_step):
-				t.write(f'G1 X{sign * a} Y{sign * -b} F{speed}\n')
-				t.write(f'G1 X{sign * a} Y{sign * b} F{speed}\n')
-				t.write(f'G1 X{sign * a} Y{sign * b} F{speed}\n')
-				t.write(f'G1 X{sign * a} Y{sign * -b} F{speed}\n')
+			p.text(f'; inner step: {inner_step}')
+			if inner_step > 0:
+				p.add(diagonals[sign], repeat=inner_step)
 
 			# Print extra-scaffold lines
 			offset_factor = 13 / 15
 			if i != last_i:
-				t.write(f'G0 X{sign * sixty_dg_length} F{speed}\n')
-				t.write(f'G0 Y{- 4 * a * offset_factor} F{speed}\n')
+				p.add(rotated(t, G0, sign * sixty_dg_length, speed=speed), rotated(t, G0, y=- 4 * a * offset_factor, speed=speed))
 
 			if i % 2 == 0:
 				odd_i = False
@@ -638,44 +709,48 @@ def stri(a, b, cts, xr, yr, zr, id):
 			if i != last_i:
 				extra_lines(case)
 			else:
-				relocate_B(sign)
-
-	def stabilization_lines(f, wx, ystep=0.3, speed=cts, n=5):
-		f.write('; Stabilization lines\n')
-		for i in range(n):
-			f.write(f'G0 X{wx} F{speed}\n')
-			f.write(f'G0 Y{ystep} F{speed}\n')
-			f.write(f'G0 X{-wx} F{speed}\n')
-			f.write(f'G0 Y{ystep} F{speed}\n\n')
-		f.write(f'G0 Y{2 * ystep} F{speed}\n\n')
-
-	with open(filename, 'w') as f:
-		f.write(f'; stri design\n')
-		f.write(f'; start gcode\n')
-		f.write(f'; Relative positioning\n')
-		f.write(f'G91\n; start at bottom-left corner\nG0 X0 Y0\n\n')
-
-		stabilization_ystep = 0.3
-		stabilization_n = 5
-
-		def new_speed(CTS, layer):
-			assert layer >= 0, 'layer must be >= 0'
-			if layer <= 15:
-				decreased_speed = 0.015 * layer * CTS
-			else:
-				decreased_speed = 0.02 * layer * CTS
-			return CTS - decreased_speed
-
-		stabilization_lines(f, total_x, ystep=0.3, speed=cts, n=5)
-		for l in range(zr):
-			f.write(f"\n; START layer {l + 1}/{zr}\n")
-			speed = new_speed(cts, l)
-			zero_degrees_printing(b, speed)
-			sixty_degrees_printing_A(b, speed)
-			relocate_A()
-			sixty_degrees_printing_B(b, speed)
-		f.write(f'G1 Y{-2 * stabilization_ystep * (stabilization_n + 1)} F{cts}\n')
-		f.write(f'G90\n\n')
-		f.write(f'M42 P0 S0\n')
-		f.write(f'G0 Z10\n')
-		f.write(f'; end gcode\n')
+				relocate_B(p, sign, base)
+
+	start_gcode(p, 'stri design')
+
+	stabilization_ystep = 0.3
+	stabilization_n = 5
+
+	def layer(p, speed, base=cts):
+		# the relocations run at the base speed of the job, whatever the layer speed
+		zero_degrees_printing(p, b, speed)
+		sixty_degrees_printing_A(p, b, speed)
+		relocate_A(p, base)
+		sixty_degrees_printing_B(p, b, speed, base)
+
+	stabilization_lines(p, total_x, ystep=0.3, speed=cts, n=5)
+	yield p
+	layers = layer_cache(('stri', a, b, xr, yr)) if reuse_layers else None
+	for l in range(zr):
+		p.layer = l
+		p.text('')
+		p.text(f'; START layer {l + 1}/{zr}')
+		speed = new_speed(cts, l)
+		p.add_layer(layer, speed, cache=layers, base=cts)
+		yield p
+	p.layer = -1
+	p.add(move(G1, y=-2 * stabilization_ystep * (stabilization_n + 1), f=cts))
+	p.text('G90')
+	p.text('')
+	end_gcode(p)
+	yield p
+
+
+def stri_toolpath(a, b, cts, xr, yr, zr, reuse_layers=True):
+	return collect_parts(stri_parts(a, b, cts, xr, yr, zr, reuse_layers))
+
+
+def iter_stri(a, b, cts, xr, yr, zr, lines=False, precision=None):
+	"""Yields the stri G-code as byte chunks (one per layer) or, with lines=True, line by line."""
+	return iter_chunks(stri_parts(a, b, cts, xr, yr, zr), lines=lines, precision=precision)
+
+
+def stri(a, b, cts, xr, yr, zr, id, filename=None, precision=None):
+	if filename is None:
+		filename = f'stri_{id}.gcode'
+	write_parts(stri_parts(a, b, cts, xr, yr, zr), filename, precision)
@@ -0,0 +1,266 @@
+import math
+import re
+
+import numpy as np
+
+from postprocess import CHUNK_SIZE, read_batches
+from toolpath import G0, G1, G2, G3
+
+# Kind of a parsed line; G0-G3 moves keep the toolpath opcodes
+TEXT = 4  # any other line
+LAYER = 5  # '; START layer n/N' comment written by the generators
+ABSOLUTE = 6  # G90
+RELATIVE = 7  # G91
+
+# Bits of the 'words' field: the axes given on a move line
+HAS_X = 1
+HAS_Y = 2
+
+# One row per distinct line of a file
+LINE_DTYPE = np.dtype([
+	('op', 'u1'),
+	('words', 'u1'),
+	('layer', 'i4'),
+	('dx', 'f8'),
+	('dy', 'f8'),
+	('i', 'f8'),
+	('j', 'f8'),
+	('f', 'f8'),
+])
+
+# One row per G0-G3 move, in absolute coordinates
+MOVE_DTYPE = np.dtype([
+	('line', 'i8'),  # 1-based line number in the file
+	('op', 'u1'),
+	('layer', 'i4'),  # 0-based layer, -1 for the start and end code
+	('x0', 'f8'),
+	('y0', 'f8'),
+	('x', 'f8'),
+	('y', 'f8'),
+	('i', 'f8'),  # arc center relative to (x0, y0)
+	('j', 'f8'),
+	('f', 'f8'),  # modal feed, nan before the first F word
+], align=True)
+
+_LAYER_COMMENT = re.compile(rb';\s*START layer (\d+)')
+_OPCODES = {b'G0': G0, b'G00': G0, b'G1': G1, b'G01': G1, b'G2': G2, b'G02': G2, b'G3': G3, b'G03': G3}
+
+
+def parse_line(line:bytes):
+	"""Returns the LINE_DTYPE fields of one G-code line."""
+	row = [TEXT, 0, -1, 0.0, 0.0, 0.0, 0.0, math.nan]
+	code = line.split(b';', 1)[0]
+	words = code.split()
+	if not words:
+		match = _LAYER_COMMENT.match(line.strip())
+		if match:
+			row[0] = LAYER
+			row[2] = int(match.group(1)) - 1
+		return tuple(row)
+	first = words[0].upper()
+	if first in (b'G90', b'G91'):
+		row[0] = ABSOLUTE if first == b'G90' else RELATIVE
+		return tuple(row)
+	op = _OPCODES.get(first)
+	if op is None:
+		return tuple(row)
+	row[0] = op
+	for word in words[1:]:
+		axis = word[:1].upper()
+		try:
+			value = float(word[1:])
+		except ValueError:
+			continue
+		if axis == b'X':
+			row[1] |= HAS_X
+			row[3] = value
+		elif axis == b'Y':
+			row[1] |= HAS_Y
+			row[4] = value
+		elif axis == b'I':
+			row[5] = value
+		elif axis == b'J':
+			row[6] = value
+		elif axis == b'F':
+			row[7] = value
+	return tuple(row)
+
+
+class LineTable(dict):
+	"""line -> row index into the table of distinct parsed lines."""
+
+	def __init__(self):
+		self.rows = []
+		self._columns = None
+
+	def __missing__(self, line):
+		index = self[line] = len(self.rows)
+		self.rows.append(parse_line(line))
+		self._columns = None
+		return index
+
+	def columns(self):
+		"""Returns the LINE_DTYPE fields of the distinct lines as contiguous arrays."""
+		if self._columns is None:
+			rows = np.array(self.rows, dtype=LINE_DTYPE)
+			self._columns = {name: np.ascontiguousarray(rows[name]) for name in LINE_DTYPE.names}
+		return self._columns
+
+
+def _state_at(positions, events, values, carry):
+	"""Returns the value of the last event before every position, carry when there is none."""
+	if len(events) == 0:
+		return np.full(len(positions), carry)
+	last = np.searchsorted(events, positions) - 1
+	return np.where(last >= 0, values[np.maximum(last, 0)], carry)
+
+
+def _fill_forward(values, carry):
+	"""Replaces every nan by the last value before it, carry before the first."""
+	if not np.isnan(values).any():
+		return values
+	last = np.where(np.isnan(values), -1, np.arange(len(values)))
+	last = np.maximum.accumulate(last) if len(last) else last
+	return np.where(last >= 0, values[np.maximum(last, 0)], carry)
+
+
+def _dead_reckon(start, deltas, sets, values):
+	"""
+				Returns the positions along one axis: start, then one per move, each
+				move adding its delta or, where sets is true, going to its value.
+	"""
+	position = np.cumsum(np.concatenate([[start], deltas]))
+	if not sets.any():
+		return position
+	# the last reset at or before every position (0: the start) and the deltas added since
+	index = np.arange(len(position))
+	reset = np.maximum.accumulate(np.where(np.concatenate([[True], sets]), index, 0))
+	return np.concatenate([[start], values])[reset] + position - position[reset]
+
+
+class GcodeParser:
+	"""
+				Streaming dead-reckoning parser of G-code files.
+
+				Lines are parsed once per distinct line (the generated files repeat a
+				few hundred lines millions of times); every batch is then turned into
+				absolute moves with a handful of NumPy operations. Moves are relative
+				after G91 and at the start of the file, absolute after G90.
+
+				layers holds (line, x, y) at every '; START layer' comment.
+	"""
+
+	def __init__(self):
+		self.table = LineTable()
+		self.x = 0.0
+		self.y = 0.0
+		self.relative = True
+		self.layer = -1
+		self.feed = math.nan
+		self.lines = 0
+		self.layers = []
+
+	def parse(self, lines):
+		"""Returns the MOVE_DTYPE moves of a list of lines (bytes without the newline)."""
+		index = np.fromiter(map(self.table.__getitem__, lines), dtype=np.int64, count=len(lines))
+		columns = self.table.columns()
+		op = columns['op'][index]
+		first_line = self.lines + 1
+		self.lines += len(lines)
+
+		moving = np.flatnonzero(op <= G3)
+		rows = index[moving]
+
+		# G90/G91 mode and layer of every move; both change a few times per file
+		switches = np.flatnonzero((op == ABSOLUTE) | (op == RELATIVE))
+		relative = _state_at(moving, switches, op[switches] == RELATIVE, self.relative)
+		marks = np.flatnonzero((op == LAYER) | (op == ABSOLUTE))
+		mark_layers = columns['layer'][index[marks]]
+		layer = _state_at(moving, marks, mark_layers, self.layer)
+		feed = _fill_forward(columns['f'][rows], self.feed)
+
+		# dead reckoning: relative moves add up, absolute moves set the given axes
+		dx = columns['dx'][rows]
+		dy = columns['dy'][rows]
+		words = columns['words'][rows]
+		x = _dead_reckon(self.x, np.where(relative, dx, 0.0), ~relative & (words & HAS_X != 0), dx)
+		y = _dead_reckon(self.y, np.where(relative, dy, 0.0), ~relative & (words & HAS_Y != 0), dy)
+
+		# position at every layer comment: the end of the last move before it
+		comments = np.flatnonzero(op == LAYER)
+		for k, position in zip(comments.tolist(), np.searchsorted(moving, comments).tolist()):
+			self.layers.append((first_line + k, float(x[position]), float(y[position])))
+
+		self.x, self.y = float(x[-1]), float(y[-1])
+		if len(switches):
+			self.relative = bool(op[switches[-1]] == RELATIVE)
+		if len(marks):
+			self.layer = int(mark_layers[-1])
+		if len(feed):
+			self.feed = float(feed[-1])
+
+		moves = np.empty(len(moving), dtype=MOVE_DTYPE)
+		moves['line'] = moving + first_line
+		moves['op'] = op[moving]
+		moves['layer'] = layer
+		moves['x0'] = x[:-1]
+		moves['y0'] = y[:-1]
+		moves['x'] = x[1:]
+		moves['y'] = y[1:]
+		moves['i'] = columns['i'][rows]
+		moves['j'] = columns['j'][rows]
+		moves['f'] = feed
+		return moves
+
+
+def iter_moves(source, chunk_size=CHUNK_SIZE, parser=None):
+	"""
+				Yields the moves of a .gcode (or .gz) file batch by batch.
+
+				Pass a GcodeParser to read its layers and end position afterwards.
+	"""
+	parser = parser if parser is not None else GcodeParser()
+	for lines in read_batches(source, chunk_size):
+		yield parser.parse(lines)
+
+
+def parse_gcode(source, chunk_size=CHUNK_SIZE):
+	"""Returns all moves of a G-code file as one MOVE_DTYPE array and the parser."""
+	parser = GcodeParser()
+	batches = list(iter_moves(source, chunk_size, parser))
+	moves = np.concatenate(batches) if batches else np.empty(0, dtype=MOVE_DTYPE)
+	return moves, parser
+
+
+def move_bounds(moves):
+	"""
+				Returns xmin, xmax, ymin, ymax of every move; arcs include the extreme
+				points their sweep passes (G2 clockwise, G3 counterclockwise).
+	"""
+	xmin = np.minimum(moves['x0'], moves['x'])
+	xmax = np.maximum(moves['x0'], moves['x'])
+	ymin = np.minimum(moves['y0'], moves['y'])
+	ymax = np.maximum(moves['y0'], moves['y'])
+	arcs = np.flatnonzero((moves['op'] == G2) | (moves['op'] == G3))
+	if len(arcs) == 0:
+		return xmin, xmax, ymin, ymax
+
+	arc = moves[arcs]
+	cx = arc['x0'] + arc['i']
+	cy = arc['y0'] + arc['j']
+	radius = np.hypot(arc['i'], arc['j'])
+	start = np.arctan2(-arc['j'], -arc['i'])
+	end = np.arctan2(arc['y'] - cy, arc['x'] - cx)
+	clockwise = arc['op'] == G2
+	sweep = np.where(clockwise, start - end, end - start) % (2 * math.pi)
+	sweep = np.where(np.isclose(sweep, 0.0) & (radius > 0), 2 * math.pi, sweep)  # full circle
+	for quarter, (bound, axis_center, sign) in enumerate(((xmax, cx, 1), (ymax, cy, 1), (xmin, cx, -1), (ymin, cy, -1))):
+		# the sweep passes the extreme point at 0, 90, 180 or 270 degrees
+		angle = quarter * math.pi / 2
+		passed = np.where(clockwise, start - angle, angle - start) % (2 * math.pi) <= sweep
+		extreme = axis_center + sign * radius
+		if sign > 0:
+			bound[arcs] = np.where(passed, np.maximum(bound[arcs], extreme), bound[arcs])
+		else:
+			bound[arcs] = np.where(passed, np.minimum(bound[arcs], extreme), bound[arcs])
+	return xmin, xmax, ymin, ymax
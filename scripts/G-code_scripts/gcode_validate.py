@@ -0,0 +1,183 @@
+"""
+Dead-reckoning check of generated G-code files before they go to the printer.
+
+	python gcode_validate.py hcell_1.gcode --design HCELL --a 200 --b 100 --xr 3 --yr 3
+	python gcode_validate.py --session output/session_20250101_120000
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+from gcode_parser import GcodeParser, iter_moves, move_bounds
+from toolpath import G0
+
+BASE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # batch.py, for session folders
+
+# design -> (a, b, xr, yr) -> (total_x, total_y, margin) [mm], with a and b in
+# mm and xr and yr as passed to the generator. total_x and total_y span the
+# lattice from the first layer start; margin is how far the printed turnarounds
+# (U-turn loops, the last column of hcell, the stri triangles) reach past it.
+FOOTPRINTS = {
+	"HCELL": lambda a, b, xr, yr: ((4 * a + 2 * b) * 2 * xr, (4 * a + 2 * b) * 2 * yr, 2 * a + b),
+	"SREG": lambda a, b, xr, yr: (4 * a * 2 * xr, 4 * a * 2 * yr, 6 * a + 4 * a + math.hypot(4 * a, 2 * a)),
+	"SINV": lambda a, b, xr, yr: (2 * a * 4 * xr, 2 * a * 4 * yr, 4 * a + 2 * a + math.hypot(2 * a, a)),
+	"STRI": lambda a, b, xr, yr: (4 * a * 2 * xr, 4 * a * math.sin(math.radians(60)) * 2 * yr, 4 * a),
+}
+
+MAX_REPORTED = 20  # footprint violations listed per file
+
+
+def expected_footprint(design, a, b, xr, yr, origin=(0.0, 0.0), layer_start=(0.0, 0.0)):
+	"""
+				Returns (xmin, xmax, ymin, ymax) [mm] every printed move has to stay in.
+
+				The box spans the stabilization lines, printed from the origin up to the
+				first layer start, and the lattice above them.
+
+				Args:
+					- design (str): HCELL, SREG, SINV or STRI
+					- a, b (float): geometry parameters [um]
+					- xr, yr (int): repetitions along x and y
+					- origin (tuple): position at the start of the file
+					- layer_start (tuple): position at the first '; START layer' comment
+	"""
+	total_x, total_y, margin = FOOTPRINTS[design.upper()](a / 1000, b / 1000, int(xr), int(yr))
+	x0, y0 = layer_start
+	return (
+		min(origin[0], x0) - margin,
+		x0 + total_x + margin,
+		min(origin[1], y0) - margin,
+		y0 + total_y + margin,
+	)
+
+
+def validate_gcode(source, design=None, a=None, b=None, xr=None, yr=None, tolerance=0.01):
+	"""
+				Reconstructs the absolute XY path of a G-code file and checks it.
+
+				Every layer has to start where the previous one started (closure) and,
+				when the design parameters are given, every printed G1-G3 move (arcs
+				included) has to stay inside expected_footprint(). Travel (G0) moves
+				are not checked.
+
+				Args:
+					- source (str): .gcode (or .gz) file
+					- design, a, b, xr, yr: design parameters as for the generator, None
+					  to skip the footprint check
+					- tolerance (float): allowed closure error and footprint excess [mm]
+
+				Returns:
+					- dict: lines, moves, bounding_box (xmin, xmax, ymin, ymax) of all
+					  moves, layer_starts [(line, x, y)], closure [(dx, dy)] from every
+					  layer start to the next, max_closure and drift (last layer start
+					  - first) [mm], footprint, footprint_violations (count) and
+					  violations [(line, xmin, xmax, ymin, ymax)] (first MAX_REPORTED),
+					  ok
+	"""
+	parser = GcodeParser()
+	bounds = [math.inf, -math.inf, math.inf, -math.inf]
+	printed = []
+	moves = 0
+	for batch in iter_moves(source, parser=parser):
+		if len(batch) == 0:
+			continue
+		moves += len(batch)
+		xmin, xmax, ymin, ymax = move_bounds(batch)
+		bounds = [min(bounds[0], xmin.min()), max(bounds[1], xmax.max()),
+			min(bounds[2], ymin.min()), max(bounds[3], ymax.max())]
+		keep = batch['op'] != G0
+		printed.append((batch['line'][keep], xmin[keep], xmax[keep], ymin[keep], ymax[keep]))
+
+	starts = np.array([(x, y) for _, x, y in parser.layers]).reshape(-1, 2)
+	closure = np.diff(starts, axis=0)
+	max_closure = float(np.hypot(*closure.T).max()) if len(closure) else 0.0
+	drift = float(np.hypot(*(starts[-1] - starts[0]))) if len(starts) else 0.0
+
+	footprint = None
+	violations = []
+	violation_count = 0
+	if design is not None and len(starts):
+		footprint = expected_footprint(design, a, b, xr, yr, layer_start=tuple(starts[0]))
+		for line, xmin, xmax, ymin, ymax in printed:
+			outside = ((xmin < footprint[0] - tolerance) | (xmax > footprint[1] + tolerance)
+				| (ymin < footprint[2] - tolerance) | (ymax > footprint[3] + tolerance))
+			violation_count += int(np.count_nonzero(outside))
+			for k in np.flatnonzero(outside)[:MAX_REPORTED - len(violations)].tolist():
+				violations.append((int(line[k]), float(xmin[k]), float(xmax[k]), float(ymin[k]), float(ymax[k])))
+
+	return {
+		'lines': parser.lines,
+		'moves': moves,
+		'bounding_box': tuple(float(v) for v in bounds),
+		'layer_starts': parser.layers,
+		'closure': [tuple(v) for v in closure.tolist()],
+		'max_closure': max_closure,
+		'drift': drift,
+		'footprint': footprint,
+		'footprint_violations': violation_count,
+		'violations': violations,
+		'ok': max_closure <= tolerance and drift <= tolerance and violation_count == 0,
+	}
+
+
+def session_jobs(session_dir):
+	"""Yields (path, design, a, b, xr, yr) of every .gcode file listed in a session's metadata.json."""
+	if BASE_DIR not in sys.path:
+		sys.path.insert(0, BASE_DIR)
+	from batch import read_metadata, session_rows
+
+	metadata = read_metadata(session_dir)
+	rows = session_rows(metadata)
+	design = metadata["design_type"]
+	for i, row in enumerate(rows):
+		path = os.path.join(session_dir, f"{design.lower()}_{i + 1}.gcode")
+		if os.path.exists(path):
+			yield path, design, float(row["a"]), float(row["b"]), int(row["xr"]), int(row["yr"])
+
+
+def format_report(path, report):
+	lines = [f"{'OK  ' if report['ok'] else 'FAIL'} {path}: {report['moves']} moves, {len(report['layer_starts'])} layers"]
+	xmin, xmax, ymin, ymax = report['bounding_box']
+	lines.append(f"     bounding box x {xmin:.4f}..{xmax:.4f} y {ymin:.4f}..{ymax:.4f} mm")
+	lines.append(f"     closure max {report['max_closure']:.6f} mm, drift {report['drift']:.6f} mm")
+	if report['footprint'] is not None:
+		xmin, xmax, ymin, ymax = report['footprint']
+		lines.append(f"     footprint x {xmin:.4f}..{xmax:.4f} y {ymin:.4f}..{ymax:.4f} mm,"
+			f" {report['footprint_violations']} moves outside")
+		for line, xmin, xmax, ymin, ymax in report['violations']:
+			lines.append(f"       line {line}: x {xmin:.4f}..{xmax:.4f} y {ymin:.4f}..{ymax:.4f}")
+	return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description='Check the closure and footprint of generated .gcode files.')
+	parser.add_argument('files', nargs='*', help='.gcode (or .gz) files')
+	parser.add_argument('--session', help='output session folder with a metadata.json')
+	parser.add_argument('--design', help='HCELL, SREG, SINV or STRI (default: from the file name)')
+	parser.add_argument('--a', type=float, help='a [um]')
+	parser.add_argument('--b', type=float, help='b [um]')
+	parser.add_argument('--xr', type=int, help='repetitions along x')
+	parser.add_argument('--yr', type=int, help='repetitions along y')
+	parser.add_argument('--tolerance', type=float, default=0.01, help='allowed closure error and footprint excess [mm]')
+	return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+	args = parse_args()
+	jobs = list(session_jobs(args.session)) if args.session else []
+	for path in args.files:
+		design = args.design
+		if design is None and os.path.basename(path).split('_')[0].upper() in FOOTPRINTS:
+			design = os.path.basename(path).split('_')[0].upper()
+		if None in (design, args.a, args.b, args.xr, args.yr):
+			design = None  # closure only
+		jobs.append((path, design, args.a, args.b, args.xr, args.yr))
+	failed = 0
+	for job in jobs:
+		report = validate_gcode(*job, tolerance=args.tolerance)
+		print(format_report(job[0], report))
+		failed += not report['ok']
+	sys.exit(1 if failed else 0)
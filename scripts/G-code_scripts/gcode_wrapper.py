@@ -1,24 +1,73 @@
 import sys
-from auxetic_gcode import hcell, sreg, sinv, stri
+from auxetic_gcode import hcell, sreg, sinv, stri, iter_hcell, iter_sreg, iter_sinv, iter_stri
+from auxetic_gcode import hcell_parts, sreg_parts, sinv_parts, stri_parts
+from subprograms import SubprogramSink
 
 
-design, a, b, d, xr, yr, zr, id = sys.argv[-8:]
-a, b, d = map(float, [a, b, d])
-xr = int(xr)
-yr = int(yr)
-zr = int(zr)
+CTS = 150  # modify this value as needed
 
-cts = 150  # modify this value as needed
+DESIGNS = {
+	"HCELL": hcell,
+	"SREG": sreg,
+	"SINV": sinv,
+	"STRI": stri,
+}
 
-if design == "HCELL":
-	design_func = hcell
-if design == "SREG":
-	design_func = sreg
-if design == "SINV":
-	design_func = sinv
-if design == "STRI":
-	design_func = stri
+STREAMS = {
+	"HCELL": iter_hcell,
+	"SREG": iter_sreg,
+	"SINV": iter_sinv,
+	"STRI": iter_stri,
+}
 
-design_func(a, b, cts, xr, yr, zr, id)
+PARTS = {
+	"HCELL": hcell_parts,
+	"SREG": sreg_parts,
+	"SINV": sinv_parts,
+	"STRI": stri_parts,
+}
 
 
+def generate(design, a, b, cts, xr, yr, zr, out_path, subprograms=None, precision=None):
+	"""
+				Writes the G-code of one design straight to out_path.
+
+				Runs in the calling process and never changes the working directory,
+				so it can be called from several threads at once.
+
+				Args:
+					- design (str): HCELL, SREG, SINV or STRI
+					- a, b (float): geometry parameters [um]
+					- cts (float): collector translation speed of the first layer
+					- xr, yr, zr (int): repetitions along x, y and number of layers
+					- out_path (str or Sink): destination .gcode file ('-' for stdout,
+					  .gz for a compressed file) or an open sinks.Sink
+					- subprograms (str): controller dialect (see subprograms.DIALECTS) to
+					  write repeated motifs as subprogram calls, None for the flat program
+					- precision (int): decimals of the X, Y, I, J words (see
+					  toolpath.TokenFormatter), None for the full float repr
+	"""
+	design_func = DESIGNS[design.upper()]
+	if subprograms is None:
+		design_func(float(a), float(b), cts, int(xr), int(yr), int(zr), None, filename=out_path, precision=precision)
+	else:
+		with SubprogramSink(out_path, subprograms) as sink:
+			design_func(float(a), float(b), cts, int(xr), int(yr), int(zr), None, filename=sink, precision=precision)
+	return out_path
+
+
+def iter_gcode(design, a, b, cts, xr, yr, zr, lines=False, precision=None):
+	"""
+				Yields the G-code of one design lazily, without any file handle.
+
+				Chunks hold at most one layer (lines=True yields single lines), so a host
+				can stream a tall scaffold to a printer or socket in bounded memory and
+				stop early. Joined together they equal the file written by generate().
+	"""
+	design_func = STREAMS[design.upper()]
+	return design_func(float(a), float(b), cts, int(xr), int(yr), int(zr), lines=lines, precision=precision)
+
+
+if __name__ == '__main__':
+	design, a, b, d, xr, yr, zr, id = sys.argv[-8:]
+	generate(design, a, b, CTS, xr, yr, zr, f"{design.lower()}_{id}.gcode")
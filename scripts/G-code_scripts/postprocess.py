@@ -0,0 +1,304 @@
+"""
+Applies a PrintingStrategy and/or a PrintTransformation to an existing
+.gcode file, e.g. to re-tune the U-turn length or the cloverleaf radius
+without generating the scaffold again.
+
+	python postprocess.py in.gcode out.gcode --uturn 0.3 --uturn-speed 50
+	python postprocess.py in.gcode.gz - --cloverleaf 0.1 --rotate 60 --swapxy
+"""
+import argparse
+import gzip
+import io
+import math
+import mmap
+import os
+import sys
+
+import numpy as np
+
+from sinks import sink_for
+from Strategy.move import MOTION_CODES, GcodeWriter
+from Strategy.print_strategy import PrintingStrategy
+from Strategy.print_transformation import PrintTransformation
+
+CHUNK_SIZE = 1 << 24  # [bytes] read per batch
+
+# Kind of an input line
+OTHER = 0
+MOVE = 1  # G0-G3 line with X, Y, I, J, F (or U) words only
+ABSOLUTE = 2  # G90
+RELATIVE = 3  # G91
+
+_MOVE_WORDS = frozenset('XYIJFU')
+
+
+def line_kind(line:bytes):
+	words = line.split()
+	if not words:
+		return OTHER
+	if words[0] in (b'G90', b'G91'):
+		return ABSOLUTE if words[0] == b'G90' else RELATIVE
+	if len(words) < 2 or words[0].decode() not in MOTION_CODES:
+		return OTHER
+	try:
+		for word in words[1:]:
+			if chr(word[0]).upper() not in _MOVE_WORDS:
+				return OTHER
+			float(word[1:])
+	except ValueError:
+		return OTHER
+	return MOVE
+
+
+def line_feed(line:bytes):
+	"""Returns the F word of a line (before any ; comment), NaN when it has none."""
+	for word in line.split(b';', 1)[0].split():
+		if word[:1] in (b'F', b'f'):
+			try:
+				return float(word[1:])
+			except ValueError:
+				return math.nan
+	return math.nan
+
+
+class LineKinds(dict):
+	"""line -> kind, filled on first use."""
+
+	def __missing__(self, line):
+		kind = self[line] = line_kind(line)
+		return kind
+
+
+class LineFeeds(dict):
+	"""line -> F value or NaN, filled on first use."""
+
+	def __missing__(self, line):
+		feed = self[line] = line_feed(line)
+		return feed
+
+
+class LinePipeline(dict):
+	"""
+				Output bytes of every distinct input line, computed once by the stages.
+
+				Keys are (move, previous, speed, line): move tells whether the line is
+				a relative G0-G3 move the stages work on, previous is the move line
+				before it when the strategy depends on it (cloverleaf), else None, and
+				speed is the modal feed the line runs at when it has no F of its own
+				(0 for the other lines). Every other line is only stripped and renamed
+				by the transformation.
+	"""
+
+	def __init__(self, strategy=None, transformation=None, limit=1 << 20):
+		self.buffer = io.StringIO()
+		writer = GcodeWriter(self.buffer)
+		if strategy is not None:
+			strategy.file = writer
+		if transformation is not None:
+			transformation.file = strategy if strategy is not None else writer
+		self.strategy = strategy
+		self.transformation = transformation
+		self.first = transformation or strategy or writer
+		self.stateful = strategy is not None and strategy.strategy in (
+			PrintingStrategy.STRATEGY_CLOVERLEAF, PrintingStrategy.STRATEGY_CLOVERLEAF2)
+		self.limit = limit
+
+	def output(self):
+		data = self.buffer.getvalue()
+		self.buffer.seek(0)
+		self.buffer.truncate()
+		return data.encode()
+
+	def __missing__(self, key):
+		move, previous, speed, line = key
+		line = line.decode()
+		if not move:
+			line = line.strip()
+			self.buffer.write((self.transformation.rename(line) if self.transformation else line) + '\n')
+		else:
+			if self.strategy is not None:
+				self.strategy.default_speed = speed
+				self.strategy.prev_dx = self.strategy.prev_dy = 0
+				if previous is not None:
+					self.first.send(previous.decode())
+					self.output()
+			self.first.send(line)
+		if len(self) >= self.limit:
+			self.clear()  # mostly distinct lines: keep the memory bounded
+		value = self[key] = self.output()
+		return value
+
+
+class PostProcessor:
+	"""
+				Runs the lines of a G-code stream through the stages batch by batch.
+
+				Every batch is classified with one dictionary lookup per line and the
+				G90/G91 mode, modal feed and previous move of every line are found with
+				NumPy, so the stages only run for line (and previous move and feed)
+				combinations not seen before. Moves after G90 are absolute and are left
+				to the transformation rename only. The strategy's default_speed is the
+				feed of the moves before the first F word.
+	"""
+
+	def __init__(self, strategy=None, transformation=None):
+		self.speed = float(strategy.default_speed) if strategy is not None else 0.0  # modal feed
+		self.pipeline = LinePipeline(strategy, transformation)
+		self.kinds = LineKinds()
+		self.feeds = LineFeeds()
+		self.relative = True
+		self.previous = None  # last move line of the previous batches
+
+	def process(self, lines):
+		"""Returns the output bytes of a list of lines (bytes without the newline)."""
+		n = len(lines)
+		if n == 0:
+			return b''
+		kinds = np.fromiter(map(self.kinds.__getitem__, lines), dtype=np.int8, count=n)
+		index = np.arange(n)
+
+		# mode of every line: the last G90/G91 at or before it
+		switches = np.where(kinds >= ABSOLUTE, index, -1)
+		last_switch = np.maximum.accumulate(switches)
+		mode = np.where(last_switch >= 0, kinds[np.maximum(last_switch, 0)], RELATIVE if self.relative else ABSOLUTE)
+		moves = (kinds == MOVE) & (mode == RELATIVE)
+		if switches.max() >= 0:
+			self.relative = kinds[switches.max()] == RELATIVE
+
+		# modal feed of every line: the last F before it, carried over from the previous batches
+		feeds = np.fromiter(map(self.feeds.__getitem__, lines), dtype=float, count=n)
+		last_feed = np.maximum.accumulate(np.where(np.isnan(feeds), -1, index))
+		before = np.concatenate([[-1], last_feed[:-1]])
+		speeds = np.where(before >= 0, feeds[np.maximum(before, 0)], self.speed)
+		if last_feed[-1] >= 0:
+			self.speed = float(feeds[last_feed[-1]])
+		speeds = np.where(moves, speeds, 0.0).tolist()
+
+		move_flags = moves.tolist()
+		if not self.pipeline.stateful:
+			keys = zip(move_flags, [None] * n, speeds, lines)
+		else:
+			# previous move of every move line: index n is the carried line, n + 1 is None
+			last_move = np.maximum.accumulate(np.where(moves, index, -1))
+			previous = np.concatenate([[-1], last_move[:-1]])
+			previous = np.where(moves, np.where(previous >= 0, previous, n), n + 1)
+			move_indices = np.flatnonzero(moves)
+			if len(move_indices):
+				carry = lines[move_indices[-1]]
+			else:
+				carry = self.previous
+			lines_ext = lines + [self.previous, None]
+			keys = zip(move_flags, map(lines_ext.__getitem__, previous.tolist()), speeds, lines)
+			self.previous = carry
+		return b''.join(map(self.pipeline.__getitem__, keys))
+
+
+def read_batches(source, chunk_size=CHUNK_SIZE):
+	"""
+				Yields the lines of a .gcode (or .gz) file in lists of about chunk_size
+				bytes; plain files are read through a memory map, '-' is stdin.
+	"""
+	if source != '-' and not os.fspath(source).endswith('.gz'):
+		with open(source, 'rb') as file:
+			if os.fstat(file.fileno()).st_size == 0:
+				return
+			with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+				start = 0
+				while start < len(data):
+					end = data.find(b'\n', min(start + chunk_size, len(data)) - 1)
+					end = len(data) if end < 0 else end + 1
+					yield data[start:end].splitlines()
+					start = end
+		return
+
+	stream = sys.stdin.buffer if source == '-' else gzip.open(source, 'rb')
+	try:
+		pending = b''
+		while True:
+			data = stream.read(chunk_size)
+			if not data:
+				break
+			data = pending + data
+			end = data.rfind(b'\n') + 1
+			pending = data[end:]
+			if end:
+				yield data[:end].splitlines()
+		if pending:
+			yield pending.splitlines()
+	finally:
+		if stream is not sys.stdin.buffer:
+			stream.close()
+
+
+def postprocess(source, target, strategy=None, transformation=None, chunk_size=CHUNK_SIZE):
+	"""
+				Rewrites a G-code file through a PrintTransformation and/or a
+				PrintingStrategy (in this order, as in a generator pipeline).
+
+				The stages' files are rewired to the output, so pass them unconnected
+				(e.g. PrintingStrategy(None)).
+
+				Args:
+					- source (str): input .gcode file, .gz file or '-' for stdin
+					- target (str or Sink): output file ('-' for stdout, .gz compressed)
+					- strategy (PrintingStrategy): pause, U-turn or cloverleaf, or None
+					- transformation (PrintTransformation): rotation and axis renames, or None
+					- chunk_size (int): bytes read per batch
+	"""
+	processor = PostProcessor(strategy, transformation)
+	with sink_for(target) as sink:
+		for lines in read_batches(source, chunk_size):
+			sink.write(processor.process(lines))
+	return target
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description='Apply a printing strategy and/or transformation to a .gcode file.')
+	parser.add_argument('source', help='input .gcode (or .gz) file, - for stdin')
+	parser.add_argument('target', help='output .gcode (or .gz) file, - for stdout')
+	strategy = parser.add_mutually_exclusive_group()
+	strategy.add_argument('--pause', type=float, metavar='MSEC', help='dwell after every move')
+	strategy.add_argument('--uturn', type=float, metavar='MM', help='overshoot and return at the end of every move')
+	strategy.add_argument('--cloverleaf', type=float, metavar='MM', help='arc of this radius at every corner')
+	strategy.add_argument('--cloverleaf2', type=float, metavar='MM', help='full cloverleaf loop of this radius at every corner')
+	parser.add_argument('--uturn-speed', type=float, metavar='MM/MIN', help='feed of the U-turn return')
+	parser.add_argument('--cloverleaf-speed', type=float, metavar='MM/MIN', help='feed of the cloverleaf arcs')
+	parser.add_argument('--default-speed', type=float, default=0, metavar='MM/MIN',
+						help='feed of the moves before the first F word')
+	parser.add_argument('--rotate', type=float, metavar='DEG', help='rotate the moves by this angle')
+	parser.add_argument('--swapxy', action='store_true', help='swap the X and Y axes')
+	parser.add_argument('--rotational-axis', choices=('X', 'Y'), help=f'write this axis as {PrintTransformation.ROTATIONAL_AXIS_NAME}')
+	parser.add_argument('--chunk-mb', type=float, default=CHUNK_SIZE / (1 << 20), help='batch size [MB]')
+	return parser.parse_args(argv)
+
+
+def stages_from_args(args):
+	"""Returns the (strategy, transformation) configured by the command line, None when not used."""
+	strategy = None
+	if args.pause or args.uturn or args.cloverleaf or args.cloverleaf2:
+		strategy = PrintingStrategy(None)
+		strategy.default_speed = args.default_speed
+		if args.pause:
+			strategy.set_pause(args.pause)
+		elif args.uturn:
+			strategy.set_uturn(args.uturn, args.uturn_speed)
+		elif args.cloverleaf:
+			strategy.set_cloverleaf_radius(args.cloverleaf, args.cloverleaf_speed)
+		else:
+			strategy.set_cloverleaf_radius(args.cloverleaf2, args.cloverleaf_speed)
+			strategy.strategy = PrintingStrategy.STRATEGY_CLOVERLEAF2
+
+	transformation = None
+	if args.rotate or args.swapxy or args.rotational_axis:
+		transformation = PrintTransformation(None)
+		transformation.set_rotate_angle(args.rotate or 0)
+		transformation.swapxy(args.swapxy)
+		if args.rotational_axis:
+			transformation.set_rotational_axis(args.rotational_axis)
+	return strategy, transformation
+
+
+if __name__ == '__main__':
+	args = parse_args()
+	strategy, transformation = stages_from_args(args)
+	postprocess(args.source, args.target, strategy, transformation, int(args.chunk_mb * (1 << 20)))
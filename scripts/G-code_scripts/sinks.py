@@ -0,0 +1,149 @@
+import contextlib
+import gzip
+import io
+import mmap
+import os
+import sys
+
+
+class Sink:
+	"""
+				Destination of the G-code bytes written by the design functions.
+
+				Sinks are context managers: leaving the with-block closes them.
+	"""
+
+	def write(self, data):
+		raise NotImplementedError
+
+	def close(self):
+		pass
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+
+class FileSink(Sink):
+	"""Plain file written through a large buffer (1 MiB by default)."""
+
+	def __init__(self, path, buffer_size=1 << 20):
+		self.path = path
+		self.file = open(path, 'wb', buffering=buffer_size)
+
+	def write(self, data):
+		self.file.write(data)
+
+	def close(self):
+		self.file.close()
+
+
+class MemorySink(Sink):
+	"""In-memory sink for tests and caching; the bytes stay available after close()."""
+
+	def __init__(self):
+		self.buffer = io.BytesIO()
+		self._value = None
+
+	def write(self, data):
+		self.buffer.write(data)
+
+	def getvalue(self):
+		if self._value is not None:
+			return self._value
+		return self.buffer.getvalue()
+
+	def close(self):
+		if self._value is None:
+			self._value = self.buffer.getvalue()
+			self.buffer.close()
+
+
+class GzipSink(Sink):
+	"""Streaming gzip compressed file (.gcode.gz)."""
+
+	def __init__(self, path, compresslevel=6):
+		self.path = path
+		self.file = gzip.open(path, 'wb', compresslevel=compresslevel)
+
+	def write(self, data):
+		self.file.write(data)
+
+	def close(self):
+		self.file.close()
+
+
+class MmapSink(Sink):
+	"""
+				File written through a memory map of `size` bytes.
+
+				The map is grown (doubled) when the data does not fit and the file is
+				truncated to the written length on close().
+	"""
+
+	def __init__(self, path, size=1 << 24):
+		self.path = path
+		self.size = max(int(size), 1)
+		self.length = 0
+		self.file = open(path, 'w+b')
+		self.file.truncate(self.size)
+		self.map = mmap.mmap(self.file.fileno(), self.size)
+
+	def _grow(self, size):
+		self.map.close()
+		self.size = size
+		self.file.truncate(self.size)
+		self.map = mmap.mmap(self.file.fileno(), self.size)
+
+	def write(self, data):
+		end = self.length + len(data)
+		if end > self.size:
+			self._grow(max(end, 2 * self.size))
+		self.map[self.length:end] = data
+		self.length = end
+
+	def close(self):
+		if self.map is None:
+			return
+		self.map.flush()
+		self.map.close()
+		self.map = None
+		self.file.truncate(self.length)
+		self.file.close()
+
+
+class PipeSink(Sink):
+	"""Binary stream such as stdout or a pipe; the stream is flushed but left open."""
+
+	def __init__(self, stream=None):
+		self.stream = stream if stream is not None else sys.stdout.buffer
+
+	def write(self, data):
+		self.stream.write(data)
+
+	def close(self):
+		self.stream.flush()
+
+
+def open_sink(target):
+	"""
+				Returns the sink for a path: '-' is stdout, a .gz suffix is compressed
+				and anything else is a buffered file.
+	"""
+	if target == '-':
+		return PipeSink()
+	if os.fspath(target).endswith('.gz'):
+		return GzipSink(target)
+	return FileSink(target)
+
+
+@contextlib.contextmanager
+def sink_for(target):
+	"""Yields target if it already is a Sink (left open), else the sink opened for the path."""
+	if isinstance(target, Sink):
+		yield target
+	else:
+		with open_sink(target) as sink:
+			yield sink
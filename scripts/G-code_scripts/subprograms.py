@@ -0,0 +1,174 @@
+import numpy as np
+
+from sinks import Sink, open_sink
+
+
+# Subprogram syntax of the supported controllers; None writes the flat program
+DIALECTS = {
+	# Fanuc-style subprograms: called with M98, defined after M30 as O-blocks ending with M99
+	"fanuc": {
+		"call": "M98 P{number} L{count}\n",
+		"main_end": "M30\n",
+		"header": "O{number:04d}\n",
+		"footer": "M99\n",
+	},
+}
+
+
+def run_lengths(equal):
+	"""Returns for every index the number of consecutive True values starting there."""
+	n = len(equal)
+	index = np.arange(n)
+	next_false = np.where(equal, n, index)
+	next_false = np.minimum.accumulate(next_false[::-1])[::-1]
+	return next_false - index
+
+
+def best_repeats(tokens, max_period):
+	"""
+				Returns the best periodic run starting at every token.
+
+				For a period p the run at s repeats tokens[s:s+p] count times; the best
+				period removes the most lines, (count - 1) * p.
+	"""
+	n = len(tokens)
+	best_period = np.zeros(n, dtype=np.int64)
+	best_count = np.ones(n, dtype=np.int64)
+	best_saving = np.zeros(n, dtype=np.int64)
+	for period in range(1, min(max_period, n // 2) + 1):
+		count = np.ones(n, dtype=np.int64)
+		count[:n - period] += run_lengths(tokens[:-period] == tokens[period:]) // period
+		saving = (count - 1) * period
+		better = saving > best_saving
+		best_period[better] = period
+		best_count[better] = count[better]
+		best_saving[better] = saving[better]
+	return best_period, best_count
+
+
+class SubprogramSink(Sink):
+	"""
+				Sink writing repeated line runs as subprogram calls.
+
+				Every write() is cut into lines and the lines into integer tokens. Runs
+				of a motif repeated back to back (the zigzags of the inner xr loops) are
+				replaced by one call line, whose motif is defined once as a subprogram
+				and shared by every later call. Call lines are tokens too, so further
+				passes fold the rows made of calls into nested subprograms.
+
+				The main program ends with the dialect's main_end and the definitions
+				follow it when the sink is closed.
+
+				Args:
+					- target (str or Sink): destination of the compressed program
+					- dialect (str): key of DIALECTS
+					- max_period (int): longest motif searched, in lines
+					- min_lines (int): shortest run (count * period) worth a call
+					- passes (int): folding passes, i.e. the subprogram nesting depth
+	"""
+
+	def __init__(self, target, dialect="fanuc", max_period=64, min_lines=4, passes=3):
+		self.sink = target if isinstance(target, Sink) else open_sink(target)
+		self.owns_sink = not isinstance(target, Sink)
+		self.syntax = DIALECTS[dialect]
+		self.max_period = max_period
+		self.min_lines = min_lines
+		self.passes = passes
+		self.lines = []  # token -> line bytes
+		self.line_index = {}
+		self.motifs = {}  # token tuple -> subprogram number
+		self.pending = b''
+		self.closed = False
+
+	def token(self, line):
+		index = self.line_index.get(line)
+		if index is None:
+			index = len(self.lines)
+			self.lines.append(line)
+			self.line_index[line] = index
+		return index
+
+	def call(self, motif, count):
+		number = self.motifs.get(motif)
+		if number is None:
+			number = self.motifs[motif] = len(self.motifs) + 1
+		return self.token(self.syntax["call"].format(number=number, count=count).encode())
+
+	def fold(self, tokens):
+		"""Replaces the periodic runs of a token array by call tokens (one pass)."""
+		period, count = best_repeats(tokens, self.max_period)
+		candidates = np.flatnonzero((count > 1) & (period * count >= self.min_lines))
+		if len(candidates) == 0:
+			return tokens
+		folded = []
+		start = 0
+		n = 0
+		while n < len(candidates):
+			s = candidates[n]
+			folded.extend(tokens[start:s].tolist())
+			p, k = int(period[s]), int(count[s])
+			folded.append(self.call(tuple(tokens[s:s + p].tolist()), k))
+			start = s + p * k
+			n = np.searchsorted(candidates, start, side='left')
+		folded.extend(tokens[start:].tolist())
+		return np.array(folded, dtype=np.int64)
+
+	def compress(self, data):
+		tokens = np.array([self.token(line) for line in data.splitlines(keepends=True)], dtype=np.int64)
+		for _ in range(self.passes):
+			size = len(tokens)
+			tokens = self.fold(tokens)
+			if len(tokens) == size:
+				break
+		return b''.join([self.lines[t] for t in tokens.tolist()])
+
+	def write(self, data):
+		data = self.pending + data
+		end = data.rfind(b'\n') + 1
+		self.pending = data[end:]
+		if end:
+			self.sink.write(self.compress(data[:end]))
+
+	def close(self):
+		if self.closed:
+			return
+		self.closed = True
+		if self.pending:
+			self.sink.write(self.pending)
+		self.sink.write(self.syntax["main_end"].encode())
+		for motif, number in self.motifs.items():
+			self.sink.write(self.syntax["header"].format(number=number).encode())
+			self.sink.write(b''.join([self.lines[t] for t in motif]))
+			self.sink.write(self.syntax["footer"].encode())
+		if self.owns_sink:
+			self.sink.close()
+
+
+def expand(data, dialect="fanuc"):
+	"""Expands a program written by SubprogramSink back into the flat program."""
+	syntax = DIALECTS[dialect]
+	main_end = syntax["main_end"].encode()
+	lines = data.splitlines(keepends=True)
+	end = lines.index(main_end)
+	call_prefix = syntax["call"].split("{")[0].encode()
+	footer = syntax["footer"].encode()
+
+	bodies = {}
+	n = end + 1
+	while n < len(lines):
+		number = int(lines[n].strip()[1:])
+		body_end = lines.index(footer, n + 1)
+		bodies[number] = lines[n + 1:body_end]
+		n = body_end + 1
+
+	def flat(body):
+		for line in body:
+			if line.startswith(call_prefix):
+				words = dict((word[:1], word[1:]) for word in line.split()[1:])
+				sub = bodies[int(words[b'P'])]
+				for _ in range(int(words[b'L'])):
+					yield from flat(sub)
+			else:
+				yield line
+
+	return b''.join(flat(lines[:end]))
@@ -0,0 +1,210 @@
+"""
+Small PNG previews of generated toolpaths, rasterized with NumPy.
+
+	python thumbnails.py hcell_1.gcode [hcell_1.png] [--size 256] [--layers]
+"""
+import argparse
+import math
+import struct
+import zlib
+
+import numpy as np
+
+from gcode_parser import GcodeParser, MOVE_DTYPE, move_bounds, parse_gcode
+from toolpath import G0, G2, G3
+
+THUMBNAIL_SIZE = 256  # [px] longest side
+PADDING = 4  # [px] white border around the toolpath
+
+# Gray levels of the printed moves, the travel moves and the background
+PRINT_LEVEL = 0
+TRAVEL_LEVEL = 190
+BACKGROUND_LEVEL = 255
+
+_SUBPIXELS = 4  # endpoints are merged on a grid of 1/4 px before drawing
+
+
+def design_moves(design, a, b, xr, yr, zr, cts=None):
+	"""Returns the MOVE_DTYPE moves of a design straight from its generator (no file written)."""
+	from gcode_wrapper import CTS, iter_gcode
+
+	parser = GcodeParser()
+	batches = [parser.parse(chunk.splitlines())
+		for chunk in iter_gcode(design, a, b, CTS if cts is None else cts, xr, yr, zr)]
+	return np.concatenate(batches) if batches else np.empty(0, dtype=MOVE_DTYPE)
+
+
+def tessellate_arcs(moves, step):
+	"""
+				Returns the moves with every G2/G3 arc replaced by G1 chords of about
+				`step` length (at least 4 per full circle).
+	"""
+	arcs = (moves['op'] == G2) | (moves['op'] == G3)
+	if not arcs.any():
+		return moves
+	arc = moves[arcs]
+	cx = arc['x0'] + arc['i']
+	cy = arc['y0'] + arc['j']
+	radius = np.hypot(arc['i'], arc['j'])
+	start = np.arctan2(-arc['j'], -arc['i'])
+	end = np.arctan2(arc['y'] - cy, arc['x'] - cx)
+	clockwise = arc['op'] == G2
+	sweep = np.where(clockwise, start - end, end - start) % (2 * math.pi)
+	sweep = np.where(np.isclose(sweep, 0.0) & (radius > 0), 2 * math.pi, sweep)  # full circle
+	count = np.maximum(np.ceil(sweep * radius / step), np.ceil(sweep / (math.pi / 2))).astype(np.int64)
+	count = np.maximum(count, 1)
+
+	owner = np.repeat(np.arange(len(arc)), count)
+	k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+	direction = np.where(clockwise, -1.0, 1.0)[owner]
+	angle0 = start[owner] + direction * sweep[owner] * k / count[owner]
+	angle1 = start[owner] + direction * sweep[owner] * (k + 1) / count[owner]
+	chords = np.repeat(arc, count)
+	chords['op'] = 1
+	chords['x0'] = cx[owner] + radius[owner] * np.cos(angle0)
+	chords['y0'] = cy[owner] + radius[owner] * np.sin(angle0)
+	chords['x'] = cx[owner] + radius[owner] * np.cos(angle1)
+	chords['y'] = cy[owner] + radius[owner] * np.sin(angle1)
+	last = np.cumsum(count) - 1  # the last chord ends exactly at the arc end
+	chords['x'][last] = arc['x']
+	chords['y'][last] = arc['y']
+	chords['i'] = chords['j'] = 0.0
+
+	# chords take the place of their arc, keeping the move order
+	position = np.concatenate([np.flatnonzero(~arcs), np.flatnonzero(arcs)[owner]])
+	merged = np.concatenate([moves[~arcs], chords])
+	return merged[np.argsort(position, kind='stable')]
+
+
+def draw_segments(image, x0, y0, x1, y1, level):
+	"""
+				Sets every pixel within half a pixel of the segments to level.
+
+				The coordinates are in pixels and have to lie inside the image (clip
+				longer segments first); the endpoints are merged on a subpixel grid.
+	"""
+	if len(x0) == 0:
+		return
+	# merge repeated segments (the layers of a scaffold overlap) on a subpixel grid
+	height, width = image.shape
+	key = np.zeros(len(x0), dtype=np.uint64)
+	for v, limit in ((x0, width), (y0, height), (x1, width), (y1, height)):
+		key <<= np.uint64(16)
+		key |= np.clip(np.rint(v * _SUBPIXELS), 0, limit * _SUBPIXELS).astype(np.uint64)
+	key = np.sort(key)
+	key = key[np.concatenate([[True], key[1:] != key[:-1]])]
+	x0, y0, x1, y1 = [((key >> np.uint64(shift)) & np.uint64(0xffff)).astype(np.float64) / _SUBPIXELS
+		for shift in (48, 32, 16, 0)]
+
+	count = np.ceil(np.maximum(np.abs(x1 - x0), np.abs(y1 - y0))).astype(np.int64) + 1
+	owner = np.repeat(np.arange(len(x0)), count)
+	t = (np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)) / np.maximum(count - 1, 1)[owner]
+	# round half up: rint rounds half to even and leaves gaps in lines on half pixels
+	px = np.floor(x0[owner] + t * (x1 - x0)[owner] + 0.5).astype(np.int64)
+	py = np.floor(y0[owner] + t * (y1 - y0)[owner] + 0.5).astype(np.int64)
+	inside = (px < width) & (py < height)
+	image[py[inside], px[inside]] = level
+
+
+def rasterize(moves, size=THUMBNAIL_SIZE, bounds=None, travel=True):
+	"""
+				Returns a gray uint8 image of the moves, the longest side `size` pixels.
+
+				Printed moves are black and travel (G0) moves light gray. Each move is
+				sampled at least once per pixel of its length and the moves repeated in
+				every layer are drawn once.
+
+				Args:
+					- moves (MOVE_DTYPE array): e.g. from gcode_parser.parse_gcode or design_moves
+					- size (int): longest side of the image [px]
+					- bounds (tuple): (xmin, xmax, ymin, ymax) [mm] containing the moves,
+					  None to fit them
+					- travel (bool): draw the G0 moves too
+	"""
+	if bounds is None:
+		if len(moves) == 0:
+			return np.full((size, size), BACKGROUND_LEVEL, dtype=np.uint8)
+		xmin, xmax, ymin, ymax = move_bounds(moves)
+		bounds = (xmin.min(), xmax.max(), ymin.min(), ymax.max())
+	xmin, xmax, ymin, ymax = bounds
+	span = max(xmax - xmin, ymax - ymin, 1e-9)
+	scale = (size - 1 - 2 * PADDING) / span  # [px/mm]
+	width = max(int(math.ceil((xmax - xmin) * scale)) + 1 + 2 * PADDING, 1)
+	height = max(int(math.ceil((ymax - ymin) * scale)) + 1 + 2 * PADDING, 1)
+	image = np.full((height, width), BACKGROUND_LEVEL, dtype=np.uint8)
+
+	moves = tessellate_arcs(moves, step=2 / scale)
+
+	def pixels(x, y):
+		# image rows grow downwards
+		return PADDING + (x - xmin) * scale, height - 1 - PADDING - (y - ymin) * scale
+
+	x0, y0 = pixels(moves['x0'], moves['y0'])
+	x1, y1 = pixels(moves['x'], moves['y'])
+	travel_moves = moves['op'] == G0
+	if travel:
+		draw_segments(image, x0[travel_moves], y0[travel_moves], x1[travel_moves], y1[travel_moves], TRAVEL_LEVEL)
+	printed = ~travel_moves
+	draw_segments(image, x0[printed], y0[printed], x1[printed], y1[printed], PRINT_LEVEL)
+	return image
+
+
+def png_bytes(image):
+	"""Returns an 8-bit grayscale (2D) or RGB (3D) uint8 image encoded as PNG."""
+	height, width = image.shape[:2]
+	color_type = 0 if image.ndim == 2 else 2
+	raw = np.zeros((height, 1 + width * (1 if image.ndim == 2 else 3)), dtype=np.uint8)  # filter byte 0 per row
+	raw[:, 1:] = image.reshape(height, -1)
+
+	def chunk(kind, data):
+		return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+	header = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+	return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+		+ chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+def write_png(path, image):
+	with open(path, 'wb') as png:
+		png.write(png_bytes(image))
+
+
+def render_thumbnail(source, png_path, size=THUMBNAIL_SIZE, layers=False):
+	"""
+				Writes the PNG thumbnail of a .gcode file (or of a MOVE_DTYPE array).
+
+				With layers=True every layer is also written to <png_path>_layer<n>.png,
+				framed like the whole toolpath so the images line up.
+
+				Returns:
+					- list: the written paths
+	"""
+	moves = source if isinstance(source, np.ndarray) else parse_gcode(source)[0]
+	bounds = None
+	if len(moves):
+		xmin, xmax, ymin, ymax = move_bounds(moves)
+		bounds = (xmin.min(), xmax.max(), ymin.min(), ymax.max())
+	write_png(png_path, rasterize(moves, size, bounds))
+	paths = [png_path]
+	if layers:
+		stem = png_path[:-4] if png_path.lower().endswith('.png') else png_path
+		for layer in np.unique(moves['layer'][moves['layer'] >= 0]).tolist():
+			path = f"{stem}_layer{layer + 1}.png"
+			write_png(path, rasterize(moves[moves['layer'] == layer], size, bounds))
+			paths.append(path)
+	return paths
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Write PNG thumbnails of .gcode files.')
+	parser.add_argument('source', help='.gcode (or .gz) file')
+	parser.add_argument('target', nargs='?', help='PNG file (default: next to the source)')
+	parser.add_argument('--size', type=int, default=THUMBNAIL_SIZE, help='longest side [px]')
+	parser.add_argument('--layers', action='store_true', help='also write one image per layer')
+	args = parser.parse_args()
+	target = args.target
+	if target is None:
+		target = args.source[:-3] if args.source.endswith('.gz') else args.source
+		target = target.rsplit('.', 1)[0] + '.png'
+	for path in render_thumbnail(args.source, target, args.size, args.layers):
+		print(path)
@@ -0,0 +1,400 @@
+import collections
+import math
+import threading
+
+import numpy as np
+from numpy.lib import recfunctions
+
+from sinks import sink_for
+
+
+# Opcodes stored in the 'op' field of a segment
+G0 = 0
+G1 = 1
+G2 = 2
+G3 = 3
+TEXT = 4  # verbatim line (comment, mode switch, ...) taken from Toolpath.texts
+
+OPCODES = ('G0', 'G1', 'G2', 'G3')
+OPCODE_TOKENS = tuple(op.encode() for op in OPCODES)
+WORDS = ('X', 'Y', 'I', 'J', 'F')
+
+# Format codes stored per word in the 'fmt' field of a segment
+FMT_NONE = 0  # word is not written
+FMT_REPR = 1  # shortest round-trip repr of the float, as f'{value}'
+FMT_INT = 2  # integer value, as f'{value}' for an int
+FMT_FIXED = 10  # FMT_FIXED + n: n decimals, as f'{value:.nf}'
+
+SEGMENT_DTYPE = np.dtype([
+	('op', 'u1'),
+	('fmt', 'u1', (len(WORDS),)),
+	('layer', 'i4'),
+	('dx', 'f8'),
+	('dy', 'f8'),
+	('i', 'f8'),
+	('j', 'f8'),
+	('f', 'f8'),
+	('text', 'i4'),
+])
+
+# Every field that ends up in the written line, i.e. all but the layer index
+_LINE_FIELDS = ['op', 'fmt', 'dx', 'dy', 'i', 'j', 'f', 'text']
+
+# Feed rates written into a LayerTemplate in place of the layer speed and of
+# the base speed of the job (the cts some moves of a layer are printed at)
+TEMPLATE_FEED = math.inf
+TEMPLATE_BASE_FEED = -math.inf
+
+LAYER_CACHE_SIZE = 8  # designs whose LayerTemplates are kept between jobs
+
+
+def word_format(value, digits=None):
+	"""Returns the format code that reproduces f'{value}' (or f'{value:.{digits}f}')."""
+	if value is None:
+		return FMT_NONE
+	if digits is not None:
+		return FMT_FIXED + digits
+	if isinstance(value, int):
+		return FMT_INT
+	return FMT_REPR
+
+
+def move(op, x=None, y=None, i=None, j=None, f=None, digits=None):
+	"""
+				Returns one relative move as a segment record.
+
+				Args:
+					- op (int): G0, G1, G2 or G3
+					- x, y, i, j, f (float): word values, None to leave the word out
+					- digits (dict): fixed number of decimals per word, e.g. {'y': 6}
+	"""
+	digits = digits or {}
+	values = (x, y, i, j, f)
+	fmt = tuple(word_format(v, digits.get(w.lower())) for w, v in zip(WORDS, values))
+	return (op, fmt, -1) + tuple(0.0 if v is None else v for v in values) + (-1,)
+
+
+def block(*parts, repeat=1):
+	"""Returns a new segment array of the given moves, lists of moves and segment arrays, tiled `repeat` times."""
+	arrays = []
+	pending = []
+	for part in parts:
+		if isinstance(part, np.ndarray):
+			if pending:
+				arrays.append(np.array(pending, dtype=SEGMENT_DTYPE))
+				pending = []
+			arrays.append(part)
+		elif isinstance(part, list):
+			pending.extend(part)
+		else:
+			pending.append(part)
+	if pending:
+		arrays.append(np.array(pending, dtype=SEGMENT_DTYPE))
+	segments = np.concatenate(arrays)
+	if repeat != 1:
+		segments = np.tile(segments, repeat)
+	return segments
+
+
+class Toolpath:
+	"""
+				Relative toolpath stored as a NumPy array of SEGMENT_DTYPE records.
+
+				Each record is one G-code line: a move (opcode, dx, dy, I, J, F and the
+				format of every word) or a verbatim text line. The records carry the
+				layer they belong to (-1 outside of the layers).
+	"""
+
+	def __init__(self):
+		self.layer = -1
+		self.texts = []
+		self._text_index = {}
+		self._parts = []  # (segments, template, speed, base), template is None unless replayed
+		self._segments = None
+
+	def _intern(self, line):
+		index = self._text_index.get(line)
+		if index is None:
+			index = len(self.texts)
+			self.texts.append(line)
+			self._text_index[line] = index
+		return index
+
+	def _append(self, segments, template=None, speed=None, base=None):
+		self._parts.append((segments, template, speed, base))
+		self._segments = None
+
+	def add(self, *parts, repeat=1):
+		segments = block(*parts, repeat=repeat)
+		segments['layer'] = self.layer
+		self._append(segments)
+
+	def text(self, line):
+		record = np.zeros(1, dtype=SEGMENT_DTYPE)
+		record['op'] = TEXT
+		record['layer'] = self.layer
+		record['text'] = self._intern(line)
+		self._append(record)
+
+	def add_template(self, template, speed, base=None):
+		segments = template.segments.copy()
+		segments['f'][template.feed] = speed
+		if template.base_feed.any():
+			segments['f'][template.base_feed] = base
+			segments['fmt'][template.base_feed, WORDS.index('F')] = word_format(base)
+		segments['layer'] = self.layer
+		is_text = segments['op'] == TEXT
+		if is_text.any():
+			indices = np.array([self._intern(line) for line in template.texts], dtype='i4')
+			segments['text'][is_text] = indices[segments['text'][is_text]]
+		self._append(segments, template, speed, base)
+
+	def add_layer(self, build, speed, *args, cache=None, base=None):
+		"""
+					Adds the layer written by build(p, speed, *args), or by
+					build(p, speed, *args, base=base) when the layer also prints moves at
+					the base speed of the job.
+
+					With a cache dict the layer is compiled once per args into a
+					LayerTemplate and replayed with the new speed (and base speed)
+					afterwards. A layer printed at speed 0 is always built directly,
+					because the rotated moves of stri leave out a zero feed word.
+		"""
+		if cache is None or not speed or (base is not None and not base):
+			build(self, speed, *args, **({} if base is None else {'base': base}))
+			return
+		template = cache.get(args)
+		if template is None:
+			template = cache[args] = LayerTemplate(build, *args, base=base is not None)
+		self.add_template(template, speed, base)
+
+	@property
+	def segments(self):
+		if self._segments is None:
+			if self._parts:
+				self._segments = np.concatenate([part[0] for part in self._parts])
+			else:
+				self._segments = np.zeros(0, dtype=SEGMENT_DTYPE)
+		return self._segments
+
+	def clear(self):
+		"""Drops the segments added so far; the text table is kept."""
+		self._parts = []
+		self._segments = None
+
+	def chunks(self, formatter=None):
+		"""Yields the G-code bytes part by part: runs of added segments and replayed layers."""
+		formatter = formatter or TokenFormatter()
+		run = []
+		for segments, template, speed, base in self._parts:
+			if template is None:
+				run.append(segments)
+				continue
+			if run:
+				yield serialize(np.concatenate(run), self.texts, formatter)
+				run = []
+			yield template.render(speed, formatter, base)
+		if run:
+			yield serialize(np.concatenate(run), self.texts, formatter)
+
+	def to_bytes(self, precision=None):
+		return b''.join(self.chunks(TokenFormatter(precision)))
+
+	def write(self, target, precision=None):
+		"""Writes the G-code to a Sink or to a path (see sinks.open_sink)."""
+		with sink_for(target) as sink:
+			for chunk in self.chunks(TokenFormatter(precision)):
+				sink.write(chunk)
+
+
+def collect_parts(parts):
+	"""Runs a design's part generator to the end and returns the complete Toolpath."""
+	p = None
+	for p in parts:
+		pass
+	return p
+
+
+def iter_chunks(parts, lines=False, precision=None):
+	"""
+				Serializes a design's part generator piece by piece.
+
+				The Toolpath is cleared after every piece, so memory stays bounded by one
+				layer whatever the number of layers. One TokenFormatter serves the whole
+				job, so every distinct value is formatted once.
+	"""
+	formatter = TokenFormatter(precision)
+	for p in parts:
+		for chunk in p.chunks(formatter):
+			if lines:
+				yield from chunk.splitlines(keepends=True)
+			else:
+				yield chunk
+		p.clear()
+
+
+def write_parts(parts, target, precision=None):
+	"""Streams a design's part generator into a Sink or a path."""
+	with sink_for(target) as sink:
+		for chunk in iter_chunks(parts, precision=precision):
+			sink.write(chunk)
+
+
+class LayerTemplate:
+	"""
+				One layer built once with TEMPLATE_FEED as its speed (and, with base=True,
+				TEMPLATE_BASE_FEED as the base speed of the job).
+
+				Replaying the template only substitutes the feed of the segments that
+				used these speeds. The lines that do not depend on them are formatted
+				once and shared by every replay, so a template can serve every job of
+				the same geometry whatever its cts and number of layers (see
+				layer_cache).
+	"""
+
+	def __init__(self, build, *args, base=False):
+		p = Toolpath()
+		if base:
+			build(p, TEMPLATE_FEED, *args, base=TEMPLATE_BASE_FEED)
+		else:
+			build(p, TEMPLATE_FEED, *args)
+		self.segments = p.segments
+		self.texts = p.texts
+		self.feed = self.segments['f'] == TEMPLATE_FEED
+		self.base_feed = self.segments['f'] == TEMPLATE_BASE_FEED
+		self._first, self._inverse = unique_lines(self.segments)
+		self._feed_lines = np.flatnonzero(self.feed[self._first])
+		self._feed_records = line_records(self.segments[self._first[self._feed_lines]])
+		self._base_lines = np.flatnonzero(self.base_feed[self._first])
+		self._base_records = line_records(self.segments[self._first[self._base_lines]])
+		self._lines = {}  # formatted lines per precision
+
+	def render(self, speed, formatter=None, base=None):
+		formatter = formatter or TokenFormatter()
+		lines = self._lines.get(formatter.precision)
+		if lines is None:
+			lines = self._lines[formatter.precision] = format_lines(self.segments, self._first, self.texts, formatter)
+		lines = lines.copy()
+		speed = float(speed)
+		for n, (op, fmt, values, _) in zip(self._feed_lines, self._feed_records):
+			lines[n] = formatter.line(op, fmt, values[:-1] + [speed])
+		if len(self._base_lines):
+			code = word_format(base)
+			for n, (op, fmt, values, _) in zip(self._base_lines, self._base_records):
+				lines[n] = formatter.line(op, fmt[:-1] + [code], values[:-1] + [base])
+		return b''.join(lines[self._inverse].tolist())
+
+
+_layer_caches = collections.OrderedDict()
+_layer_caches_lock = threading.Lock()
+
+
+def layer_cache(key):
+	"""
+				Returns the LayerTemplate dict shared by every job of one geometry.
+
+				The key names the design and the parameters its layers depend on, e.g.
+				('hcell', a, b, xr, yr): jobs that only differ in cts or in the number
+				of layers replay the same templates instead of running the layer loops
+				again. The last LAYER_CACHE_SIZE geometries are kept.
+	"""
+	with _layer_caches_lock:
+		cache = _layer_caches.get(key)
+		if cache is None:
+			cache = _layer_caches[key] = {}
+			if len(_layer_caches) > LAYER_CACHE_SIZE:
+				_layer_caches.popitem(last=False)
+		else:
+			_layer_caches.move_to_end(key)
+		return cache
+
+
+def clear_layer_caches():
+	with _layer_caches_lock:
+		_layer_caches.clear()
+
+
+class TokenFormatter:
+	"""
+				Formats the G-code lines of one job from pre-rendered word tokens.
+
+				The bytes of every distinct (word, format, value) token are formatted
+				once and cached, so writing a move only joins cached byte strings.
+
+				With a precision, the words written as a shortest repr are rounded to
+				that many decimals first (0.30000000000000004 gives 0.3). The moves are
+				relative, so the rounding errors add up along the path: keep at least
+				4 decimals. Words with their own fixed number of decimals and integer
+				words are not affected. None keeps the full repr.
+	"""
+
+	def __init__(self, precision=None):
+		self.precision = precision
+		self.tokens = {}
+
+	def value(self, value, code):
+		if code == FMT_REPR and self.precision is not None:
+			return f'{round(value, self.precision) + 0.0}'  # + 0.0 turns -0.0 into 0.0
+		return format_value(value, code)
+
+	def word(self, index, value, code):
+		key = (index, code, value) if value else (index, code, str(value))  # keeps 0.0 and -0.0 apart
+		token = self.tokens.get(key)
+		if token is None:
+			token = self.tokens[key] = (WORDS[index] + self.value(value, code)).encode()
+		return token
+
+	def line(self, op, fmt, values):
+		tokens = [OPCODE_TOKENS[op]]
+		for index, code in enumerate(fmt):
+			if code != FMT_NONE:
+				tokens.append(self.word(index, values[index], code))
+		return b' '.join(tokens) + b'\n'
+
+
+def format_value(value, code):
+	if code == FMT_REPR:
+		return f'{float(value)}'
+	if code == FMT_INT:
+		return f'{int(value)}'
+	return f'{float(value):.{code - FMT_FIXED}f}'
+
+
+def line_records(segments):
+	"""Returns (op, fmt, [dx, dy, i, j, f], text) of every record as Python values."""
+	values = np.column_stack([segments['dx'], segments['dy'], segments['i'], segments['j'], segments['f']])
+	return list(zip(segments['op'].tolist(), segments['fmt'].tolist(), values.tolist(), segments['text'].tolist()))
+
+
+def unique_lines(segments):
+	"""Returns the index of the first record of every distinct line and the inverse map."""
+	keys = recfunctions.repack_fields(segments[_LINE_FIELDS])
+	keys = keys.view(np.dtype((np.void, keys.dtype.itemsize)))
+	first, inverse = np.unique(keys, return_index=True, return_inverse=True)[1:]
+	return first, inverse.ravel()
+
+
+def format_lines(segments, first, texts, formatter=None):
+	formatter = formatter or TokenFormatter()
+	lines = np.empty(len(first), dtype=object)
+	for n, (op, fmt, values, text) in enumerate(line_records(segments[first])):
+		if op == TEXT:
+			lines[n] = (texts[text] + '\n').encode()
+		else:
+			lines[n] = formatter.line(op, fmt, values)
+	return lines
+
+
+def serialize(segments, texts, formatter=None):
+	"""
+				Converts a segment array into G-code bytes.
+
+				Identical lines are formatted only once: the records are reduced to their
+				distinct lines with np.unique and the output is assembled by indexing the
+				formatted lines with the inverse map.
+	"""
+	if len(segments) == 0:
+		return b''
+	first, inverse = unique_lines(segments)
+	lines = format_lines(segments, first, texts, formatter)
+	return b''.join(lines[inverse].tolist())
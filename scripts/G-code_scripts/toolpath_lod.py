@@ -0,0 +1,238 @@
+import collections
+import math
+
+import numpy as np
+
+from gcode_parser import GcodeParser, move_bounds
+from thumbnails import BACKGROUND_LEVEL, PRINT_LEVEL, TRAVEL_LEVEL, draw_segments, tessellate_arcs
+from toolpath import G0
+
+# Moves kept per layer: the fields tessellate_arcs and move_bounds need, in float32
+LAYER_DTYPE = np.dtype([
+	('op', 'u1'),
+	('x0', 'f4'),
+	('y0', 'f4'),
+	('x', 'f4'),
+	('y', 'f4'),
+	('i', 'f4'),
+	('j', 'f4'),
+])
+
+# Decimated segments of one level of detail
+SEGMENT_DTYPE = np.dtype([
+	('x0', 'f4'),
+	('y0', 'f4'),
+	('x1', 'f4'),
+	('y1', 'f4'),
+	('travel', '?'),
+])
+
+GEOMETRY_CACHE_SIZE = 256  # (layer, level) geometries kept
+
+
+def lod_level(scale):
+	"""Returns the level of detail of a zoom [px/mm]: geometry is shared within a factor of 2."""
+	return int(math.floor(math.log2(max(scale, 1e-6))))
+
+
+class LayeredToolpath:
+	"""
+				Moves of one toolpath split by layer, with decimated geometry made on
+				demand.
+
+				layers maps the layer index (-1 for the start and end code) to its
+				moves. A toolpath built from a chunk stream (from_design) parses the
+				chunks only as far as the highest layer asked for, so count and bounds
+				cover the layers parsed so far. geometry() tessellates and decimates
+				only the requested layers for one level of detail and keeps the result
+				in an LRU cache, so panning and zooming within a level never touch the
+				moves again.
+	"""
+
+	def __init__(self, layers=None, chunks=None, layer_count=None):
+		self.layers = {}
+		self.count = 0
+		self.bounds = None
+		self._geometry = collections.OrderedDict()
+		self._range = (None, None)  # last merged (first, last, level, start_end) and its segments
+		self._parser = GcodeParser()
+		self._chunks = iter(chunks) if chunks is not None else None  # not parsed yet
+		self._layer_count = layer_count
+		for layer, moves in (layers or {}).items():
+			self._add(layer, moves)
+
+	@classmethod
+	def from_chunks(cls, chunks, cancelled=None):
+		"""
+					Builds the layers from G-code byte chunks, e.g. gcode_wrapper.iter_gcode
+					(at most one layer per chunk) or the batches of a file.
+		"""
+		toolpath = cls(chunks=chunks)
+		return toolpath if toolpath.load(cancelled=cancelled) else None
+
+	@classmethod
+	def from_design(cls, design, a, b, xr, yr, zr, cancelled=None):
+		"""Streams the G-code of a design; only the start code and the first layer are parsed here."""
+		from gcode_wrapper import CTS, iter_gcode
+
+		toolpath = cls(chunks=iter_gcode(design, a, b, CTS, xr, yr, zr), layer_count=int(zr))
+		return toolpath if toolpath.load(0, cancelled) else None
+
+	def load(self, last=None, cancelled=None):
+		"""
+					Parses the pending chunks up to the end of layer last (0-based), all of
+					them when None. Returns False when cancelled() turned true.
+		"""
+		# the parser's layer is past last once the comment of the next layer is read
+		while self._chunks is not None and (last is None or self._parser.layer <= last):
+			if cancelled is not None and cancelled():
+				return False
+			chunk = next(self._chunks, None)
+			if chunk is None:
+				self._chunks = None
+				break
+			moves = self._parser.parse(chunk.splitlines())
+			if len(moves) == 0:
+				continue
+			layer = moves['layer']
+			bounds = np.flatnonzero(np.diff(layer)) + 1
+			for start, end in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(moves)]])):
+				part = np.empty(end - start, dtype=LAYER_DTYPE)
+				for name in LAYER_DTYPE.names:
+					part[name] = moves[name][start:end]
+				self._add(int(layer[start]), part)
+		return True
+
+	def _add(self, layer, moves):
+		"""Appends moves to a layer, dropping its cached geometry."""
+		if len(moves) == 0:
+			return
+		if layer in self.layers:
+			moves = np.concatenate([self.layers[layer], moves])
+			for key in [key for key in self._geometry if key[0] == layer]:
+				del self._geometry[key]
+			self._range = (None, None)
+		self.count += len(moves) - len(self.layers.get(layer, ()))
+		self.layers[layer] = moves
+		xmin, xmax, ymin, ymax = move_bounds(moves)
+		bounds = (float(xmin.min()), float(xmax.max()), float(ymin.min()), float(ymax.max()))
+		if self.bounds is None:
+			self.bounds = bounds
+		else:
+			self.bounds = (min(self.bounds[0], bounds[0]), max(self.bounds[1], bounds[1]),
+				min(self.bounds[2], bounds[2]), max(self.bounds[3], bounds[3]))
+
+	@property
+	def layer_count(self):
+		if self._layer_count is not None:
+			return self._layer_count
+		return max([layer + 1 for layer in self.layers] + [0])
+
+	def layer_geometry(self, layer, level):
+		"""Returns the SEGMENT_DTYPE segments of one layer at a level of detail."""
+		key = (layer, level)
+		segments = self._geometry.get(key)
+		if segments is not None:
+			self._geometry.move_to_end(key)
+			return segments
+		moves = self.layers.get(layer)
+		if moves is None or len(moves) == 0:
+			segments = np.empty(0, dtype=SEGMENT_DTYPE)
+		else:
+			pixel = 2.0 ** -level  # [mm] at this level
+			segments = decimate(tessellate_arcs(moves, step=2 * pixel), pixel / 2)
+		self._geometry[key] = segments
+		if len(self._geometry) > GEOMETRY_CACHE_SIZE:
+			self._geometry.popitem(last=False)
+		return segments
+
+	def geometry(self, first, last, level, start_end=True):
+		"""Returns the decimated segments of the layers first..last (0-based, inclusive)."""
+		self.load(last)
+		key = (first, last, level, start_end)
+		if self._range[0] == key:
+			return self._range[1]
+		layers = list(range(max(first, 0), last + 1))
+		if start_end:
+			layers.insert(0, -1)
+		parts = [self.layer_geometry(layer, level) for layer in layers]
+		if not parts:
+			return np.empty(0, dtype=SEGMENT_DTYPE)
+		pixel = 2.0 ** -level
+		segments = unique_segments(np.concatenate(parts), pixel / 2)
+		self._range = (key, segments)
+		return segments
+
+
+def unique_segments(segments, grid):
+	"""Drops the segments whose endpoints fall on the same grid points as an earlier one."""
+	if len(segments) == 0:
+		return segments
+	q = [np.rint(segments[name] / grid).astype(np.int64) for name in ('x0', 'y0', 'x1', 'y1')]
+	order = np.lexsort((segments['travel'], q[3], q[2], q[1], q[0]))
+	keys = [k[order] for k in q] + [segments['travel'][order]]
+	new = np.ones(len(order), dtype=bool)
+	new[1:] = np.logical_or.reduce([k[1:] != k[:-1] for k in keys])
+	return segments[np.sort(order[new])]
+
+
+def decimate(moves, grid):
+	"""Returns the SEGMENT_DTYPE segments of moves, merged on a grid [mm]."""
+	segments = np.empty(len(moves), dtype=SEGMENT_DTYPE)
+	segments['x0'] = moves['x0']
+	segments['y0'] = moves['y0']
+	segments['x1'] = moves['x']
+	segments['y1'] = moves['y']
+	segments['travel'] = moves['op'] == G0
+	return unique_segments(segments, grid)
+
+
+def clip_segments(segments, xmin, xmax, ymin, ymax):
+	"""Returns the parts of the segments inside the rectangle (Liang-Barsky), dropping the rest."""
+	x0 = segments['x0'].astype(np.float64)
+	y0 = segments['y0'].astype(np.float64)
+	dx = segments['x1'] - x0
+	dy = segments['y1'] - y0
+	t0 = np.zeros(len(segments))
+	t1 = np.ones(len(segments))
+	visible = np.ones(len(segments), dtype=bool)
+	for p, q in ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0)):
+		parallel = p == 0
+		visible &= ~(parallel & (q < 0))
+		with np.errstate(divide='ignore', invalid='ignore'):
+			r = q / p
+		t0 = np.where(~parallel & (p < 0), np.maximum(t0, r), t0)
+		t1 = np.where(~parallel & (p > 0), np.minimum(t1, r), t1)
+	visible &= t0 <= t1
+	clipped = np.empty(np.count_nonzero(visible), dtype=SEGMENT_DTYPE)
+	clipped['x0'] = (x0 + t0 * dx)[visible]
+	clipped['y0'] = (y0 + t0 * dy)[visible]
+	clipped['x1'] = (x0 + t1 * dx)[visible]
+	clipped['y1'] = (y0 + t1 * dy)[visible]
+	clipped['travel'] = segments['travel'][visible]
+	return clipped
+
+
+def render_view(segments, width, height, center, scale, travel=True):
+	"""
+				Returns a (height, width) gray uint8 image of the segments seen through
+				a view centered on `center` [mm] at `scale` [px/mm].
+	"""
+	image = np.full((height, width), BACKGROUND_LEVEL, dtype=np.uint8)
+	half_w = (width - 1) / 2 / scale
+	half_h = (height - 1) / 2 / scale
+	cx, cy = center
+	visible = clip_segments(segments, cx - half_w, cx + half_w, cy - half_h, cy + half_h)
+	x0 = (visible['x0'] - (cx - half_w)) * scale
+	x1 = (visible['x1'] - (cx - half_w)) * scale
+	y0 = ((cy + half_h) - visible['y0']) * scale  # image rows grow downwards
+	y1 = ((cy + half_h) - visible['y1']) * scale
+	limits = (0.0, width - 1.0), (0.0, height - 1.0)
+	x0, x1 = np.clip(x0, *limits[0]), np.clip(x1, *limits[0])
+	y0, y1 = np.clip(y0, *limits[1]), np.clip(y1, *limits[1])
+	travel_moves = visible['travel']
+	if travel:
+		draw_segments(image, x0[travel_moves], y0[travel_moves], x1[travel_moves], y1[travel_moves], TRAVEL_LEVEL)
+	printed = ~travel_moves
+	draw_segments(image, x0[printed], y0[printed], x1[printed], y1[printed], PRINT_LEVEL)
+	return image
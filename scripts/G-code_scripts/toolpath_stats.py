@@ -0,0 +1,249 @@
+import functools
+import math
+
+import numpy as np
+
+from auxetic_gcode import new_speed
+from gcode_wrapper import CTS, PARTS
+from toolpath import G0, G2, G3, TEXT, FMT_NONE, WORDS
+
+PCL_DENSITY = 1.145e-3  # [g/mm^3]
+
+# Feed of a move: the layer speed new_speed(cts, layer) or a constant multiple of cts
+FEED_CONSTANT = 0
+FEED_LAYER = 1
+
+# (a, b) [um] the moves are sampled at; every move is affine in a and b, so the
+# three samples give its constant, per-mm-of-a and per-mm-of-b coefficients
+_SAMPLES = ((0.0, 0.0), (1000.0, 0.0), (0.0, 1000.0))
+
+# Number of layers the designs are sampled with: layer 1 is a regular layer
+# printed below the layer speed of layer 0, layer 2 is the last layer
+_SAMPLE_LAYERS = 3
+
+
+def _text_move(line):
+	"""Returns (op, dx, dy, f) of a verbatim G0/G1 line with X or Y words, else None."""
+	words = line.split()
+	if not words or words[0] not in ('G0', 'G1'):
+		return None
+	values = dict((word[0], float(word[1:])) for word in words[1:])
+	if 'X' not in values and 'Y' not in values:
+		return None  # e.g. G0 Z10 after switching back to absolute positioning
+	return int(words[0][1:]), values.get('X', 0.0), values.get('Y', 0.0), values.get('F')
+
+
+def _piece_moves(p, speed):
+	"""
+				Returns op, [dx, dy, i, j], feed kind and feed factor of every move of
+				the Toolpath piece p, whose layer speed is `speed` (None outside layers).
+	"""
+	segments = p.segments
+	op = segments['op'].astype(np.int64)
+	values = np.stack([segments['dx'], segments['dy'], segments['i'], segments['j']], axis=1)
+	feed = np.where(segments['fmt'][:, WORDS.index('F')] != FMT_NONE, segments['f'], np.nan)
+	keep = op != TEXT
+	for n in np.flatnonzero(~keep):
+		text_move = _text_move(p.texts[segments['text'][n]])
+		if text_move is not None:
+			op[n], values[n, 0], values[n, 1], f = text_move
+			values[n, 2:] = 0.0
+			feed[n] = np.nan if f is None else f
+			keep[n] = True
+	op, values, feed = op[keep], values[keep], feed[keep]
+
+	# modal feed: a move without F runs at the last programmed one (cts before any)
+	index = np.where(np.isnan(feed), -1, np.arange(len(feed)))
+	index = np.maximum.accumulate(index) if len(index) else index
+	feed = np.where(index >= 0, feed[np.maximum(index, 0)], 1.0)
+
+	kind = np.full(len(feed), FEED_CONSTANT)
+	if speed is not None and speed != 1.0:
+		kind[feed == speed] = FEED_LAYER
+	factor = np.where(kind == FEED_LAYER, 0.0, feed)
+	return op, values, kind, factor
+
+
+def _sample_pieces(design, a, b, xr, yr):
+	"""Returns the moves of the start code, of layers 0, 1 and 2 and of the end code, at cts = 1."""
+	speeds = [None] + [new_speed(1.0, l) for l in range(_SAMPLE_LAYERS)]
+	speeds.append(speeds[-1])  # the end code runs at the speed of the last layer
+	pieces = []
+	for p, speed in zip(PARTS[design](a, b, 1.0, xr, yr, _SAMPLE_LAYERS), speeds):
+		pieces.append(_piece_moves(p, speed))
+		p.clear()
+	return pieces
+
+
+def arc_lengths(op, dx, dy, i, j):
+	"""Returns the length of relative G0-G3 moves (arcs from their I, J center offset)."""
+	straight = np.hypot(dx, dy)
+	radius = np.hypot(i, j)
+	start = np.arctan2(-j, -i)
+	end = np.arctan2(dy - j, dx - i)
+	sweep = np.where(op == G3, end - start, start - end) % (2 * math.pi)
+	sweep = np.where(np.isclose(sweep, 0.0) & (radius > 0), 2 * math.pi, sweep)  # full circle
+	return np.where((op == G2) | (op == G3), radius * sweep, straight)
+
+
+class PieceModel:
+	"""
+				Moves of one piece of a toolpath (start code, layer or end code) grouped
+				by opcode, feed and affine coefficients, with their multiplicity.
+	"""
+
+	def __init__(self, samples):
+		(op, v0, kind, factor), (_, va, _, _), (_, vb, _, _) = samples
+		coef = np.stack([v0, va - v0, vb - v0], axis=2).reshape(len(op), 12)
+		keys = np.column_stack([op, kind, factor, np.round(coef, 12)])
+		keys, self.count = np.unique(keys, axis=0, return_counts=True)
+		self.op = keys[:, 0].astype(np.int64)
+		self.kind = keys[:, 1].astype(np.int64)
+		self.factor = keys[:, 2]
+		self.coef = keys[:, 3:].reshape(len(keys), 4, 3)
+
+	def evaluate(self, a, b):
+		"""
+					Returns, for every (a, b) [mm] row, the printed (G1-G3) and travel
+					(G0) length, the length run at the layer speed and the time units
+					(length / feed factor) of the moves at a constant feed.
+		"""
+		basis = np.stack([np.ones_like(a), a, b])  # (3, N)
+		dx, dy, i, j = (self.coef.reshape(-1, 3) @ basis).reshape(len(self.op), 4, len(a)).transpose(1, 0, 2)
+		lengths = np.hypot(dx, dy)
+		arcs = (self.op == G2) | (self.op == G3)
+		if arcs.any():
+			lengths[arcs] = arc_lengths(self.op[arcs, None], dx[arcs], dy[arcs], i[arcs], j[arcs])
+		lengths *= self.count[:, None]
+		travel = self.op == G0
+		layer = self.kind == FEED_LAYER
+		with np.errstate(divide='ignore'):
+			per_feed = np.where(layer, 0.0, 1.0 / self.factor)
+		return {
+			'print': lengths[~travel].sum(axis=0),
+			'travel': lengths[travel].sum(axis=0),
+			'layer': lengths[layer].sum(axis=0),
+			'constant': per_feed @ lengths,
+		}
+
+
+class StatsModel:
+	"""
+				Path lengths and feed split of one design for fixed xr and yr, as affine
+				functions of a and b.
+
+				The layer structure of every generator only depends on xr, yr and the
+				last-layer flag, so a scaffold of any height is the start code, zr - 1
+				regular layers, the last layer and the end code.
+	"""
+
+	def __init__(self, design, xr, yr):
+		samples = [_sample_pieces(design, a, b, xr, yr) for a, b in _SAMPLES]
+		pre, _, regular, last, post = [PieceModel(piece) for piece in zip(*samples)]
+		self.pieces = {'pre': pre, 'regular': regular, 'last': last, 'post': post}
+
+	def evaluate(self, a, b):
+		return {name: piece.evaluate(a, b) for name, piece in self.pieces.items()}
+
+
+@functools.lru_cache(maxsize=256)
+def stats_model(design, xr, yr):
+	return StatsModel(design.upper(), int(xr), int(yr))
+
+
+@functools.lru_cache(maxsize=16)
+def _speed_factors(layers):
+	"""Returns 1 / new_speed(1, l) per layer (inf from the layer printed at speed 0 on) and its prefix sums."""
+	speed = np.array([new_speed(1.0, l) for l in range(layers)])
+	with np.errstate(divide='ignore'):
+		inverse = np.where(speed > 0, 1.0 / speed, np.inf)
+	return inverse, np.concatenate([[0.0], np.cumsum(inverse)])
+
+
+def _times(pieces, inverse_last, inverse_sum, regular_layers):
+	"""Combines the piece lengths into the print time of the scaffold, in units of 1 / cts."""
+	def layer_time(length, inverse):
+		with np.errstate(invalid='ignore'):
+			return np.where(length > 0, length * inverse, 0.0)
+
+	regular, last = pieces['regular'], pieces['last']
+	constant = sum(piece['constant'] for piece in (pieces['pre'], last, pieces['post']))
+	constant = constant + regular_layers * regular['constant']
+	return (constant + layer_time(regular['layer'], inverse_sum)
+			+ layer_time(last['layer'] + pieces['post']['layer'], inverse_last))
+
+
+def _total(pieces, key, regular_layers):
+	return pieces['pre'][key] + regular_layers * pieces['regular'][key] + pieces['last'][key] + pieces['post'][key]
+
+
+def toolpath_stats(design, a, b, d, xr, yr, zr, cts=CTS):
+	"""
+				Path lengths, print time and fiber mass of a table of scaffolds, computed
+				without writing any G-code.
+
+				All arguments broadcast against each other, so a whole design space is
+				evaluated at once. Rows sharing (design, xr, yr) share one compiled
+				StatsModel; the rest is a few vectorized operations per distinct move.
+
+				Args:
+					- design (str or array): HCELL, SREG, SINV or STRI
+					- a, b (float or array): geometry parameters [um]
+					- d (float or array): fiber diameter [um]
+					- xr, yr, zr (int or array): repetitions along x, y and number of layers
+					- cts (float): collector translation speed of the first layer [mm/min]
+
+				Returns:
+					- dict of arrays: print_length and travel_length [mm] of the printed
+					  (G1-G3) and travel (G0) moves, print_time [min] under the new_speed
+					  schedule (inf once a layer is printed at speed 0) and mass [mg] of
+					  the PCL fiber deposited by the printed moves
+	"""
+	design, a, b, d, xr, yr, zr = np.broadcast_arrays(
+		np.char.upper(np.asarray(design, dtype=str)), np.asarray(a, dtype=float), np.asarray(b, dtype=float),
+		np.asarray(d, dtype=float), np.asarray(xr, dtype=np.int64), np.asarray(yr, dtype=np.int64),
+		np.asarray(zr, dtype=np.int64))
+	shape = a.shape
+	design, a, b, d, xr, yr, zr = [v.ravel() for v in (design, a, b, d, xr, yr, zr)]
+	if (zr < 1).any():
+		raise ValueError('zr must be >= 1')
+
+	print_length = np.empty(len(a))
+	travel_length = np.empty(len(a))
+	print_time = np.empty(len(a))
+	inverse, inverse_sum = _speed_factors(int(zr.max()))
+
+	# rows are grouped by (design, xr, yr), packed into one integer key
+	names, codes = np.unique(design, return_inverse=True)
+	structures, rows_of = np.unique((codes.ravel() << 42) | (xr << 21) | yr, return_inverse=True)
+	order = np.argsort(rows_of.ravel(), kind='stable')
+	bounds = np.searchsorted(rows_of.ravel()[order], np.arange(len(structures) + 1))
+	for n, structure in enumerate(structures.tolist()):
+		rows = order[bounds[n]:bounds[n + 1]]
+		code, x, y = structure >> 42, (structure >> 21) & 0x1fffff, structure & 0x1fffff
+		pieces = stats_model(str(names[code]), x, y).evaluate(a[rows] / 1000, b[rows] / 1000)
+		regular_layers = zr[rows] - 1
+		print_length[rows] = _total(pieces, 'print', regular_layers)
+		travel_length[rows] = _total(pieces, 'travel', regular_layers)
+		print_time[rows] = _times(pieces, inverse[regular_layers], inverse_sum[regular_layers], regular_layers) / cts
+
+	fiber_section = math.pi * (d / 2000) ** 2  # [mm^2]
+	return {
+		'print_length': print_length.reshape(shape),
+		'travel_length': travel_length.reshape(shape),
+		'print_time': print_time.reshape(shape),
+		'mass': (print_length * fiber_section * PCL_DENSITY * 1000).reshape(shape),
+	}
+
+
+def layer_times(design, a, b, xr, yr, zr, cts=CTS):
+	"""Returns the print time [min] of every layer of one scaffold; the start and end code are left out."""
+	model = stats_model(design, xr, yr)
+	pieces = model.evaluate(np.array([a / 1000]), np.array([b / 1000]))
+	inverse = _speed_factors(int(zr))[0]
+	regular, last = pieces['regular'], pieces['last']
+	times = np.empty(zr)
+	with np.errstate(invalid='ignore'):
+		times[:-1] = regular['constant'][0] + regular['layer'][0] * inverse[:-1]
+		times[-1] = last['constant'][0] + last['layer'][0] * inverse[-1]
+	return times / cts
@@ -0,0 +1,301 @@
+import os
+import sys
+
+from PyQt6 import QtWidgets, QtGui, QtCore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GCODE_SCRIPTS_DIR = os.path.join(BASE_DIR, "scripts", "G-code_scripts")
+if GCODE_SCRIPTS_DIR not in sys.path:
+	sys.path.insert(0, GCODE_SCRIPTS_DIR)
+
+from toolpath_lod import LayeredToolpath, lod_level, render_view
+
+RENDER_DELAY = 30  # [ms] input events merged into one render
+ZOOM_STEP = 1.25  # per wheel notch
+FIT_MARGIN = 0.05  # part of the view left around the fitted toolpath
+PREVIEW_LAYERS = 2  # layers shown when a design is loaded, the others are generated once selected
+
+
+class _Signals(QtCore.QObject):
+	done = QtCore.pyqtSignal(int, object)
+
+
+class _Task(QtCore.QRunnable):
+	"""Runs function() on the thread pool and emits (generation, result) back on the GUI thread."""
+
+	def __init__(self, generation, function):
+		super().__init__()
+		self.generation = generation
+		self.function = function
+		self.signals = _Signals()
+
+	def run(self):
+		try:
+			result = self.function()
+		except Exception as e:
+			result = e
+		self.signals.done.emit(self.generation, result)
+
+
+class ToolpathView(QtWidgets.QWidget):
+	"""
+				Pan (drag) and zoom (wheel) view of a LayeredToolpath.
+
+				Generation (of the layers not parsed yet), tessellation, decimation and
+				drawing run on a background thread for the level of detail of the
+				current zoom and the selected layers only. While
+				a render is pending, the last image is painted moved and scaled to the
+				current view, so the view follows the mouse at once.
+	"""
+	rendered = QtCore.pyqtSignal(int)  # segments drawn
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.setMinimumSize(300, 300)
+		self.setMouseTracking(False)
+		self.toolpath = None
+		self.first = 0
+		self.last = 0
+		self.travel = True
+		self.center = (0.0, 0.0)  # [mm]
+		self.scale = 1.0  # [px/mm]
+		self.image = None
+		self.image_view = None  # (center, scale) the image was rendered with
+		self._drag = None
+		self._generation = 0
+		self._rendering = False
+		self._dirty = False
+		self._tasks = set()
+		self.pool = QtCore.QThreadPool(self)
+		self.pool.setMaxThreadCount(1)  # LayeredToolpath caches are not shared between threads
+		self.timer = QtCore.QTimer(self)
+		self.timer.setSingleShot(True)
+		self.timer.setInterval(RENDER_DELAY)
+		self.timer.timeout.connect(self.render)
+
+	def set_toolpath(self, toolpath, last=None):
+		"""Shows the layers 0..last (0-based) of a toolpath, all of them when last is None."""
+		self.toolpath = toolpath
+		self.image = None
+		self.image_view = None
+		self.first = 0
+		if last is None:
+			last = toolpath.layer_count - 1 if toolpath is not None else 0
+		self.last = max(last, 0)
+		self.fit()
+
+	def set_layers(self, first, last):
+		self.first, self.last = first, last
+		self.schedule()
+
+	def set_travel(self, travel):
+		self.travel = travel
+		self.schedule()
+
+	def fit(self):
+		"""Centers the whole toolpath in the view."""
+		if self.toolpath is None or self.toolpath.bounds is None:
+			self.update()
+			return
+		xmin, xmax, ymin, ymax = self.toolpath.bounds
+		self.center = ((xmin + xmax) / 2, (ymin + ymax) / 2)
+		usable = 1 - 2 * FIT_MARGIN
+		self.scale = min(self.width() * usable / max(xmax - xmin, 1e-6), self.height() * usable / max(ymax - ymin, 1e-6))
+		self.schedule()
+
+	def schedule(self):
+		self.timer.start()
+		self.update()
+
+	def render(self):
+		if self.toolpath is None:
+			return
+		if self._rendering:
+			self._dirty = True  # render again with the latest view when this one is done
+			return
+		self._rendering = True
+		self._dirty = False
+		toolpath, first, last, travel = self.toolpath, self.first, self.last, self.travel
+		center, scale, width, height = self.center, self.scale, self.width(), self.height()
+
+		def work():
+			segments = toolpath.geometry(first, last, lod_level(scale))
+			image = render_view(segments, width, height, center, scale, travel)
+			qimage = QtGui.QImage(image.data, width, height, width, QtGui.QImage.Format.Format_Grayscale8).copy()
+			return qimage, (center, scale), len(segments)
+
+		self._generation += 1
+		self._start(self._generation, work, self._rendered)
+
+	def _start(self, generation, function, slot):
+		task = _Task(generation, function)
+		task.setAutoDelete(False)
+		task.signals.done.connect(slot)
+		task.signals.done.connect(lambda *_: self._tasks.discard(task))
+		self._tasks.add(task)  # keep the task alive until it reports back
+		self.pool.start(task)
+
+	def _rendered(self, generation, result):
+		self._rendering = False
+		if generation == self._generation and not isinstance(result, Exception):
+			self.image, self.image_view, segments = result
+			self.rendered.emit(segments)
+			self.update()
+		if self._dirty:
+			self.render()
+
+	def world_at(self, point):
+		"""Returns the (x, y) [mm] under a widget position."""
+		x = self.center[0] + (point.x() - (self.width() - 1) / 2) / self.scale
+		y = self.center[1] - (point.y() - (self.height() - 1) / 2) / self.scale
+		return x, y
+
+	def paintEvent(self, event):
+		painter = QtGui.QPainter(self)
+		painter.fillRect(self.rect(), QtGui.QColor(255, 255, 255))
+		if self.image is None:
+			painter.drawText(self.rect(), QtCore.Qt.AlignmentFlag.AlignCenter,
+				"Select a row to preview its toolpath" if self.toolpath is None else "Rendering...")
+			return
+		# the last image, moved and scaled from the view it was rendered with to the current one
+		(cx, cy), image_scale = self.image_view
+		painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform, False)
+		painter.translate((cx - self.center[0]) * self.scale + (self.width() - 1) / 2,
+			(self.center[1] - cy) * self.scale + (self.height() - 1) / 2)
+		zoom = self.scale / image_scale
+		painter.scale(zoom, zoom)
+		painter.drawImage(QtCore.QPointF(-(self.image.width() - 1) / 2, -(self.image.height() - 1) / 2), self.image)
+
+	def wheelEvent(self, event):
+		steps = event.angleDelta().y() / 120
+		if not steps:
+			return
+		# keep the point under the cursor in place
+		position = event.position()
+		x, y = self.world_at(position)
+		self.scale *= ZOOM_STEP ** steps
+		self.center = (x - (position.x() - (self.width() - 1) / 2) / self.scale,
+			y + (position.y() - (self.height() - 1) / 2) / self.scale)
+		self.schedule()
+
+	def mousePressEvent(self, event):
+		if event.button() == QtCore.Qt.MouseButton.LeftButton:
+			self._drag = (event.position(), self.center)
+
+	def mouseMoveEvent(self, event):
+		if self._drag is None:
+			return
+		start, (cx, cy) = self._drag
+		delta = event.position() - start
+		self.center = (cx - delta.x() / self.scale, cy + delta.y() / self.scale)
+		self.schedule()
+
+	def mouseReleaseEvent(self, event):
+		self._drag = None
+
+	def mouseDoubleClickEvent(self, event):
+		self.fit()
+
+	def resizeEvent(self, event):
+		super().resizeEvent(event)
+		self.schedule()
+
+
+class ToolpathPreview(QtWidgets.QWidget):
+	"""ToolpathView of one design with its layer range, loaded in the background."""
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.layout = QtWidgets.QVBoxLayout()
+		self.layout.setContentsMargins(0, 0, 0, 0)
+
+		self.view = ToolpathView()
+		self.view.rendered.connect(self.update_status)
+
+		# Visible layer range
+		self.layers_layout = QtWidgets.QHBoxLayout()
+		self.first_spin = QtWidgets.QSpinBox()
+		self.last_spin = QtWidgets.QSpinBox()
+		for spin in (self.first_spin, self.last_spin):
+			spin.setRange(1, 1)
+			spin.valueChanged.connect(self.update_layers)
+		self.travel_check = QtWidgets.QCheckBox("Travel moves")
+		self.travel_check.setChecked(True)
+		self.travel_check.toggled.connect(self.view.set_travel)
+		self.fit_button = QtWidgets.QPushButton("Fit")
+		self.fit_button.clicked.connect(self.view.fit)
+		self.layers_layout.addWidget(QtWidgets.QLabel("Layers:"))
+		self.layers_layout.addWidget(self.first_spin)
+		self.layers_layout.addWidget(QtWidgets.QLabel("to"))
+		self.layers_layout.addWidget(self.last_spin)
+		self.layers_layout.addWidget(self.travel_check)
+		self.layers_layout.addStretch()
+		self.layers_layout.addWidget(self.fit_button)
+
+		self.status_label = QtWidgets.QLabel("")
+
+		self.layout.addWidget(self.view, 1)
+		self.layout.addLayout(self.layers_layout)
+		self.layout.addWidget(self.status_label)
+		self.setLayout(self.layout)
+
+		self.design = None
+		self._generation = 0
+
+	def show_design(self, design, a, b, xr, yr, zr):
+		"""Generates the toolpath of a design in the background and shows it; a newer call cancels it."""
+		design = (design, a, b, xr, yr, zr)
+		if design == self.design:
+			return
+		self.design = design
+		self._generation += 1
+		generation = self._generation
+		self.status_label.setText("Generating toolpath...")
+
+		def load():
+			return LayeredToolpath.from_design(*design, cancelled=lambda: generation != self._generation)
+
+		self.view._start(generation, load, self._loaded)
+
+	def clear(self):
+		self.design = None
+		self._generation += 1
+		self.view.set_toolpath(None)
+		self.status_label.setText("")
+
+	def _loaded(self, generation, result):
+		if generation != self._generation or result is None:
+			return  # replaced by a newer design
+		if isinstance(result, Exception):
+			self.design = None
+			self.status_label.setText(f"Cannot preview this design: {result}")
+			self.view.set_toolpath(None)
+			return
+		layers = max(result.layer_count, 1)
+		shown = min(layers, PREVIEW_LAYERS)
+		for spin in (self.first_spin, self.last_spin):
+			spin.blockSignals(True)
+			spin.setRange(1, layers)
+		self.first_spin.setValue(1)
+		self.last_spin.setValue(shown)
+		for spin in (self.first_spin, self.last_spin):
+			spin.blockSignals(False)
+		self.view.set_toolpath(result, shown - 1)
+
+	def update_layers(self):
+		first, last = self.first_spin.value(), self.last_spin.value()
+		if first > last:
+			# keep the range valid, moving the other end
+			if self.sender() is self.first_spin:
+				self.last_spin.setValue(first)
+			else:
+				self.first_spin.setValue(last)
+			return
+		self.view.set_layers(first - 1, last - 1)
+
+	def update_status(self, segments):
+		toolpath = self.view.toolpath
+		if toolpath is None:
+			return
+		self.status_label.setText(f"{toolpath.count} moves generated, {toolpath.layer_count} layers,"
+			f" {segments} segments drawn at {self.view.scale:.1f} px/mm")